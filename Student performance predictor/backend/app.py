@@ -3,12 +3,21 @@ from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import joblib
-import sqlite3
 from datetime import datetime
-import tensorflow as tf
-from tensorflow import keras
 import json
 import os
+import time
+from features import build_feature_frame
+from engine import PredictionEngine, DEFAULT_WEIGHTS
+from registry import load_registered_models, enabled_models
+from prediction_cache import PredictionCache
+from score_table import ScoreTable
+from write_behind import WriteBehindQueue
+from micro_batch import MicroBatcher
+import db
+import migrations
+from serialize import query_dicts, json_response, export_response
+from pagination import KeysetQuery, page_size
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 CORS(app)
@@ -18,10 +27,24 @@ models = {}
 scaler = None
 label_encoders = {}
 feature_columns = []
+engine = None
+prediction_cache = PredictionCache.from_env()
+score_table = None
+outcome_predictor = None
+id_allocator = db.IdAllocator('students')
+write_queue = WriteBehindQueue.from_env()
+
+def load_ensemble_weights():
+    """Read ensemble weights from model/ensemble_config.json if present"""
+    try:
+        with open('model/ensemble_config.json', 'r') as f:
+            return json.load(f).get('weights', DEFAULT_WEIGHTS)
+    except FileNotFoundError:
+        return DEFAULT_WEIGHTS
 
 def load_models():
     """Load all ML models"""
-    global models, scaler, label_encoders, feature_columns
+    global models, scaler, label_encoders, feature_columns, engine, score_table, outcome_predictor
     
     print("Loading ML models...")
     
@@ -34,24 +57,20 @@ def load_models():
         with open('model/feature_columns.txt', 'r') as f:
             feature_columns = [line.strip() for line in f]
         
-        # Load individual models
-        models['random_forest'] = joblib.load('model/random_forest.pkl')
-        models['xgboost'] = joblib.load('model/xgboost.pkl')
-        models['lightgbm'] = joblib.load('model/lightgbm.pkl')
-        models['neural_network'] = keras.models.load_model('model/neural_network.h5')
-        
-        # Load ensemble model
-        try:
-            models['ensemble'] = joblib.load('model/ensemble.pkl')
-        except:
-            print("Warning: Could not load ensemble model, creating new one...")
-            from model.train_models import EnsembleModel
-            models['ensemble'] = EnsembleModel(
-                rf_model=models['random_forest'],
-                xgb_model=models['xgboost'],
-                lgb_model=models['lightgbm'],
-                nn_model=models['neural_network']
-            )
+        # Load the enabled models that carry ensemble weight; backends are
+        # imported only when needed, so a zero-weight model costs nothing
+        weights = load_ensemble_weights()
+        names = [name for name in enabled_models() if weights.get(name, 0) > 0]
+        if not names:
+            print("Warning: no enabled model has ensemble weight, using equal weights")
+            names = enabled_models()
+        models.clear()
+        models.update(load_registered_models(names))
+        if not models:
+            raise RuntimeError("No models could be loaded")
+        
+        # The ensemble is derived from the base models by PredictionEngine,
+        # so model/ensemble.pkl (which re-runs every base model) isn't loaded
         
         print(f"✓ Loaded {len(models)} models")
         print(f"✓ {len(feature_columns)} feature columns")
@@ -60,6 +79,51 @@ def load_models():
         print(f"Error loading models: {e}")
         print("Creating fallback models...")
         create_fallback_models()
+    
+    weights = load_ensemble_weights()
+    if not any(weights.get(name, 0) > 0 for name in models):
+        weights = DEFAULT_WEIGHTS
+    engine = PredictionEngine(models, weights)
+    prediction_cache.clear()
+    print(f"✓ Ensemble weights: {engine.weights}")
+    
+    # SCORING_MODE=table serves /api/predict from model/score_table.npy
+    # (built by score_table.py) instead of running the models
+    score_table = None
+    if os.environ.get('SCORING_MODE', 'live') == 'table':
+        try:
+            score_table = ScoreTable.load(feature_columns)
+            print(f"✓ Score table: {score_table.meta['n_cells']:,} cells, "
+                  f"MAE vs live {score_table.meta['error']['mae']:.3f}")
+        except Exception as e:
+            print(f"Warning: table mode disabled, using live inference: {e}")
+    
+    # GPA / GradeClass pipeline exported from the notebook, loaded and warmed
+    # up once (before the fork under gunicorn)
+    try:
+        from outcome_service import OutcomePredictor
+        outcome_predictor = OutcomePredictor.from_env()
+        if outcome_predictor is not None:
+            print(f"✓ GPA model {outcome_predictor.version} ({outcome_predictor.backend} backend)")
+    except FileNotFoundError:
+        outcome_predictor = None
+        print("Warning: no GPA model, /api/predict/gpa disabled (run model/outcome_export.py)")
+    except Exception as e:
+        outcome_predictor = None
+        print(f"Warning: could not load the GPA model: {e}")
+
+def score_features(features_array):
+    """Scale a raw feature matrix and run the ensemble"""
+    return engine.predict(scaler.transform(features_array))
+
+# Coalesces concurrent single-row predictions into one score_features call
+micro_batcher = MicroBatcher.from_env(score_features)
+
+def score_outcomes(features_array):
+    """GPA and GradeClass for a matrix of raw notebook fields"""
+    return outcome_predictor.score(features_array)
+
+outcome_batcher = MicroBatcher.from_env(score_outcomes)
 
 def create_fallback_models():
     """Create simple models if saved ones aren't available"""
@@ -104,22 +168,26 @@ def create_fallback_models():
     models['random_forest'] = rf_model
     models['xgboost'] = rf_model
     models['lightgbm'] = rf_model
-    models['ensemble'] = rf_model
     
-    # Create simple neural network
-    nn_model = keras.Sequential([
-        keras.layers.Dense(10, activation='relu', input_shape=(25,)),
-        keras.layers.Dense(1)
-    ])
-    nn_model.compile(optimizer='adam', loss='mse')
-    nn_model.fit(X_dummy, y_dummy, epochs=1, verbose=0)
-    models['neural_network'] = nn_model
+    # Create simple neural network (only if TensorFlow is installed)
+    try:
+        from tensorflow import keras
+    except ImportError:
+        print("TensorFlow not installed, skipping fallback neural network")
+    else:
+        nn_model = keras.Sequential([
+            keras.layers.Dense(10, activation='relu', input_shape=(25,)),
+            keras.layers.Dense(1)
+        ])
+        nn_model.compile(optimizer='adam', loss='mse')
+        nn_model.fit(X_dummy, y_dummy, epochs=1, verbose=0)
+        models['neural_network'] = nn_model
     
     print("✓ Fallback models created")
 
 def init_db():
     """Initialize database"""
-    conn = sqlite3.connect('database/student_performance.db')
+    conn = db.get_connection()
     c = conn.cursor()
     
     # Students table
@@ -158,7 +226,9 @@ def init_db():
                   FOREIGN KEY (student_id) REFERENCES students (id))''')
     
     conn.commit()
-    conn.close()
+    
+    # Add missing columns and indexes
+    migrations.migrate(conn)
     print("✓ Database initialized")
 
 def calculate_features(data):
@@ -335,35 +405,27 @@ def predict():
         
         features_array = np.array(features_list).reshape(1, -1)
         
-        # Scale features
-        features_scaled = scaler.transform(features_array)
-        
-        # Get predictions from all models
-        predictions = {}
-        for name, model in models.items():
-            try:
-                if name == 'neural_network':
-                    pred = model.predict(features_scaled, verbose=0).flatten()[0]
-                elif name == 'ensemble':
-                    pred = model.predict(features_scaled)[0]
-                else:
-                    pred = model.predict(features_scaled)[0]
-                predictions[name] = float(pred)
-            except Exception as e:
-                print(f"Error with {name}: {e}")
-                predictions[name] = 70.0
-        
-        # Ensemble prediction
-        weights = {'random_forest': 0.25, 'xgboost': 0.25, 
-                  'lightgbm': 0.25, 'neural_network': 0.25}
-        final_score = sum(predictions[name] * weights.get(name, 0) 
-                         for name in predictions if name in weights)
+        if score_table is not None:
+            # Table mode: interpolate the precomputed score and model spread
+            start = time.perf_counter()
+            scores, spreads = score_table.predict(features_array)
+            predictions = {'ensemble': float(scores[0])}
+            pred_std = float(spreads[0])
+            timings = {'score_table': (time.perf_counter() - start) * 1000}
+            cache_hits = 0
+        else:
+            # Run each base model once (unless this feature vector was scored
+            # recently); the ensemble is derived from their outputs
+            batch_predictions, timings, cache_hits = prediction_cache.predict(micro_batcher.score,
+                                                                              features_array)
+            predictions = {name: float(pred[0]) for name, pred in batch_predictions.items()}
+            pred_std = np.std(list(predictions.values()))
+        final_score = predictions['ensemble']
         
         # Ensure bounds
         final_score = max(0, min(100, final_score))
         
         # Calculate confidence
-        pred_std = np.std(list(predictions.values()))
         confidence = max(30, 100 - pred_std * 10)
         
         # Determine grade and risk
@@ -381,53 +443,36 @@ def predict():
         # Generate recommendations
         recommendations = generate_recommendations(final_score, features_dict)
         
-        # Save to database
-        conn = sqlite3.connect('database/student_performance.db')
-        c = conn.cursor()
-        
-        c.execute('''INSERT INTO students 
-                     (name, gender, nationality, age, english_grade, math_grade,
-                      sciences_grade, language_grade, portfolio_rating, 
-                      coverletter_rating, refletter_rating, predicted_score,
-                      predicted_grade, risk_level, confidence, recommendations,
-                      prediction_date)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (data.get('name', 'Unknown'),
-                   data.get('gender', ''),
-                   data.get('nationality', ''),
-                   data.get('age', 21),
-                   data.get('english_grade', 3.0),
-                   data.get('math_grade', 3.0),
-                   data.get('sciences_grade', 3.0),
-                   data.get('language_grade', 3.0),
-                   data.get('portfolio_rating', 3),
-                   data.get('coverletter_rating', 3),
-                   data.get('refletter_rating', 3),
-                   float(final_score),
-                   grade, risk, float(confidence),
-                   json.dumps(recommendations),
-                   datetime.now()))
-        
-        student_id = c.lastrowid
-        
-        # Save interventions
-        for rec in recommendations:
-            c.execute('''INSERT INTO interventions 
-                         (student_id, student_name, intervention_type, title,
-                          description, priority, status, resources, created_at)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (student_id,
-                       data.get('name', 'Unknown'),
-                       rec['type'],
-                       rec['title'],
-                       rec['description'],
-                       rec['priority'],
-                       'pending',
-                       json.dumps(rec['resources']),
-                       datetime.now()))
-        
-        conn.commit()
-        conn.close()
+        # Save to database: the id is reserved now and the rows are written
+        # by the write-behind queue, off the response path
+        student_id = id_allocator.reserve()[0]
+        now = datetime.now()
+        write_queue.submit((student_id,
+                            data.get('name', 'Unknown'),
+                            data.get('gender', ''),
+                            data.get('nationality', ''),
+                            data.get('age', 21),
+                            data.get('english_grade', 3.0),
+                            data.get('math_grade', 3.0),
+                            data.get('sciences_grade', 3.0),
+                            data.get('language_grade', 3.0),
+                            data.get('portfolio_rating', 3),
+                            data.get('coverletter_rating', 3),
+                            data.get('refletter_rating', 3),
+                            float(final_score),
+                            grade, risk, float(confidence),
+                            json.dumps(recommendations),
+                            now),
+                           [(student_id,
+                             data.get('name', 'Unknown'),
+                             rec['type'],
+                             rec['title'],
+                             rec['description'],
+                             rec['priority'],
+                             'pending',
+                             json.dumps(rec['resources']),
+                             now)
+                           for rec in recommendations])
         
         return jsonify({
             'success': True,
@@ -438,6 +483,8 @@ def predict():
                 'confidence': float(confidence)
             },
             'model_predictions': predictions,
+            'model_timings_ms': timings,
+            'cached': cache_hits > 0,
             'feature_analysis': {
                 'academic_strength': float(features_dict['overall_grade']),
                 'application_strength': float(features_dict['application_strength']),
@@ -462,16 +509,215 @@ def predict():
             }
         })
 
+GRADE_BINS = [60, 70, 80, 90]
+GRADE_LABELS = np.array(['F', 'D', 'C', 'B', 'A'])
+RISK_LABELS = np.array(['Critical', 'High', 'Medium', 'Low', 'Low'])
+
+def read_batch_records():
+    """Read a batch of students from a JSON array or an uploaded CSV file"""
+    if 'file' in request.files:
+        return pd.read_csv(request.files['file'])
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('students', [])
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of students or a CSV file upload')
+    return pd.DataFrame(data)
+
+def save_predictions_bulk(records, scores, grades, risks, confidences, recommendations):
+    """Insert a batch of predictions and their interventions in one transaction"""
+    now = datetime.now()
+    
+    def field(name, default):
+        if name not in records:
+            return [default] * len(records)
+        return [default if pd.isna(v) else v for v in records[name]]
+    
+    names = field('name', 'Unknown')
+    student_ids = id_allocator.reserve(len(records))
+    student_rows = list(zip(
+        student_ids,
+        names,
+        field('gender', ''),
+        field('nationality', ''),
+        field('age', 21),
+        field('english_grade', 3.0),
+        field('math_grade', 3.0),
+        field('sciences_grade', 3.0),
+        field('language_grade', 3.0),
+        field('portfolio_rating', 3),
+        field('coverletter_rating', 3),
+        field('refletter_rating', 3),
+        [float(s) for s in scores],
+        grades, risks,
+        [float(c) for c in confidences],
+        [json.dumps(recs) for recs in recommendations],
+        [now] * len(records)
+    ))
+    
+    with db.transaction() as conn:
+        c = conn.cursor()
+        c.executemany(db.INSERT_STUDENT_WITH_ID_SQL, student_rows)
+        
+        intervention_rows = [
+            (student_id, name, rec['type'], rec['title'], rec['description'],
+             rec['priority'], 'pending', json.dumps(rec['resources']), now)
+            for student_id, name, recs in zip(student_ids, names, recommendations)
+            for rec in recs
+        ]
+        c.executemany(db.INSERT_INTERVENTION_SQL, intervention_rows)
+    
+    return student_ids
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Batch prediction endpoint (JSON array or CSV upload)"""
+    try:
+        records = read_batch_records()
+        if records.empty:
+            return jsonify({'success': True, 'count': 0, 'results': []})
+        
+        print(f"Batch prediction request for {len(records)} students")
+        
+        # Build the whole feature matrix at once
+        features = build_feature_frame(records, label_encoders)
+        
+        # One predict call per base model for the rows not already cached
+        predictions, timings, cache_hits = prediction_cache.predict(
+            score_features, features[feature_columns].to_numpy(dtype=float))
+        final_scores = np.clip(predictions['ensemble'], 0, 100)
+        
+        # Calculate confidence
+        pred_std = np.column_stack(list(predictions.values())).std(axis=1)
+        confidences = np.maximum(30, 100 - pred_std * 10)
+        
+        # Determine grade and risk
+        bins = np.digitize(final_scores, GRADE_BINS)
+        grades = GRADE_LABELS[bins].tolist()
+        risks = RISK_LABELS[bins].tolist()
+        
+        feature_rows = features.to_dict('records')
+        recommendations = [generate_recommendations(score, row)
+                           for score, row in zip(final_scores, feature_rows)]
+        
+        student_ids = save_predictions_bulk(records, final_scores, grades, risks,
+                                            confidences, recommendations)
+        names = (records['name'].fillna('Unknown').astype(str).tolist()
+                 if 'name' in records else ['Unknown'] * len(records))
+        
+        results = []
+        for i, row in enumerate(feature_rows):
+            results.append({
+                'student_id': student_ids[i],
+                'name': names[i],
+                'prediction': {
+                    'score': float(final_scores[i]),
+                    'grade': grades[i],
+                    'risk_level': risks[i],
+                    'confidence': float(confidences[i])
+                },
+                'model_predictions': {name: float(pred[i]) for name, pred in predictions.items()},
+                'feature_analysis': {
+                    'academic_strength': float(row['overall_grade']),
+                    'application_strength': float(row['application_strength']),
+                    'extracurricular_score': float(row['extracurricular_score']),
+                    'attendance_rate': float(row['attendance_rate'])
+                },
+                'recommendations': recommendations[i]
+            })
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'model_timings_ms': timings,
+            'cache_hits': cache_hits,
+            'results': results
+        })
+        
+    except Exception as e:
+        print(f"Batch prediction error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/predict/gpa', methods=['POST'])
+def predict_gpa():
+    """GPA and GradeClass from the notebook pipeline
+
+    Takes one student (JSON object), a batch (JSON array, {'students': [...]}
+    or CSV upload) with the notebook's raw fields (Age, Gender, ...).
+    """
+    try:
+        if outcome_predictor is None:
+            return jsonify({'success': False, 'error': 'GPA model not loaded (run model/outcome_export.py)'})
+        
+        data = None if 'file' in request.files else request.get_json(silent=True)
+        single = isinstance(data, dict) and 'students' not in data
+        records = pd.DataFrame([data]) if single else read_batch_records()
+        if records.empty:
+            return jsonify({'success': True, 'count': 0, 'results': []})
+        
+        # Single rows and small batches are coalesced like /api/predict
+        predictions, timings = outcome_batcher.score(outcome_predictor.features(records))
+        labels = outcome_predictor.grade_labels
+        results = [{
+            'gpa': float(gpa),
+            'grade_class': int(grade_class),
+            'grade': labels[int(grade_class)],
+            'probabilities': {labels[int(c)]: float(p)
+                              for c, p in zip(outcome_predictor.classes, probabilities)}
+        } for gpa, grade_class, probabilities in zip(predictions['gpa'], predictions['grade_class'],
+                                                     predictions['probabilities'])]
+        
+        response = {
+            'success': True,
+            'model_version': outcome_predictor.version,
+            'count': len(results),
+            'model_timings_ms': timings,
+            'results': results
+        }
+        if single:
+            response['prediction'] = results[0]
+        return jsonify(response)
+        
+    except Exception as e:
+        print(f"GPA prediction error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+SUMMARY_TOTALS_SQL = '''
+    SELECT
+        (SELECT IFNULL(SUM(count), 0) FROM risk_stats) as total_students,
+        (SELECT SUM(score_sum) / SUM(count) FROM grade_range_stats) as average_score,
+        (SELECT IFNULL(SUM(high_risk), 0) FROM risk_stats) as high_risk_count,
+        (SELECT IFNULL(SUM(count), 0) FROM intervention_type_stats) as intervention_count
+'''
+
+def read_summary_totals(conn):
+    """Overall counts from the trigger-maintained summary tables (see migrations.py)"""
+    total_students, average_score, high_risk_count, intervention_count = \
+        conn.execute(SUMMARY_TOTALS_SQL).fetchone()
+    return {
+        'total_students': int(total_students or 0),
+        'average_score': float(average_score or 0),
+        'high_risk_count': int(high_risk_count or 0),
+        'intervention_count': int(intervention_count or 0)
+    }
+
 @app.route('/api/analytics/dashboard', methods=['GET'])
 def get_dashboard_analytics():
     try:
-        conn = sqlite3.connect('database/student_performance.db')
+        conn = db.get_connection()
         
-        check_query = pd.read_sql_query('SELECT COUNT(*) as count FROM students', conn)
-        total_students = check_query['count'].iloc[0]
+        # Aggregates are read from summary tables that every write keeps up
+        # to date, so the dashboard cost doesn't grow with the table sizes
+        summary = read_summary_totals(conn)
         
-        if total_students == 0:
-            conn.close()
+        if summary['total_students'] == 0:
             return jsonify({
                 'performance_distribution': [],
                 'risk_distribution': [],
@@ -487,85 +733,57 @@ def get_dashboard_analytics():
                 'empty': True
             })
         
-        distribution = pd.read_sql_query('''
-            SELECT 
-                CASE 
-                    WHEN predicted_score >= 90 THEN 'A (90-100)'
-                    WHEN predicted_score >= 80 THEN 'B (80-89)'
-                    WHEN predicted_score >= 70 THEN 'C (70-79)'
-                    WHEN predicted_score >= 60 THEN 'D (60-69)'
-                    ELSE 'F (<60)'
-                END as grade_range,
-                COUNT(*) as count,
-                AVG(predicted_score) as avg_score
-            FROM students 
-            GROUP BY grade_range
+        distribution = query_dicts(conn, '''
+            SELECT grade_range, count, score_sum / count as avg_score
+            FROM grade_range_stats
+            WHERE count > 0
             ORDER BY avg_score DESC
-        ''', conn)
-        
-        risk_dist = pd.read_sql_query('''
-            SELECT risk_level, COUNT(*) as count
-            FROM students
-            GROUP BY risk_level
-        ''', conn)
-        
-        nationality_stats = pd.read_sql_query('''
-            SELECT nationality, 
-                   COUNT(*) as count,
-                   AVG(predicted_score) as avg_score,
-                   AVG(confidence) as avg_confidence
-            FROM students
-            GROUP BY nationality
-            HAVING count >= 1
+        ''')
+        
+        # The GROUP BY this replaces returned levels sorted by name (NULL
+        # first); risk_stats stores NULL as '' and would scan in insertion
+        # order, so both are mapped back to keep the dashboard unchanged
+        risk_dist = query_dicts(conn, '''
+            SELECT NULLIF(risk_level, '') as risk_level, count
+            FROM risk_stats
+            WHERE count > 0
+            ORDER BY risk_level
+        ''')
+        
+        nationality_stats = query_dicts(conn, '''
+            SELECT nationality, count,
+                   score_sum / count as avg_score,
+                   confidence_sum / count as avg_confidence
+            FROM nationality_stats
+            WHERE count >= 1
             ORDER BY avg_score DESC
             LIMIT 10
-        ''', conn)
-        
-        intervention_stats = pd.read_sql_query('''
-            SELECT intervention_type, 
-                   COUNT(*) as count,
-                   AVG(priority) as avg_priority,
-                   AVG(effectiveness_score) as avg_effectiveness
-            FROM interventions
-            GROUP BY intervention_type
+        ''')
+        
+        intervention_stats = query_dicts(conn, '''
+            SELECT intervention_type, count,
+                   priority_sum / count as avg_priority,
+                   CASE WHEN effectiveness_count > 0
+                        THEN effectiveness_sum / effectiveness_count END as avg_effectiveness
+            FROM intervention_type_stats
+            WHERE count > 0
             ORDER BY count DESC
-        ''', conn)
+        ''')
         
-        recent = pd.read_sql_query('''
+        recent = query_dicts(conn, '''
             SELECT name, predicted_score, predicted_grade, risk_level,
                    datetime(prediction_date) as date
             FROM students
             ORDER BY prediction_date DESC
             LIMIT 10
-        ''', conn)
-        
-        overall_stats = pd.read_sql_query('''
-            SELECT 
-                COUNT(*) as total_students,
-                AVG(predicted_score) as average_score,
-                SUM(CASE WHEN risk_level IN ('High', 'Critical') THEN 1 ELSE 0 END) as high_risk_count
-            FROM students
-        ''', conn)
-        
-        intervention_count = pd.read_sql_query('''
-            SELECT COUNT(*) as intervention_count FROM interventions
-        ''', conn)
-        
-        conn.close()
-        
-        summary = {
-            'total_students': int(overall_stats['total_students'].iloc[0] or 0),
-            'average_score': float(overall_stats['average_score'].iloc[0] or 0),
-            'high_risk_count': int(overall_stats['high_risk_count'].iloc[0] or 0),
-            'intervention_count': int(intervention_count['intervention_count'].iloc[0] or 0)
-        }
-        
-        return jsonify({
-            'performance_distribution': distribution.to_dict('records'),
-            'risk_distribution': risk_dist.to_dict('records'),
-            'nationality_stats': nationality_stats.to_dict('records'),
-            'intervention_stats': intervention_stats.to_dict('records'),
-            'recent_predictions': recent.to_dict('records'),
+        ''')
+        
+        return json_response({
+            'performance_distribution': distribution,
+            'risk_distribution': risk_dist,
+            'nationality_stats': nationality_stats,
+            'intervention_stats': intervention_stats,
+            'recent_predictions': recent,
             'summary': summary,
             'empty': False
         })
@@ -612,27 +830,41 @@ def get_dashboard_analytics():
             'demo': True
         })
 
+INTERVENTIONS_QUERY = KeysetQuery(
+    'i.*, s.name as student_name',
+    'interventions i LEFT JOIN students s ON i.student_id = s.id',
+    key=('i.created_at', 'i.id'),
+    filters={'status': 'i.status', 'student_id': 'i.student_id'})
+
 @app.route('/api/interventions', methods=['GET'])
 def get_interventions():
     """Get all interventions"""
     try:
-        conn = sqlite3.connect('database/student_performance.db')
-        interventions = pd.read_sql_query('''
-            SELECT i.*, s.name as student_name 
-            FROM interventions i
-            LEFT JOIN students s ON i.student_id = s.id
-            ORDER BY i.created_at DESC
-            LIMIT 50
-        ''', conn)
-        conn.close()
-        
-        return jsonify({
+        # ?cursor= continues after the previous page's next_cursor;
+        # ?status= and ?student_id= filter the list
+        conn = db.get_connection()
+        interventions, next_cursor = INTERVENTIONS_QUERY.page(
+            conn, request.args, request.args.get('cursor'),
+            page_size(request.args.get('limit')), null='')
+        
+        return json_response({
             'success': True,
-            'interventions': interventions.fillna('').to_dict('records')
+            'interventions': interventions,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         print(f"Interventions error: {e}")
-        return jsonify({'success': False, 'interventions': []})
+        return jsonify({'success': False, 'interventions': [], 'error': str(e)})
+
+@app.route('/api/interventions/export', methods=['GET'])
+def export_interventions():
+    """Stream every (filtered) intervention as NDJSON or CSV"""
+    try:
+        rows = INTERVENTIONS_QUERY.iter_rows(db.get_connection(), dict(request.args), null='')
+        return export_response(rows, request.args.get('format', 'ndjson'), 'interventions')
+    except Exception as e:
+        print(f"Interventions export error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/interventions/create', methods=['POST'])
 def create_intervention():
@@ -640,26 +872,21 @@ def create_intervention():
         data = request.json
         print("Creating intervention:", data)
         
-        conn = sqlite3.connect('database/student_performance.db')
-        c = conn.cursor()
-        
-        c.execute('''INSERT INTO interventions 
-                     (student_id, student_name, intervention_type, title,
-                      description, priority, status, resources, created_at)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (data.get('student_id', 0),
-                   data.get('student_name', 'Unknown'),
-                   data.get('type', 'general'),
-                   data.get('title', 'Untitled Intervention'),
-                   data.get('description', 'No description provided'),
-                   data.get('priority', 3),
-                   data.get('status', 'pending'),
-                   json.dumps(data.get('resources', [])),
-                   datetime.now()))
-        
-        intervention_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        with db.transaction() as conn:
+            c = conn.cursor()
+            
+            c.execute(db.INSERT_INTERVENTION_SQL,
+                      (data.get('student_id', 0),
+                       data.get('student_name', 'Unknown'),
+                       data.get('type', 'general'),
+                       data.get('title', 'Untitled Intervention'),
+                       data.get('description', 'No description provided'),
+                       data.get('priority', 3),
+                       data.get('status', 'pending'),
+                       json.dumps(data.get('resources', [])),
+                       datetime.now()))
+            
+            intervention_id = c.lastrowid
         
         return jsonify({
             'success': True,
@@ -681,15 +908,13 @@ def ai_generate_intervention():
         student_id = data.get('student_id')
         focus_area = data.get('focus_area', 'academic')
         
-        conn = sqlite3.connect('database/student_performance.db')
+        conn = db.get_connection()
         
         # Get student data
-        student = pd.read_sql_query(f'''
+        student = query_dicts(conn, '''
             SELECT * FROM students 
-            WHERE id = {student_id}
-        ''', conn) if student_id else pd.DataFrame()
-        
-        conn.close()
+            WHERE id = ?
+        ''', (student_id,)) if student_id else []
         
         # AI-generated intervention templates
         interventions_templates = {
@@ -726,8 +951,8 @@ def ai_generate_intervention():
         template = interventions_templates.get(focus_area, interventions_templates['academic'])
         
         # Personalize based on student data
-        if not student.empty:
-            student_name = student.iloc[0]['name']
+        if student:
+            student_name = student[0]['name']
             template['title'] = f"{template['title']} for {student_name}"
         
         return jsonify({
@@ -745,12 +970,8 @@ def ai_generate_intervention():
 @app.route('/api/interventions/<int:intervention_id>', methods=['DELETE'])
 def delete_intervention(intervention_id):
     try:
-        conn = sqlite3.connect('database/student_performance.db')
-        c = conn.cursor()
-        
-        c.execute('DELETE FROM interventions WHERE id = ?', (intervention_id,))
-        conn.commit()
-        conn.close()
+        with db.transaction() as conn:
+            conn.execute('DELETE FROM interventions WHERE id = ?', (intervention_id,))
         
         return jsonify({
             'success': True,
@@ -770,17 +991,12 @@ def update_intervention_status(intervention_id):
         data = request.json
         new_status = data.get('status', 'pending')
         
-        conn = sqlite3.connect('database/student_performance.db')
-        c = conn.cursor()
-        
-        c.execute('''UPDATE interventions 
-                     SET status = ?, 
-                         completed_at = CASE WHEN ? = 'completed' THEN ? ELSE NULL END
-                     WHERE id = ?''',
-                  (new_status, new_status, datetime.now(), intervention_id))
-        
-        conn.commit()
-        conn.close()
+        with db.transaction() as conn:
+            conn.execute('''UPDATE interventions 
+                            SET status = ?, 
+                                completed_at = CASE WHEN ? = 'completed' THEN ? ELSE NULL END
+                            WHERE id = ?''',
+                         (new_status, new_status, datetime.now(), intervention_id))
         
         return jsonify({
             'success': True,
@@ -794,47 +1010,55 @@ def update_intervention_status(intervention_id):
             'error': str(e)
         })
 
+STUDENT_FILTERS = {'risk_level': 'risk_level', 'grade': 'predicted_grade'}
+
+STUDENTS_QUERY = KeysetQuery('id, name, predicted_score', 'students',
+                             key=('prediction_date', 'id'), filters=STUDENT_FILTERS)
+
+STUDENT_EXPORT_QUERY = KeysetQuery(
+    '''id, name, gender, nationality, age, english_grade, math_grade, sciences_grade,
+       language_grade, portfolio_rating, coverletter_rating, refletter_rating,
+       predicted_score, predicted_grade, risk_level, confidence, prediction_date''',
+    'students', key=('prediction_date', 'id'), filters=STUDENT_FILTERS)
+
 @app.route('/api/students', methods=['GET'])
 def get_students():
     try:
-        conn = sqlite3.connect('database/student_performance.db')
-        students = pd.read_sql_query('''
-            SELECT id, name, predicted_score 
-            FROM students 
-            ORDER BY prediction_date DESC
-            LIMIT 50
-        ''', conn)
-        conn.close()
-        
-        return jsonify({
+        # ?cursor= continues after the previous page's next_cursor;
+        # ?risk_level= and ?grade= filter the list
+        conn = db.get_connection()
+        students, next_cursor = STUDENTS_QUERY.page(
+            conn, request.args, request.args.get('cursor'),
+            page_size(request.args.get('limit')))
+        
+        return json_response({
             'success': True,
-            'students': students.to_dict('records')
+            'students': students,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         print(f"Students error: {e}")
-        return jsonify({'success': False, 'students': []})
+        return jsonify({'success': False, 'students': [], 'error': str(e)})
+
+@app.route('/api/students/export', methods=['GET'])
+def export_students():
+    """Stream every (filtered) student prediction as NDJSON or CSV"""
+    try:
+        rows = STUDENT_EXPORT_QUERY.iter_rows(db.get_connection(), dict(request.args))
+        return export_response(rows, request.args.get('format', 'ndjson'), 'students')
+    except Exception as e:
+        print(f"Students export error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     try:
-        conn = sqlite3.connect('database/student_performance.db')
-        c = conn.cursor()
-        
-        c.execute('SELECT COUNT(*) FROM students')
-        total = c.fetchone()[0] or 0
-        
-        c.execute('SELECT AVG(predicted_score) FROM students')
-        avg_score = c.fetchone()[0] or 0
-        
-        c.execute('SELECT COUNT(*) FROM interventions')
-        interventions = c.fetchone()[0] or 0
-        
-        conn.close()
+        totals = read_summary_totals(db.get_connection())
         
         return jsonify({
-            'total_predictions': total,
-            'average_score': round(avg_score, 2),
-            'intervention_count': interventions,
+            'total_predictions': totals['total_students'],
+            'average_score': round(totals['average_score'], 2),
+            'intervention_count': totals['intervention_count'],
             'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
     except Exception as e:
@@ -856,16 +1080,64 @@ def test():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/models/timing', methods=['GET'])
+def get_model_timing():
+    """Per-model inference timing and ensemble weights"""
+    if engine is None:
+        return jsonify({'success': False, 'error': 'Models not loaded'})
+    return jsonify({
+        'success': True,
+        'weights': engine.weights,
+        'models': engine.get_timing_stats()
+    })
+
+@app.route('/api/models/cache', methods=['GET'])
+def get_cache_stats():
+    """Prediction cache hit/miss/eviction counters"""
+    return jsonify({
+        'success': True,
+        'cache': prediction_cache.get_stats()
+    })
+
+@app.route('/api/models/batching', methods=['GET'])
+def get_batching_stats():
+    """Micro-batch sizes and queue wait for /api/predict"""
+    return jsonify({
+        'success': True,
+        'batching': micro_batcher.get_stats()
+    })
+
+@app.route('/api/models/outcome', methods=['GET'])
+def get_outcome_model_stats():
+    """Version, metrics and compiled cutoffs of the GPA model, and its batching"""
+    if outcome_predictor is None:
+        return jsonify({'success': False, 'error': 'GPA model not loaded (run model/outcome_export.py)'})
+    return jsonify({
+        'success': True,
+        'model': outcome_predictor.get_stats(),
+        'batching': outcome_batcher.get_stats()
+    })
+
+@app.route('/api/db/write-queue', methods=['GET'])
+def get_write_queue_stats():
+    """Write-behind queue depth, batch sizes and write timings"""
+    return jsonify({
+        'success': True,
+        'write_queue': write_queue.get_stats()
+    })
+
 @app.route('/api/reset-database', methods=['POST'])
 def reset_database():
     try:
-        import sqlite3
-        conn = sqlite3.connect('database/student_performance.db')
-        conn.close()
+        # Land queued rows in the old file, and don't hand out ids from a
+        # block reserved in it
+        write_queue.flush()
+        id_allocator.reset()
+        db.close_all()
         
-        import os
-        if os.path.exists('database/student_performance.db'):
-            os.remove('database/student_performance.db')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db.DB_PATH + suffix):
+                os.remove(db.DB_PATH + suffix)
         
         init_db()
         
@@ -898,10 +1170,16 @@ if __name__ == '__main__':
     print("\nAvailable endpoints:")
     print("  GET  /                         - Main application")
     print("  POST /api/predict              - Make prediction")
+    print("  POST /api/predict/batch        - Batch prediction (JSON/CSV)")
+    print("  POST /api/predict/gpa          - GPA and GradeClass (JSON/CSV)")
     print("  GET  /api/analytics/dashboard  - Dashboard data")
     print("  GET  /api/interventions        - Get interventions")
     print("  GET  /api/students             - Get students")
     print("  GET  /api/stats                - Basic stats")
+    print("  GET  /api/models/timing        - Per-model inference timing")
+    print("  GET  /api/models/batching      - Micro-batching stats")
+    print("  GET  /api/models/outcome       - GPA model version and stats")
+    print("  GET  /api/db/write-queue       - Write-behind queue stats")
     print("  GET  /api/test                 - Test endpoint")
     print("="*60 + "\n")
     
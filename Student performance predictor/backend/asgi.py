@@ -0,0 +1,156 @@
+"""ASGI entry point: the Flask routes behind async handlers and bounded executors
+
+Requests are dispatched through the Flask app from app.py (same views,
+hooks and error handling), so responses are identical to the Flask
+server. What changes is where they run:
+
+    inference executor   /api/predict, /api/predict/batch, /api/predict/gpa
+                         (INFERENCE_WORKERS threads, default 1)
+    database executor    dashboard, listings, stats and intervention
+                         writes (DB_WORKERS threads, default 4, each with
+                         its own pooled SQLite connection from db.py)
+    export threads       one short-lived thread per NDJSON/CSV export, so
+                         the cursor is read on the thread that opened it
+    event loop           the frontend's static files (StaticFiles)
+
+The event loop only parses requests and awaits those executors, so a
+single worker keeps answering dashboard reads while predictions are in
+flight. At most MAX_PENDING_PREDICTIONS predictions may be running or
+queued; beyond that /api/predict answers 503 right away instead of
+piling up latency. Concurrent predictions are coalesced into one model
+pass by micro_batch.py, so raising INFERENCE_WORKERS lets larger batches
+form (see MICRO_BATCH_MAX_SIZE).
+
+Usage (from the backend directory):
+    uvicorn asgi:app --port 5000
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from werkzeug.test import EnvironBuilder
+
+import app as backend
+
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 1))
+DB_WORKERS = int(os.environ.get('DB_WORKERS', 4))
+MAX_PENDING_PREDICTIONS = int(os.environ.get('MAX_PENDING_PREDICTIONS', 64))
+
+inference_executor = ThreadPoolExecutor(INFERENCE_WORKERS, thread_name_prefix='inference')
+db_executor = ThreadPoolExecutor(DB_WORKERS, thread_name_prefix='db')
+_pending_predictions = 0
+
+async def _build_environ(request):
+    body = await request.body()
+    return EnvironBuilder(path=request.url.path, method=request.method,
+                          query_string=request.url.query, headers=list(request.headers.items()),
+                          data=body).get_environ()
+
+def _open(environ):
+    # Runs on an executor thread. Dispatching through Flask (routing,
+    # flask-cors hooks, error handling) keeps responses identical to app.py
+    context = backend.app.request_context(environ)
+    context.push()
+    try:
+        response = backend.app.full_dispatch_request()
+    except Exception as e:
+        response = backend.app.handle_exception(e)
+    return context, response
+
+def _dispatch(environ):
+    context, response = _open(environ)
+    try:
+        return response.status_code, response.headers, response.get_data()
+    finally:
+        response.close()
+        context.pop()
+
+async def dispatch(executor, request):
+    """Handle a request with the Flask app on executor"""
+    environ = await _build_environ(request)
+    loop = asyncio.get_running_loop()
+    status, headers, body = await loop.run_in_executor(executor, _dispatch, environ)
+    return Response(body, status_code=status, headers=dict(headers))
+
+async def dispatch_stream(request):
+    """Handle a streaming (export) request, reading every chunk on one thread"""
+    environ = await _build_environ(request)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(1, thread_name_prefix='export')
+    context, response = await loop.run_in_executor(executor, _open, environ)
+    chunks = iter(response.response)
+
+    def close():
+        response.close()
+        context.pop()
+
+    async def body():
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await loop.run_in_executor(executor, close)
+            executor.shutdown(wait=False)
+
+    return StreamingResponse(body(), status_code=response.status_code,
+                             headers=dict(response.headers))
+
+async def inference_endpoint(request):
+    global _pending_predictions
+    if _pending_predictions >= MAX_PENDING_PREDICTIONS:
+        return JSONResponse({'success': False,
+                             'error': 'Too many predictions in progress, retry shortly'},
+                            status_code=503)
+    _pending_predictions += 1
+    try:
+        return await dispatch(inference_executor, request)
+    finally:
+        _pending_predictions -= 1
+
+async def db_endpoint(request):
+    return await dispatch(db_executor, request)
+
+async def get_executor_stats(request):
+    return JSONResponse({
+        'success': True,
+        'inference_workers': INFERENCE_WORKERS,
+        'db_workers': DB_WORKERS,
+        'pending_predictions': _pending_predictions,
+        'max_pending_predictions': MAX_PENDING_PREDICTIONS
+    })
+
+routes = [
+    # Model inference
+    Route('/api/predict', inference_endpoint, methods=['POST', 'OPTIONS']),
+    Route('/api/predict/batch', inference_endpoint, methods=['POST', 'OPTIONS']),
+    Route('/api/predict/gpa', inference_endpoint, methods=['POST', 'OPTIONS']),
+    # Exports stream rows from a cursor
+    Route('/api/students/export', dispatch_stream, methods=['GET']),
+    Route('/api/interventions/export', dispatch_stream, methods=['GET']),
+    Route('/api/executors', get_executor_stats, methods=['GET']),
+    # Dashboard, listings, stats, intervention writes and the rest of /api
+    Route('/api/{path:path}', db_endpoint,
+          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']),
+    Mount('/', StaticFiles(directory=backend.app.static_folder, html=True, check_dir=False))
+]
+
+@asynccontextmanager
+async def lifespan(app):
+    os.makedirs('model', exist_ok=True)
+    os.makedirs('database', exist_ok=True)
+    backend.init_db()
+    backend.load_models()
+    yield
+    backend.write_queue.close()
+    inference_executor.shutdown(wait=True)
+    db_executor.shutdown(wait=True)
+
+app = Starlette(routes=routes, lifespan=lifespan)
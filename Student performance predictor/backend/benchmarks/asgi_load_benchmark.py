@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Load test: Flask dev server vs the ASGI entry point (asgi.py)
+
+Starts each server on a copy of the database, then runs prediction
+clients and dashboard clients against it concurrently. Reports
+throughput and latency per endpoint, so the dashboard numbers show how
+well reads are served while predictions are in flight.
+
+Usage (from the backend directory):
+    python benchmarks/asgi_load_benchmark.py [--predict-clients 8] [--dashboard-clients 4] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FLASK_COMMAND = ('import app; app.init_db(); app.load_models(); '
+                 'app.app.run(port={port}, threaded=True)')
+
+def server_command(mode, port):
+    if mode == 'flask':
+        return [sys.executable, '-c', FLASK_COMMAND.format(port=port)]
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+            '--log-level', 'warning']
+
+def wait_until_up(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/stats')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def student(i):
+    return {'name': f'load {i}', 'english_grade': 1 + (i % 40) / 10, 'math_grade': 3.0,
+            'sciences_grade': 3.5, 'language_grade': 2.5, 'portfolio_rating': 1 + i % 5,
+            'coverletter_rating': 3, 'refletter_rating': 4, 'age': 18 + i % 8, 'gender': 'F'}
+
+def client(port, kind, stop_at, results, seed):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    latencies, errors, i = [], 0, seed * 100000
+    while time.perf_counter() < stop_at:
+        i += 1
+        start = time.perf_counter()
+        try:
+            if kind == 'predict':
+                # Distinct inputs, so the prediction cache doesn't hide the model cost
+                conn.request('POST', '/api/predict', json.dumps(student(i)),
+                             {'Content-Type': 'application/json'})
+            else:
+                conn.request('GET', '/api/analytics/dashboard')
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    results.append((kind, latencies, errors))
+
+def run(mode, port, predict_clients, dashboard_clients, seconds, workdir):
+    env = dict(os.environ, PREDICTION_CACHE_SIZE='0')
+    log = open(os.path.join(workdir, f'{mode}.log'), 'w')
+    server = subprocess.Popen(server_command(mode, port), cwd=workdir, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(port)
+        results = []
+        stop_at = time.perf_counter() + seconds
+        threads = [threading.Thread(target=client, args=(port, 'predict', stop_at, results, i))
+                   for i in range(predict_clients)]
+        threads += [threading.Thread(target=client, args=(port, 'dashboard', stop_at, results, 0))
+                    for _ in range(dashboard_clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+
+    print(f"\n{mode}:")
+    for kind in ('predict', 'dashboard'):
+        latencies = [v for k, values, _ in results if k == kind for v in values]
+        errors = sum(e for k, _, e in results if k == kind)
+        values = np.array(latencies) if latencies else np.zeros(1)
+        print(f"  {kind:<9} req/s {len(latencies) / seconds:>8.1f}   "
+              f"p50 {np.percentile(values, 50):>8.2f} ms   p99 {np.percentile(values, 99):>8.2f} ms   "
+              f"errors {errors}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--predict-clients', type=int, default=8)
+    parser.add_argument('--dashboard-clients', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--modes', default='flask,asgi')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Servers run on a copy so the benchmark never writes to the real database
+        workdir = os.path.join(tmp, 'backend')
+        shutil.copytree(BACKEND_DIR, workdir,
+                        ignore=shutil.ignore_patterns('__pycache__', 'feature_store', 'search',
+                                                      'schools'))
+        for port, mode in enumerate(args.modes.split(','), start=5601):
+            run(mode, port, args.predict_clients, args.dashboard_clients, args.seconds, workdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Concurrent predict writes + dashboard reads against SQLite
+
+Compares the old per-request connections (rollback journal) with the pooled
+WAL connections from db.py. Runs against a temporary copy of the schema.
+
+Usage (from the backend directory):
+    python benchmarks/db_concurrency_benchmark.py [--writers 4] [--readers 8] [--seconds 10]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+
+DASHBOARD_QUERIES = [
+    'SELECT COUNT(*) FROM students',
+    '''SELECT risk_level, COUNT(*) FROM students GROUP BY risk_level''',
+    '''SELECT nationality, COUNT(*), AVG(predicted_score), AVG(confidence)
+       FROM students GROUP BY nationality ORDER BY 3 DESC LIMIT 10''',
+    '''SELECT intervention_type, COUNT(*), AVG(priority)
+       FROM interventions GROUP BY intervention_type''',
+    '''SELECT name, predicted_score, predicted_grade, risk_level
+       FROM students ORDER BY prediction_date DESC LIMIT 10''',
+    'SELECT COUNT(*) FROM interventions'
+]
+
+RISKS = ['Low', 'Medium', 'High', 'Critical']
+
+def student_row(rng):
+    score = float(rng.uniform(40, 100))
+    return ('bench', 'F', str(rng.choice(['China', 'India', 'Germany'])), 21,
+            3.0, 3.0, 3.0, 3.0, 3, 3, 3, score, 'C', str(rng.choice(RISKS)),
+            80.0, '[]', datetime.now())
+
+def intervention_rows(student_id):
+    return [(student_id, 'bench', 'academic_support', 'Tutoring', 'Weekly tutoring',
+             1, 'pending', json.dumps(['Tutor matching']), datetime.now())
+            for _ in range(3)]
+
+def legacy_write(path, rng):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute(db.INSERT_STUDENT_SQL, student_row(rng))
+    student_id = c.lastrowid
+    for row in intervention_rows(student_id):
+        c.execute(db.INSERT_INTERVENTION_SQL, row)
+    conn.commit()
+    conn.close()
+
+def legacy_read(path, rng):
+    conn = sqlite3.connect(path)
+    for query in DASHBOARD_QUERIES:
+        conn.execute(query).fetchall()
+    conn.close()
+
+def pooled_write(path, rng):
+    with db.transaction() as conn:
+        c = conn.cursor()
+        c.execute(db.INSERT_STUDENT_SQL, student_row(rng))
+        c.executemany(db.INSERT_INTERVENTION_SQL, intervention_rows(c.lastrowid))
+
+def pooled_read(path, rng):
+    conn = db.get_connection()
+    for query in DASHBOARD_QUERIES:
+        conn.execute(query).fetchall()
+
+def create_database(path, seed_rows):
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE students
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, gender TEXT,
+                  nationality TEXT, age INTEGER, english_grade REAL, math_grade REAL,
+                  sciences_grade REAL, language_grade REAL, portfolio_rating INTEGER,
+                  coverletter_rating INTEGER, refletter_rating INTEGER,
+                  predicted_score REAL, predicted_grade TEXT, risk_level TEXT,
+                  confidence REAL, recommendations TEXT, prediction_date TIMESTAMP)''')
+    conn.execute('''CREATE TABLE interventions
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INTEGER,
+                  student_name TEXT, intervention_type TEXT, title TEXT,
+                  description TEXT, priority INTEGER, status TEXT, resources TEXT,
+                  created_at TIMESTAMP)''')
+    rng = np.random.RandomState(0)
+    conn.executemany(db.INSERT_STUDENT_SQL, [student_row(rng) for _ in range(seed_rows)])
+    conn.commit()
+    conn.close()
+
+def run(mode, path, writers, readers, seconds):
+    write, read = (legacy_write, legacy_read) if mode == 'legacy' else (pooled_write, pooled_read)
+    latencies = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker(kind, fn, seed):
+        rng = np.random.RandomState(seed)
+        local_latencies, local_errors = [], 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                fn(path, rng)
+                local_latencies.append((time.perf_counter() - start) * 1000)
+            except sqlite3.OperationalError:
+                # e.g. "database is locked"
+                local_errors += 1
+        with lock:
+            latencies[kind].extend(local_latencies)
+            errors[kind] += local_errors
+
+    threads = [threading.Thread(target=worker, args=('write', write, i)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=('read', read, 1000 + i)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"\n{mode}:")
+    for kind in ('write', 'read'):
+        values = np.array(latencies[kind]) if latencies[kind] else np.zeros(1)
+        print(f"  {kind:<5} ops/s {len(latencies[kind]) / seconds:>8.1f}   "
+              f"p50 {np.percentile(values, 50):>7.2f} ms   p99 {np.percentile(values, 99):>8.2f} ms   "
+              f"max {values.max():>8.2f} ms   errors {errors[kind]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--seed-rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('legacy', 'pooled'):
+            path = os.path.join(tmp, f'{mode}.db')
+            create_database(path, args.seed_rows)
+            db.DB_PATH = path
+            run(mode, path, args.writers, args.readers, args.seconds)
+            db.close_all()
+
+if __name__ == '__main__':
+    main()
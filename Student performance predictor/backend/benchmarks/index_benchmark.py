@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Dashboard/listing query latency before and after the index migrations
+
+Builds a temporary database with the original (version 0) schema, fills it
+with synthetic rows, times the queries from migrations.QUERY_PLAN_CHECKS,
+applies the migrations and times them again.
+
+Usage (from the backend directory):
+    python benchmarks/index_benchmark.py [--students 1000000] [--interventions 2000000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+import migrations
+
+NATIONALITIES = ['United States', 'China', 'India', 'Germany', 'France', 'Brazil',
+                 'Nigeria', 'Japan', 'Mexico', 'Canada', 'Spain', 'Italy']
+RISKS = ['Low', 'Medium', 'High', 'Critical']
+TYPES = ['academic_support', 'attendance_monitoring', 'extracurricular_guidance',
+         'application_workshop', 'intensive_intervention']
+
+def create_database(path, n_students, n_interventions, chunk=100000):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    # Schema as created by the original init_db()
+    conn.execute('''CREATE TABLE students
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, gender TEXT,
+                  nationality TEXT, age INTEGER, english_grade REAL, math_grade REAL,
+                  sciences_grade REAL, language_grade REAL, portfolio_rating INTEGER,
+                  coverletter_rating INTEGER, refletter_rating INTEGER,
+                  predicted_score REAL, predicted_grade TEXT, risk_level TEXT,
+                  confidence REAL, recommendations TEXT, prediction_date TIMESTAMP)''')
+    conn.execute('''CREATE TABLE interventions
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INTEGER,
+                  student_name TEXT, intervention_type TEXT, title TEXT,
+                  description TEXT, priority INTEGER, status TEXT, resources TEXT,
+                  created_at TIMESTAMP,
+                  FOREIGN KEY (student_id) REFERENCES students (id))''')
+
+    rng = np.random.RandomState(0)
+    start = datetime(2024, 1, 1)
+    for offset in range(0, n_students, chunk):
+        n = min(chunk, n_students - offset)
+        scores = rng.uniform(30, 100, n)
+        minutes = rng.randint(0, 60 * 24 * 365, n)
+        rows = [(f'Student {offset + i}', 'F', NATIONALITIES[rng.randint(len(NATIONALITIES))], 21,
+                 3.0, 3.0, 3.0, 3.0, 3, 3, 3, float(scores[i]), 'C', RISKS[rng.randint(4)],
+                 float(rng.uniform(30, 100)), '[]', start + timedelta(minutes=int(minutes[i])))
+                for i in range(n)]
+        conn.executemany(db.INSERT_STUDENT_SQL, rows)
+    for offset in range(0, n_interventions, chunk):
+        n = min(chunk, n_interventions - offset)
+        student_ids = rng.randint(1, n_students + 1, n)
+        minutes = rng.randint(0, 60 * 24 * 365, n)
+        rows = [(int(student_ids[i]), 'Student', TYPES[rng.randint(len(TYPES))], 'Title',
+                 'Description', int(rng.randint(1, 4)), 'pending', '[]',
+                 start + timedelta(minutes=int(minutes[i])))
+                for i in range(n)]
+        conn.executemany(db.INSERT_INTERVENTION_SQL, rows)
+    conn.commit()
+    conn.close()
+
+def time_queries(conn, repeat):
+    timings = {}
+    for name, query, _ in migrations.QUERY_PLAN_CHECKS:
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(query).fetchall()
+            runs.append((time.perf_counter() - t0) * 1000)
+        timings[name] = min(runs)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=1000000)
+    parser.add_argument('--interventions', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        t0 = time.perf_counter()
+        create_database(path, args.students, args.interventions)
+        print(f"Created {args.students:,} students / {args.interventions:,} interventions "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+        db.DB_PATH = path
+        conn = db.get_connection()
+        # The effectiveness_score column is needed by one query; add it alone first
+        migrations._add_intervention_columns(conn)
+        conn.commit()
+        before = time_queries(conn, args.repeat)
+
+        t0 = time.perf_counter()
+        migrations.migrate(conn)
+        print(f"Migrations applied in {time.perf_counter() - t0:.1f}s\n")
+        after = time_queries(conn, args.repeat)
+
+        print(f"{'query':<30} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        print("-" * 62)
+        for name in before:
+            print(f"{name:<30} {before[name]:>10.2f} {after[name]:>10.2f} "
+                  f"{before[name] / max(after[name], 1e-6):>7.1f}x")
+
+        print()
+        for name, plan, ok in migrations.check_query_plans(conn):
+            print(f"{'✓' if ok else '✗'} {name}: {plan}")
+        db.close_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Concurrent single-row scoring: one model pass per request vs micro-batching
+
+N request threads each score a 1-row feature matrix as fast as they can,
+either calling score_features directly (as /api/predict did) or through
+MicroBatcher. Reports throughput, latency and the batch-size histogram
+for each batching window.
+
+Usage (from the backend directory):
+    python benchmarks/micro_batch_benchmark.py [--threads 16] [--seconds 5] [--waits 0,1,2,5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+from micro_batch import MicroBatcher
+
+def run(label, score, rows, n_threads, seconds):
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker(seed):
+        local, i = [], seed
+        while time.perf_counter() < stop_at:
+            i = (i + n_threads) % len(rows)
+            start = time.perf_counter()
+            score(rows[i:i + 1])
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    values = np.array(latencies)
+    print(f"  {label:<22} req/s {len(values) / seconds:>8.1f}   p50 {np.percentile(values, 50):>7.2f} ms   "
+          f"p99 {np.percentile(values, 99):>7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--waits', default='0,1,2,5', help='MICRO_BATCH_WAIT_MS values to try')
+    args = parser.parse_args()
+
+    app.load_models()
+    rng = np.random.RandomState(0)
+    # Distinct raw feature rows around the training distribution
+    rows = app.scaler.inverse_transform(rng.normal(size=(4096, len(app.feature_columns))))
+
+    print(f"\n{args.threads} threads, models: {', '.join(app.models)}")
+    run('direct', app.score_features, rows, args.threads, args.seconds)
+    for wait_ms in (float(w) for w in args.waits.split(',')):
+        batcher = MicroBatcher(app.score_features, max_batch_size=args.max_batch,
+                               max_wait_ms=wait_ms)
+        run(f'batched, wait {wait_ms:g} ms', batcher.score, rows, args.threads, args.seconds)
+        stats = batcher.get_stats()
+        histogram = ', '.join(f'{k}: {v}' for k, v in stats['requests_per_batch_histogram'].items() if v)
+        print(f"    avg batch {stats['avg_requests_per_batch']}, queue wait p50 "
+              f"{stats['queue_wait_ms']['p50']} ms p99 {stats['queue_wait_ms']['p99']} ms")
+        print(f"    histogram {histogram}")
+
+if __name__ == '__main__':
+    main()
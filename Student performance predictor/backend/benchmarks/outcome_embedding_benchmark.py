@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Notebook PCA + t-SNE vs the landmark maps of model/outcome_embedding.py
+
+Builds N-student sets by resampling the training split of
+Student_performance_data.csv (transformed by the notebook's
+full_pipeline), then times the notebook's cells, PCA(0.95) and t-SNE on
+the first 1000 rows (and on every row, up to --exact-max rows), against
+embed() on every row, cold and cached, and cohorts() on top. Map quality
+is sklearn's trustworthiness (10 neighbours) on 1000 mapped rows.
+
+Usage (from the backend directory):
+    python benchmarks/outcome_embedding_benchmark.py [--rows 1913,20000,100000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.outcome_data import DATA_PATH, prepare
+from model.outcome_embedding import cohorts, embed
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def quality(X, mapped, rows):
+    from sklearn.manifold import trustworthiness
+    return trustworthiness(X[rows], mapped[rows], n_neighbors=10)
+
+def main():
+    from sklearn.decomposition import PCA
+    from sklearn.manifold import TSNE
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--rows', default='1913,20000,100000')
+    parser.add_argument('--exact-max', type=int, default=2000,
+                        help='largest set to also run exact-size t-SNE on')
+    args = parser.parse_args()
+
+    data = prepare(args.data)
+    source, source_cls = data['X_train_processed'], data['y_train_cls']
+    rng = np.random.RandomState(0)
+
+    for n_rows in (int(n) for n in args.rows.split(',')):
+        rows = np.arange(n_rows) if n_rows == len(source) else rng.randint(0, len(source), n_rows)
+        X, strata = source[rows], source_cls[rows]
+        sample = rng.choice(n_rows, min(1000, n_rows), replace=False)
+        print(f"\n{n_rows:,} students")
+
+        _, elapsed = timed(PCA(n_components=0.95, random_state=42).fit_transform, X)
+        print(f"  notebook PCA(0.95)              {elapsed:>7.2f}s")
+        head = min(1000, n_rows)
+        mapped, elapsed = timed(TSNE(n_components=2, random_state=42, perplexity=30).fit_transform,
+                                X[:head])
+        print(f"  notebook t-SNE, first {head} rows {elapsed:>7.2f}s   "
+              f"trustworthiness {quality(X[:head], mapped, np.arange(head)):.3f}  "
+              f"({n_rows - head:,} rows unmapped)")
+        if n_rows <= args.exact_max:
+            mapped, elapsed = timed(TSNE(n_components=2, random_state=42,
+                                         perplexity=30).fit_transform, X)
+            print(f"  t-SNE on every row              {elapsed:>7.2f}s   "
+                  f"trustworthiness {quality(X, mapped, sample):.3f}")
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            embedding, elapsed = timed(embed, X, strata, cache_dir=cache_dir)
+            print(f"  embed, every row                {elapsed:>7.2f}s   "
+                  f"trustworthiness {quality(X, embedding['map'], sample):.3f}")
+            _, elapsed = timed(embed, X, strata, cache_dir=cache_dir)
+            print(f"  embed, cached                   {elapsed:>7.2f}s")
+        _, elapsed = timed(cohorts, embedding, X, n_clusters=8)
+        print(f"  cohorts (8 clusters)            {elapsed:>7.2f}s")
+
+if __name__ == '__main__':
+    main()
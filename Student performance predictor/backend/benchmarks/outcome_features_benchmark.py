@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Notebook engineer_features vs the one-pass float32 version (model/outcome_features.py)
+
+Builds N-row frames by resampling Student_performance_data.csv, then
+times the notebook's column-by-column pandas version (applied to the
+frame passed in; the notebook's copy reads its global df) against
+engineer_matrix, and reports the peak memory each allocates
+(tracemalloc). With --csv the frame is also written to a CSV and
+engineered through engineer_csv in chunks, cold and then memoized.
+
+Usage (from the backend directory):
+    python benchmarks/outcome_features_benchmark.py [--rows 1000000,10000000] [--csv]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.outcome_data import DATA_PATH, ID_COLUMN, TARGET_CLS, TARGET_REG
+from model.outcome_features import (ENGINEERED_FEATURES, INPUT_COLUMNS, engineer_csv,
+                                    engineer_matrix)
+
+def notebook_engineer_features(X):
+    """Cell 8 of the notebook, with X.copy() in place of df.copy()"""
+    X = X.copy()
+    X['TotalExtracurricular'] = X[['Extracurricular', 'Sports', 'Music', 'Volunteering']].sum(axis=1)
+    X['StudyEfficiency'] = X['StudyTimeWeekly'] / (X['Absences'] + 1)
+    X['SupportScore'] = X['ParentalSupport'] * X['ParentalEducation'] / 4.0
+
+    X['TutoringImpact'] = X['Tutoring'] * X['StudyTimeWeekly'] / 10.0
+    X['Study_ParentSupport'] = X['StudyTimeWeekly'] * X['ParentalSupport']
+    X['Age_Study'] = X['Age'] * X['StudyTimeWeekly']
+
+    X['Absence_Performance'] = X['Absences'] * X['ParentalEducation']
+    X['Tutoring_Support'] = X['Tutoring'] * X['ParentalSupport']
+
+    X['StudyTime_squared'] = X['StudyTimeWeekly'] ** 2
+    X['Absences_squared'] = X['Absences'] ** 2
+    X['StudyTime_sqrt'] = np.sqrt(X['StudyTimeWeekly'] + 0.1)
+    X['Absences_log'] = np.log1p(X['Absences'])
+
+    return X
+
+def synthetic_frame(source, n_rows, seed=0):
+    """n_rows resampled from the source data, with the source's dtypes"""
+    df = pd.read_csv(source).drop(columns=[ID_COLUMN, TARGET_REG, TARGET_CLS])
+    rows = np.random.RandomState(seed).randint(0, len(df), n_rows)
+    return pd.DataFrame({name: df[name].to_numpy()[rows] for name in df.columns})
+
+def measure(fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=DATA_PATH)
+    parser.add_argument('--rows', default='1000000,10000000')
+    parser.add_argument('--csv', action='store_true', help='also benchmark chunked CSV input')
+    args = parser.parse_args()
+
+    for n_rows in (int(n) for n in args.rows.split(',')):
+        X = synthetic_frame(args.source, n_rows)
+        print(f"\n{n_rows:,} rows ({X.memory_usage().sum() / 1e6:.0f} MB input)")
+
+        matrix, elapsed, peak = measure(engineer_matrix, X)
+        print(f"  engineer_matrix      {elapsed:>7.2f}s   peak alloc {peak:>7.0f} MB")
+        expected, elapsed, peak = measure(notebook_engineer_features, X)
+        print(f"  notebook (pandas)    {elapsed:>7.2f}s   peak alloc {peak:>7.0f} MB")
+        # Checked on the first million rows, to keep the float64 copies small
+        reference = expected[ENGINEERED_FEATURES].iloc[:1_000_000].to_numpy()
+        error = np.abs(matrix[:1_000_000, len(INPUT_COLUMNS):] - reference)
+        scale = np.abs(reference).max(axis=0)
+        print(f"  max abs error (float32 vs float64), relative to column max: "
+              f"{(error.max(axis=0) / scale).max():.1e}")
+        del expected, matrix, reference, error
+
+        if args.csv:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'students.csv')
+                X.to_csv(path, index=False)
+                del X
+                for label in ('cold', 'memoized'):
+                    result, elapsed, peak = measure(engineer_csv, path, os.path.join(tmp, 'cache'))
+                    print(f"  engineer_csv {label:<8}{elapsed:>7.2f}s   peak alloc {peak:>7.0f} MB")
+                    del result
+        else:
+            del X
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""GPA/GradeClass scoring (outcome_service.py) vs the /api/predict model pass
+
+Times the scoring functions behind the two endpoints in-process:
+app.score_features for /api/predict and OutcomePredictor.score for
+/api/predict/gpa, the latter with the native sklearn path and with the
+auto (compiled up to the warm-up crossover) path. Reports single-client
+latency, throughput of N concurrent single-row clients behind
+MicroBatcher, and rows/s on one large batch.
+
+Usage (from the backend directory, after model/outcome_export.py):
+    python benchmarks/outcome_serving_benchmark.py [--threads 16] [--seconds 5] [--batch 1000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+from micro_batch import MicroBatcher
+from model.outcome_data import DATA_PATH
+from outcome_service import OutcomePredictor
+
+def concurrent(score, rows, n_threads, seconds):
+    """req/s and p50/p99 latency of n_threads clients scoring one row each"""
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker(seed):
+        local, i = [], seed
+        while time.perf_counter() < stop_at:
+            i = (i + n_threads) % len(rows)
+            start = time.perf_counter()
+            score(rows[i:i + 1])
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    values = np.array(latencies)
+    return len(values) / seconds, np.percentile(values, 50), np.percentile(values, 99)
+
+def batch_rows_per_second(score, rows, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        score(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    app.load_models()
+    rng = np.random.RandomState(0)
+    # Distinct raw feature rows around the training distribution
+    score_rows = app.scaler.inverse_transform(rng.normal(size=(4096, len(app.feature_columns))))
+
+    auto = app.outcome_predictor or OutcomePredictor.load()
+    native = OutcomePredictor(auto.artifact, backend='native')
+    native.warm_up()
+    students = pd.read_csv(args.data)
+    gpa_rows = auto.features(students.iloc[rng.randint(0, len(students), 4096)])
+    print(f"\nGPA model {auto.version}, compiled up to "
+          f"{auto.get_stats()['compiled_max_rows']} rows")
+
+    paths = [('/api/predict', app.score_features, score_rows),
+             ('/api/predict/gpa native', native.score, gpa_rows),
+             ('/api/predict/gpa auto', auto.score, gpa_rows)]
+    print(f"\n{'':<26}{'1 client':>18}{f'{args.threads} clients, batched':>34}"
+          f"{f'{args.batch}-row batch':>18}")
+    for label, score, rows in paths:
+        rate, p50, _ = concurrent(score, rows, 1, args.seconds)
+        batcher = MicroBatcher.from_env(score)
+        batched_rate, _, batched_p99 = concurrent(batcher.score, rows, args.threads, args.seconds)
+        rows_per_second = batch_rows_per_second(score, rows[:args.batch])
+        print(f"  {label:<24}{rate:>8.0f} req/s {p50:>5.2f} ms"
+              f"{batched_rate:>12.0f} req/s p99 {batched_p99:>6.2f} ms"
+              f"{rows_per_second:>12.0f} rows/s")
+
+if __name__ == '__main__':
+    main()
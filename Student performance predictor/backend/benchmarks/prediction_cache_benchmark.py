@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""/api/predict scoring latency with and without the prediction cache
+
+Replays a synthetic request stream shaped like production traffic: some
+requests are exact resubmits of a recent one, some change one field of a
+recent one (a counselor trying "what if"), the rest are new students.
+Grades use 0.1 steps and ratings are integers, as in the form.
+
+Usage (from the backend directory):
+    python benchmarks/prediction_cache_benchmark.py [--requests 5000] [--repeat-rate 0.3]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+import app as backend
+from prediction_cache import PredictionCache
+
+GRADE_FIELDS = ['english_grade', 'math_grade', 'sciences_grade', 'language_grade']
+RATING_FIELDS = ['portfolio_rating', 'coverletter_rating', 'refletter_rating']
+
+def random_student(rng):
+    student = {field: round(float(rng.uniform(1, 5)), 1) for field in GRADE_FIELDS}
+    student.update({field: int(rng.randint(1, 6)) for field in RATING_FIELDS})
+    student['age'] = int(rng.randint(18, 26))
+    student['gender'] = str(rng.choice(['M', 'F']))
+    return student
+
+def request_stream(n, repeat_rate, tweak_rate, recent=200, seed=0):
+    rng = np.random.RandomState(seed)
+    history = []
+    for _ in range(n):
+        r = rng.uniform()
+        if history and r < repeat_rate:
+            student = dict(history[rng.randint(max(0, len(history) - recent), len(history))])
+        elif history and r < repeat_rate + tweak_rate:
+            student = dict(history[rng.randint(max(0, len(history) - recent), len(history))])
+            field = str(rng.choice(GRADE_FIELDS + RATING_FIELDS))
+            if field in GRADE_FIELDS:
+                student[field] = round(min(5.0, max(1.0, student[field] + rng.choice([-0.1, 0.1]))), 1)
+            else:
+                student[field] = int(min(5, max(1, student[field] + rng.choice([-1, 1]))))
+        else:
+            student = random_student(rng)
+        history.append(student)
+        yield student
+
+def feature_vector(data):
+    features = backend.calculate_features(data)
+    return np.array([[features.get(name, 0) for name in backend.feature_columns]])
+
+def replay(requests, cache):
+    """Per-request latency in ms and whether each request was a cache hit"""
+    latencies, hits = [], []
+    for data in requests:
+        t0 = time.perf_counter()
+        X = feature_vector(data)
+        if cache is None:
+            backend.score_features(X)
+            n_hits = 0
+        else:
+            _, _, n_hits = cache.predict(backend.score_features, X)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits.append(n_hits > 0)
+    return np.array(latencies), np.array(hits)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--repeat-rate', type=float, default=0.3)
+    parser.add_argument('--tweak-rate', type=float, default=0.3)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    backend.load_models()
+    requests = list(request_stream(args.requests, args.repeat_rate, args.tweak_rate))
+    replay(requests[:50], None)  # warm-up
+
+    uncached, _ = replay(requests, None)
+    cache = PredictionCache(max_size=args.cache_size, ttl=3600)
+    cached, hits = replay(requests, cache)
+
+    print(f"\n{args.requests} requests, repeat rate {args.repeat_rate}, "
+          f"tweak rate {args.tweak_rate}\n")
+    print(f"{'':<10} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    rows = [('no cache', uncached), ('cache', cached),
+            ('  hits', cached[hits]), ('  misses', cached[~hits])]
+    for name, latencies in rows:
+        print(f"{name:<10} {latencies.mean():>8.3f} {np.percentile(latencies, 50):>8.3f} "
+              f"{np.percentile(latencies, 99):>8.3f}")
+    print(f"\nSpeedup (mean): {uncached.mean() / cached.mean():.2f}x")
+    print(f"Cache stats: {cache.get_stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Per-worker memory of gunicorn serving, with and without preload_app
+
+For each worker count N, starts gunicorn (gunicorn.conf.py) on a copy of
+the backend, sends predictions until every worker has served some, then
+reads /proc/<pid>/smaps_rollup of the master and each worker. Reports
+the mean unique set size per worker (Private_Clean + Private_Dirty, the
+memory only that worker pays for), the mean RSS, and the total PSS of
+the server, with models loaded per worker (PRELOAD_APP=0) and once in
+the master (PRELOAD_APP=1). Linux only.
+
+Usage (from the backend directory):
+    python benchmarks/prefork_memory.py [--workers 1-16] [--requests-per-worker 20]
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_counts(value):
+    """'1-16' or '1,2,4,8' -> list of worker counts"""
+    counts = []
+    for part in value.split(','):
+        if '-' in part:
+            low, high = part.split('-')
+            counts.extend(range(int(low), int(high) + 1))
+        else:
+            counts.append(int(part))
+    return counts
+
+def smaps_rollup(pid):
+    """{field: kB} from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+def predict(port, i):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    body = {'name': f'mem {i}', 'english_grade': 1 + (i % 40) / 10, 'math_grade': 3.0,
+            'sciences_grade': 3.5, 'language_grade': 2.5, 'portfolio_rating': 1 + i % 5,
+            'coverletter_rating': 3, 'refletter_rating': 4, 'age': 18 + i % 8, 'gender': 'F'}
+    conn.request('POST', '/api/predict', json.dumps(body), {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status
+
+def wait_for_workers(master, n_workers, port, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if len(child_pids(master)) == n_workers:
+            try:
+                if predict(port, 0) == 200:
+                    return
+            except OSError:
+                pass
+        time.sleep(0.5)
+    raise RuntimeError(f"gunicorn with {n_workers} workers did not start")
+
+def measure(workdir, n_workers, preload, requests_per_worker, port):
+    env = dict(os.environ, WEB_WORKERS=str(n_workers), WEB_THREADS='1',
+               PRELOAD_APP='1' if preload else '0', BIND=f'127.0.0.1:{port}',
+               PREDICTION_CACHE_SIZE='0')
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'a')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                              cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_for_workers(server.pid, n_workers, port)
+        # One connection per request, so the requests spread over the workers
+        for i in range(n_workers * requests_per_worker):
+            predict(port, i)
+        master = smaps_rollup(server.pid)
+        workers = [smaps_rollup(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+
+    uss = [w['Private_Clean'] + w['Private_Dirty'] for w in workers]
+    return {
+        'worker_uss_mb': sum(uss) / len(uss) / 1024,
+        'worker_rss_mb': sum(w['Rss'] for w in workers) / len(workers) / 1024,
+        'total_pss_mb': (master['Pss'] + sum(w['Pss'] for w in workers)) / 1024
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1-16', help="worker counts, e.g. 1-16 or 1,2,4,8")
+    parser.add_argument('--requests-per-worker', type=int, default=20)
+    parser.add_argument('--port', type=int, default=5701)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Servers run on a copy so the benchmark never writes to the real database
+        workdir = os.path.join(tmp, 'backend')
+        shutil.copytree(BACKEND_DIR, workdir,
+                        ignore=shutil.ignore_patterns('__pycache__', 'feature_store', 'search',
+                                                      'schools'))
+        print(f"{'workers':>7} {'mode':>10} {'unique/worker':>14} {'rss/worker':>11} {'total pss':>10}")
+        for n_workers in parse_counts(args.workers):
+            for preload in (False, True):
+                result = measure(workdir, n_workers, preload, args.requests_per_worker, args.port)
+                print(f"{n_workers:>7} {'preload' if preload else 'per-worker':>10} "
+                      f"{result['worker_uss_mb']:>11.1f} MB {result['worker_rss_mb']:>8.1f} MB "
+                      f"{result['total_pss_mb']:>7.1f} MB", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Scoring latency of table mode vs live ensemble inference
+
+Usage (from the backend directory, after `python score_table.py`):
+    python benchmarks/score_table_benchmark.py [--batch-sizes 1,10,100,1000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+import app as backend
+from features import build_feature_frame
+from score_table import ScoreTable, _random_requests
+
+def time_call(fn, min_seconds=0.5, min_runs=5):
+    """Median wall time of fn() in microseconds"""
+    fn()  # warm-up
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - start < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1e6)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-sizes', default='1,10,100,1000')
+    args = parser.parse_args()
+
+    backend.load_models()
+    table = ScoreTable.load(backend.feature_columns)
+    print(f"\nTable: {table.meta['n_cells']:,} cells, built {table.meta['built_at']}, "
+          f"error vs live: {table.meta['error']}\n")
+
+    rng = np.random.RandomState(0)
+    print(f"{'batch':>6} {'live us':>10} {'table us':>10} {'speedup':>8} {'table us/row':>13}")
+    print("-" * 52)
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        requests = _random_requests(table.meta['axes'], table.meta['offset_axes'], batch_size, rng)
+        features = build_feature_frame(pd.DataFrame(requests), backend.label_encoders)
+        X = features[backend.feature_columns].to_numpy(dtype=float)
+        live_us = time_call(lambda: backend.score_features(X))
+        table_us = time_call(lambda: table.predict(X))
+        print(f"{batch_size:>6} {live_us:>10.1f} {table_us:>10.1f} {live_us / table_us:>7.0f}x "
+              f"{table_us / batch_size:>13.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Read-endpoint serialization: pandas DataFrame vs cursor-to-dict
+
+For the queries behind /api/students, /api/interventions and
+/api/analytics/dashboard, times the old path (pd.read_sql_query +
+to_dict('records') + jsonify) against serialize.query_dicts +
+serialize.json_response, and checks both produce the same bytes.
+
+Usage (from the backend directory):
+    python benchmarks/serialization_benchmark.py [--students 20000] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import db
+import migrations
+from serialize import query_dicts, json_response
+from index_benchmark import create_database
+
+# (sql, null) per query; null='' reproduces .fillna('')
+ENDPOINT_QUERIES = {
+    '/api/students': {
+        'students': ('''SELECT id, name, predicted_score FROM students
+                        ORDER BY prediction_date DESC LIMIT 50''', None)
+    },
+    '/api/interventions': {
+        'interventions': ('''SELECT i.*, s.name as student_name FROM interventions i
+                             LEFT JOIN students s ON i.student_id = s.id
+                             ORDER BY i.created_at DESC LIMIT 50''', '')
+    },
+    '/api/analytics/dashboard': {
+        'performance_distribution': ('''SELECT grade_range, count, score_sum / count as avg_score
+                                        FROM grade_range_stats WHERE count > 0
+                                        ORDER BY avg_score DESC''', None),
+        'risk_distribution': ('''SELECT NULLIF(risk_level, '') as risk_level, count
+                                 FROM risk_stats WHERE count > 0 ORDER BY risk_level''', None),
+        'nationality_stats': ('''SELECT nationality, count, score_sum / count as avg_score,
+                                        confidence_sum / count as avg_confidence
+                                 FROM nationality_stats WHERE count >= 1
+                                 ORDER BY avg_score DESC LIMIT 10''', None),
+        'intervention_stats': ('''SELECT intervention_type, count,
+                                         priority_sum / count as avg_priority
+                                  FROM intervention_type_stats WHERE count > 0
+                                  ORDER BY count DESC''', None),
+        'recent_predictions': ('''SELECT name, predicted_score, predicted_grade, risk_level,
+                                         datetime(prediction_date) as date
+                                  FROM students ORDER BY prediction_date DESC LIMIT 10''', None)
+    }
+}
+
+def pandas_path(conn, queries):
+    payload = {}
+    for key, (sql, null) in queries.items():
+        frame = pd.read_sql_query(sql, conn)
+        if null is not None:
+            frame = frame.fillna(null)
+        payload[key] = frame.to_dict('records')
+    return jsonify(payload).get_data()
+
+def dict_path(conn, queries):
+    payload = {key: query_dicts(conn, sql, null=null) for key, (sql, null) in queries.items()}
+    return json_response(payload).get_data()
+
+def time_call(func, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(runs))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--interventions', type=int, default=40000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    # The interventions query has two student_name columns; pandas warns
+    # about dropping one (the same thing it did in the old endpoint)
+    warnings.simplefilter('ignore', UserWarning)
+    app = Flask(__name__)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        create_database(path, args.students, args.interventions)
+        db.DB_PATH = path
+        conn = db.get_connection()
+        migrations.migrate(conn)
+
+        print(f"{'endpoint':<28} {'pandas ms':>10} {'dicts ms':>10} {'speedup':>8}  same bytes")
+        print("-" * 72)
+        with app.app_context():
+            for endpoint, queries in ENDPOINT_QUERIES.items():
+                same = pandas_path(conn, queries) == dict_path(conn, queries)
+                old = time_call(lambda: pandas_path(conn, queries), args.repeat)
+                new = time_call(lambda: dict_path(conn, queries), args.repeat)
+                print(f"{endpoint:<28} {old:>10.3f} {new:>10.3f} {old / new:>7.1f}x  {same}")
+        db.close_all()
+
+if __name__ == '__main__':
+    main()
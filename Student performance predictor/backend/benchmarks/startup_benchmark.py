@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for each model backend configuration
+
+Each configuration runs in a fresh interpreter that imports app.py and
+calls load_models(). Reports import time, model load time and peak RSS.
+
+Usage (from the backend directory):
+    python benchmarks/startup_benchmark.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = [
+    ('random_forest only', {'ENABLED_MODELS': 'random_forest'}),
+    ('xgboost only', {'ENABLED_MODELS': 'xgboost'}),
+    ('lightgbm only', {'ENABLED_MODELS': 'lightgbm'}),
+    ('tree models', {'ENABLED_MODELS': 'random_forest,xgboost,lightgbm'}),
+    ('neural_network (numpy)', {'ENABLED_MODELS': 'neural_network', 'NEURAL_BACKEND': 'numpy'}),
+    ('neural_network (keras)', {'ENABLED_MODELS': 'neural_network', 'NEURAL_BACKEND': 'keras'}),
+    ('all models (numpy nn)', {'ENABLED_MODELS': '', 'NEURAL_BACKEND': 'numpy'}),
+    ('all models (keras nn)', {'ENABLED_MODELS': '', 'NEURAL_BACKEND': 'keras'}),
+    ('tree models + GPA model', {'ENABLED_MODELS': 'random_forest,xgboost,lightgbm',
+                                 'OUTCOME_MODEL': 'model/outcome/current.json'}),
+]
+
+CHILD_SCRIPT = r'''
+import contextlib, io, json, resource, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    app.load_models()
+loaded = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'load_s': loaded - imported,
+    'models': sorted(app.models),
+    'tensorflow': 'tensorflow' in sys.modules,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+'''
+
+def run_configuration(env_overrides):
+    env = dict(os.environ)
+    # The GPA model (outcome_service.py) is only loaded where a configuration asks for it
+    env['OUTCOME_MODEL'] = ''
+    env.update(env_overrides)
+    env['TF_CPP_MIN_LOG_LEVEL'] = '3'
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=BACKEND_DIR,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per configuration (best is reported)')
+    args = parser.parse_args()
+
+    print(f"{'configuration':<26} {'import s':>9} {'load s':>8} {'total s':>8} {'peak RSS MB':>12}  TF  models")
+    print("-" * 100)
+    for label, env in CONFIGURATIONS:
+        try:
+            runs = [run_configuration(env) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{label:<26} failed: {e}")
+            continue
+        best = min(runs, key=lambda r: r['import_s'] + r['load_s'])
+        total = best['import_s'] + best['load_s']
+        print(f"{label:<26} {best['import_s']:>9.2f} {best['load_s']:>8.2f} {total:>8.2f} "
+              f"{best['peak_rss_mb']:>12.1f}  {'yes' if best['tensorflow'] else 'no':<3} "
+              f"{','.join(best['models'])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Latency/throughput of compiled tree inference vs native predict()
+
+Usage (from the backend directory, after `python model/tree_compiler.py`):
+    python benchmarks/tree_inference_benchmark.py [--batch-sizes 1,10,100,1000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.tree_compiler import CompiledForest, TREE_MODELS
+
+warnings.filterwarnings('ignore')
+
+def time_call(fn, min_seconds=0.5, min_runs=5):
+    """Median wall time of fn() in milliseconds"""
+    fn()  # warm-up
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - start < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(timings))
+
+def predict_native(models, name, X):
+    if name == 'lightgbm':
+        # Keeps LightGBM from logging a warning on every call
+        return models[name].predict(X, verbose=-1)
+    return models[name].predict(X)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-sizes', default='1,10,100,1000,10000')
+    parser.add_argument('--compiled', default='model/compiled_trees.npz')
+    args = parser.parse_args()
+
+    models = {name: joblib.load(f'model/{name}.pkl') for name in TREE_MODELS}
+    compiled = CompiledForest.load(args.compiled)
+    n_features = compiled.n_features
+    rng = np.random.RandomState(0)
+
+    print(f"{compiled.n_trees} trees, {len(compiled.feature)} nodes, max depth {compiled.max_depth}\n")
+    print(f"{'batch':>6} {'native ms':>10} {'compiled ms':>12} {'speedup':>8} "
+          f"{'native rows/s':>14} {'compiled rows/s':>16}")
+    print("-" * 72)
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        X = rng.normal(size=(batch_size, n_features))
+        native_ms = time_call(lambda: [predict_native(models, name, X) for name in TREE_MODELS])
+        compiled_ms = time_call(lambda: compiled.predict_all(X))
+        print(f"{batch_size:>6} {native_ms:>10.3f} {compiled_ms:>12.3f} "
+              f"{native_ms / compiled_ms:>7.1f}x {batch_size / native_ms * 1000:>14.0f} "
+              f"{batch_size / compiled_ms * 1000:>16.0f}")
+
+    print("\nPer model, single row:")
+    X = rng.normal(size=(1, n_features))
+    for name in TREE_MODELS:
+        view = compiled.model_view(name)
+        native_ms = time_call(lambda: predict_native(models, name, X))
+        compiled_ms = time_call(lambda: view.predict(X))
+        print(f"  {name:<14} native {native_ms:.3f} ms, compiled {compiled_ms:.3f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Per-request persist latency: synchronous inserts vs the write-behind queue
+
+N request threads each persist a prediction (one student row plus three
+interventions) as fast as they can, either in their own transaction, as
+/api/predict used to, or by handing the rows to WriteBehindQueue. Runs
+against a temporary database with the current schema.
+
+Usage (from the backend directory):
+    python benchmarks/write_behind_benchmark.py [--threads 8] [--seconds 5] [--synchronous FULL]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+import migrations
+from write_behind import WriteBehindQueue, write_rows
+
+def prediction_rows(student_id, rng):
+    now = datetime.now()
+    student = (student_id, 'bench', 'F', 'Germany', 21, 3.0, 3.0, 3.0, 3.0, 3, 3, 3,
+               float(rng.uniform(40, 100)), 'C', 'Medium', 80.0, '[]', now)
+    interventions = [(student_id, 'bench', 'academic_support', 'Tutoring', 'Weekly tutoring',
+                      1, 'pending', json.dumps(['Tutor matching']), now)
+                     for _ in range(3)]
+    return student, interventions
+
+def create_schema():
+    conn = db.get_connection()
+    conn.execute('''CREATE TABLE students
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, gender TEXT,
+                  nationality TEXT, age INTEGER, english_grade REAL, math_grade REAL,
+                  sciences_grade REAL, language_grade REAL, portfolio_rating INTEGER,
+                  coverletter_rating INTEGER, refletter_rating INTEGER,
+                  predicted_score REAL, predicted_grade TEXT, risk_level TEXT,
+                  confidence REAL, recommendations TEXT, prediction_date TIMESTAMP)''')
+    conn.execute('''CREATE TABLE interventions
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INTEGER,
+                  student_name TEXT, intervention_type TEXT, title TEXT,
+                  description TEXT, priority INTEGER, status TEXT, resources TEXT,
+                  created_at TIMESTAMP)''')
+    conn.commit()
+    migrations.migrate(conn)
+
+def run(mode, n_threads, seconds):
+    allocator = db.IdAllocator('students')
+    write_queue = WriteBehindQueue() if mode == 'write-behind' else None
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = np.random.RandomState(seed)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            student, interventions = prediction_rows(allocator.reserve()[0], rng)
+            if write_queue is None:
+                write_rows([(student, interventions)])
+            else:
+                write_queue.submit(student, interventions)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    drain_start = time.perf_counter()
+    if write_queue is not None:
+        write_queue.close()
+    drain_s = time.perf_counter() - drain_start
+
+    values = np.array(latencies)
+    print(f"\n{mode}:")
+    print(f"  requests/s {len(values) / seconds:>9.1f}   p50 {np.percentile(values, 50):>7.3f} ms   "
+          f"p99 {np.percentile(values, 99):>7.3f} ms   max {values.max():>8.2f} ms")
+    if write_queue is not None:
+        stats = write_queue.get_stats()
+        print(f"  {stats['batches']} transactions, avg batch {stats['avg_batch']}, "
+              f"max batch {stats['max_batch']}, sync fallbacks {stats['sync_writes']}, "
+              f"drain at shutdown {drain_s * 1000:.0f} ms")
+    return len(values)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--synchronous', default='NORMAL', choices=['OFF', 'NORMAL', 'FULL'])
+    args = parser.parse_args()
+
+    db.PRAGMAS = [p for p in db.PRAGMAS if 'synchronous' not in p]
+    db.PRAGMAS.append(f'PRAGMA synchronous={args.synchronous}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, 'bench.db')
+        create_schema()
+        expected = 0
+        for mode in ('synchronous', 'write-behind'):
+            expected += run(mode, args.threads, args.seconds)
+
+        conn = db.get_connection()
+        n_students = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+        n_unique = conn.execute('SELECT COUNT(DISTINCT id) FROM students').fetchone()[0]
+        print(f"\n{n_students} student rows written for {expected} requests "
+              f"({n_unique} distinct ids)")
+        db.close_all()
+
+if __name__ == '__main__':
+    main()
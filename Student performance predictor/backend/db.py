@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+DB_PATH = 'database/student_performance.db'
+
+# Applied to every new connection. WAL lets dashboard readers run while a
+# prediction is being written; synchronous=NORMAL is durable in WAL mode
+# except for the last transactions before a power loss.
+PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',   # 16 MB page cache per connection
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=30000'
+]
+
+# sqlite3 caches compiled statements per connection keyed by SQL text, so
+# long-lived connections plus shared SQL strings reuse prepared statements
+STATEMENT_CACHE_SIZE = 256
+
+INSERT_STUDENT_SQL = '''INSERT INTO students
+                     (name, gender, nationality, age, english_grade, math_grade,
+                      sciences_grade, language_grade, portfolio_rating,
+                      coverletter_rating, refletter_rating, predicted_score,
+                      predicted_grade, risk_level, confidence, recommendations,
+                      prediction_date)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+# Student ids are reserved up front (IdAllocator) so a prediction can
+# return its id before the row is written
+INSERT_STUDENT_WITH_ID_SQL = '''INSERT INTO students
+                             (id, name, gender, nationality, age, english_grade, math_grade,
+                              sciences_grade, language_grade, portfolio_rating,
+                              coverletter_rating, refletter_rating, predicted_score,
+                              predicted_grade, risk_level, confidence, recommendations,
+                              prediction_date)
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+INSERT_INTERVENTION_SQL = '''INSERT INTO interventions
+                         (student_id, student_name, intervention_type, title,
+                          description, priority, status, resources, created_at)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that can be tracked with a weak reference"""
+
+_local = threading.local()
+_connections = weakref.WeakSet()
+_lock = threading.Lock()
+_generation = 0
+
+def _connect():
+    # IMMEDIATE takes the write lock when a write transaction starts, so
+    # concurrent writers wait on busy_timeout instead of failing mid-way
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level='IMMEDIATE',
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=PooledConnection)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def get_connection():
+    """Return this thread's pooled connection, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.generation != _generation:
+        conn = _connect()
+        with _lock:
+            _connections.add(conn)
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+@contextmanager
+def transaction():
+    """Run a block in one transaction on the pooled connection
+
+    Commits on success and rolls back if the block raises.
+    """
+    conn = get_connection()
+    with conn:
+        yield conn
+
+def close_all():
+    """Close every pooled connection (e.g. before deleting the database file)"""
+    global _generation
+    with _lock:
+        _generation += 1
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            # Connections owned by other threads are closed by the GC
+            pass
+    _local.conn = None
+
+class IdAllocator:
+    """Reserves blocks of row ids for a table from the id_blocks table
+
+    A block is claimed in one short transaction, so concurrent processes
+    never hand out the same id, and ids are then issued from memory. Ids
+    left in a block when the process exits are skipped, not reused. Every
+    insert into the table must take its id from here, or an
+    AUTOINCREMENT id could land inside a block that is still in use.
+    """
+    def __init__(self, table='students', block_size=256):
+        self.table = table
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop the current block (e.g. after the database was recreated)"""
+        with self._lock:
+            self._next = self._end = 0
+            self._pid = os.getpid()
+
+    def _reserve_block(self, size):
+        # Never start below the table's current maximum, in case rows were
+        # inserted without an allocator (seed scripts, older code)
+        with transaction() as conn:
+            conn.execute(f'''UPDATE id_blocks SET next_id =
+                                MAX(next_id, (SELECT IFNULL(MAX(id), 0) + 1 FROM {self.table})) + ?
+                            WHERE name = ?''', (size, self.table))
+            end = conn.execute('SELECT next_id FROM id_blocks WHERE name = ?',
+                               (self.table,)).fetchone()[0]
+        return end - size, end
+
+    def reserve(self, count=1):
+        """`count` fresh, consecutive-if-possible ids"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child must not reuse its parent's block
+                self._next = self._end = 0
+                self._pid = os.getpid()
+            ids = []
+            while len(ids) < count:
+                if self._next >= self._end:
+                    self._next, self._end = self._reserve_block(
+                        max(self.block_size, count - len(ids)))
+                take = min(count - len(ids), self._end - self._next)
+                ids.extend(range(self._next, self._next + take))
+                self._next += take
+            return ids
@@ -0,0 +1,92 @@
+import threading
+import time
+import numpy as np
+
+DEFAULT_WEIGHTS = {
+    'random_forest': 0.25,
+    'xgboost': 0.25,
+    'lightgbm': 0.25,
+    'neural_network': 0.25
+}
+
+FALLBACK_SCORE = 70.0
+
+class PredictionEngine:
+    """Runs each base model once per input matrix and derives the ensemble
+
+    The saved EnsembleModel re-runs every base model internally, so calling
+    it next to the base models doubled the work per request. The engine
+    only calls the base learners and computes the weighted ensemble from
+    their cached outputs.
+    """
+    def __init__(self, models, weights=None):
+        # 'ensemble' is derived here, never called as a model
+        self.models = {name: model for name, model in models.items() if name != 'ensemble'}
+        self.set_weights(weights or DEFAULT_WEIGHTS)
+        self.timing_stats = {name: {'calls': 0, 'rows': 0, 'total_ms': 0.0, 'last_ms': 0.0}
+                             for name in self.models}
+        # predict() runs on request threads, the micro-batch thread and the
+        # ASGI executor at once
+        self._stats_lock = threading.Lock()
+
+    def set_weights(self, weights):
+        """Set per-model ensemble weights (normalized over loaded models)"""
+        active = {name: float(w) for name, w in weights.items() if name in self.models}
+        total = sum(active.values())
+        if total <= 0:
+            raise ValueError("Ensemble weights must sum to a positive value")
+        self.weights = {name: w / total for name, w in active.items()}
+
+    def _run_model(self, name, model, X):
+        if name == 'neural_network':
+            return model.predict(X, verbose=0).flatten()
+        return model.predict(X)
+
+    def predict(self, X):
+        """Score a scaled feature matrix
+
+        Returns (predictions, timings): predictions maps each base model and
+        'ensemble' to an array of scores, timings maps each model to the
+        wall time of its single predict call in milliseconds.
+        """
+        n_rows = X.shape[0]
+        predictions = {}
+        timings = {}
+
+        for name, model in self.models.items():
+            start = time.perf_counter()
+            try:
+                predictions[name] = np.asarray(self._run_model(name, model, X), dtype=float)
+            except Exception as e:
+                print(f"Error with {name}: {e}")
+                predictions[name] = np.full(n_rows, FALLBACK_SCORE)
+            timings[name] = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            for name, elapsed_ms in timings.items():
+                stats = self.timing_stats[name]
+                stats['calls'] += 1
+                stats['rows'] += n_rows
+                stats['total_ms'] += elapsed_ms
+                stats['last_ms'] = elapsed_ms
+
+        predictions['ensemble'] = sum(predictions[name] * weight
+                                      for name, weight in self.weights.items())
+        return predictions, timings
+
+    def get_timing_stats(self):
+        """Cumulative per-model timing since startup"""
+        with self._stats_lock:
+            snapshot = {name: dict(stats) for name, stats in self.timing_stats.items()}
+        report = {}
+        for name, stats in snapshot.items():
+            calls = stats['calls']
+            report[name] = {
+                'calls': calls,
+                'rows': stats['rows'],
+                'weight': self.weights.get(name, 0.0),
+                'last_ms': round(stats['last_ms'], 3),
+                'avg_ms': round(stats['total_ms'] / calls, 3) if calls else 0.0,
+                'avg_ms_per_row': round(stats['total_ms'] / stats['rows'], 4) if stats['rows'] else 0.0
+            }
+        return report
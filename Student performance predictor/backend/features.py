@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# Model input order (must match model/feature_columns.txt)
+FEATURE_COLUMNS = [
+    'english.grade', 'math.grade', 'sciences.grade', 'language.grade',
+    'overall_grade', 'academic_consistency', 'consistency_score',
+    'portfolio.rating', 'coverletter.rating', 'refletter.rating',
+    'application_strength', 'strong_recommendation', 'strong_portfolio',
+    'age', 'attendance_rate', 'extracurricular_score',
+    'education_hub_distance', 'multiple_weak_subjects',
+    'low_application_score', 'math_english_diff', 'science_language_diff',
+    'academic_potential', 'performance_index',
+    'gender_encoded', 'nationality_encoded', 'ethnic.group_encoded'
+]
+
+# Request fields and the defaults used by calculate_features()
+INPUT_DEFAULTS = {
+    'english_grade': 3.0,
+    'math_grade': 3.0,
+    'sciences_grade': 3.0,
+    'language_grade': 3.0,
+    'portfolio_rating': 3,
+    'coverletter_rating': 3,
+    'refletter_rating': 3,
+    'age': 21,
+    'attendance_rate': 0.85,
+    'extracurricular_level': 3
+}
+
+CATEGORICAL_COLUMNS = ['gender', 'nationality', 'ethnic.group']
+
+def _numeric_column(records, name):
+    """Return a float array for an input field, filling missing values"""
+    default = INPUT_DEFAULTS[name]
+    if name not in records:
+        return np.full(len(records), float(default))
+    values = pd.to_numeric(records[name], errors='coerce')
+    return values.fillna(default).to_numpy(dtype=float)
+
+def _encode_column(records, col, label_encoders):
+    """Label-encode a categorical field, mapping unknown values to 0"""
+    if col not in records or col not in label_encoders:
+        return np.zeros(len(records))
+    lookup = {value: i for i, value in enumerate(label_encoders[col].classes_)}
+    values = records[col].fillna('').astype(str)
+    return values.map(lookup).fillna(0).to_numpy(dtype=float)
+
+def build_feature_frame(records, label_encoders):
+    """Vectorized calculate_features() for a whole batch of students
+
+    `records` is a DataFrame (or list of dicts) with the same fields the
+    /api/predict endpoint accepts. Returns a DataFrame with one row per
+    student and the columns listed in FEATURE_COLUMNS.
+    """
+    if not isinstance(records, pd.DataFrame):
+        records = pd.DataFrame(list(records))
+    records = records.reset_index(drop=True)
+    n = len(records)
+
+    # Academic grades
+    grades = np.column_stack([
+        _numeric_column(records, 'english_grade'),
+        _numeric_column(records, 'math_grade'),
+        _numeric_column(records, 'sciences_grade'),
+        _numeric_column(records, 'language_grade')
+    ])
+    overall_grade = grades.mean(axis=1)
+    academic_consistency = grades.std(axis=1)
+
+    # Application features
+    app_scores = np.column_stack([
+        _numeric_column(records, 'portfolio_rating'),
+        _numeric_column(records, 'coverletter_rating'),
+        _numeric_column(records, 'refletter_rating')
+    ])
+    application_strength = app_scores.mean(axis=1)
+
+    # Demographic features
+    attendance_rate = _numeric_column(records, 'attendance_rate')
+    extracurricular_score = _numeric_column(records, 'extracurricular_level') * 0.8
+
+    # Risk factors
+    weak_count = (grades[:, :3] < 3).sum(axis=1)
+
+    features = pd.DataFrame({
+        'english.grade': grades[:, 0],
+        'math.grade': grades[:, 1],
+        'sciences.grade': grades[:, 2],
+        'language.grade': grades[:, 3],
+        'overall_grade': overall_grade,
+        'academic_consistency': academic_consistency,
+        'consistency_score': 1 / (academic_consistency + 0.1),
+        'portfolio.rating': app_scores[:, 0],
+        'coverletter.rating': app_scores[:, 1],
+        'refletter.rating': app_scores[:, 2],
+        'application_strength': application_strength,
+        'strong_recommendation': (app_scores[:, 2] >= 4).astype(int),
+        'strong_portfolio': (app_scores[:, 0] >= 4).astype(int),
+        'age': _numeric_column(records, 'age'),
+        'attendance_rate': attendance_rate,
+        'extracurricular_score': extracurricular_score,
+        'education_hub_distance': np.full(n, 500.0),
+        'multiple_weak_subjects': (weak_count >= 2).astype(int),
+        'low_application_score': (application_strength < 3.5).astype(int),
+        'math_english_diff': grades[:, 1] - grades[:, 0],
+        'science_language_diff': grades[:, 2] - grades[:, 3],
+        'academic_potential': (
+            overall_grade * 0.6 +
+            extracurricular_score * 0.3 +
+            attendance_rate * 0.1
+        ),
+        'performance_index': (
+            overall_grade * 0.4 +
+            application_strength * 0.3 +
+            attendance_rate * 0.3
+        ) * 20
+    })
+
+    # Encode categorical variables
+    for col in CATEGORICAL_COLUMNS:
+        features[f'{col}_encoded'] = _encode_column(records, col, label_encoders)
+
+    return features[FEATURE_COLUMNS]
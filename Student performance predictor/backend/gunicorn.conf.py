@@ -0,0 +1,28 @@
+"""gunicorn settings for multi-process serving (see wsgi.py)
+
+Configured with
+    WEB_WORKERS=4         # worker processes
+    WEB_THREADS=4         # request threads per worker
+    PRELOAD_APP=1         # 0 loads the models separately in every worker
+    BIND=127.0.0.1:5000
+
+With PRELOAD_APP=1 the master imports wsgi.py (and so loads the models)
+before forking. Python objects are frozen out of the garbage collector
+first, so collections in the workers don't write to the shared pages
+and turn them into private copies. benchmarks/prefork_memory.py
+measures the per-worker unique memory this saves.
+"""
+import gc
+import os
+
+wsgi_app = 'wsgi:application'
+bind = os.environ.get('BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('WEB_WORKERS', 4))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = os.environ.get('PRELOAD_APP', '1') != '0'
+timeout = 120
+
+def when_ready(server):
+    if preload_app:
+        gc.freeze()
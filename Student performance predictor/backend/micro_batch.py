@@ -0,0 +1,176 @@
+"""Coalesce concurrent single-row predictions into one model pass
+
+Each /api/predict request scores a 1-row matrix, paying the fixed cost of
+scaler.transform and every model.predict call on its own. MicroBatcher
+puts the rows of concurrent requests on a queue; a scheduler thread
+stacks whatever is waiting (up to MICRO_BATCH_MAX_SIZE rows), scores the
+matrix once and hands each request its own rows back.
+
+Configured with
+    MICRO_BATCH_MAX_SIZE=32    # rows per pass, 0 disables batching
+    MICRO_BATCH_WAIT_MS=2      # how long a batch may wait to fill up
+    MICRO_BATCH_TIMEOUT=5.0    # seconds a request waits for its batch
+The wait only applies under load (the previous pass had more than one
+request, or requests were already queued): a lone request is scored
+immediately. Batches also form naturally while a pass is running. Under
+asgi.py, INFERENCE_WORKERS bounds how many requests can wait at once,
+so set it to at least the batch size you want to see.
+
+A request whose batch hasn't been scored within MICRO_BATCH_TIMEOUT
+scores its own rows instead, and a scheduler thread that has died is
+restarted by the next request, so a stuck or crashed scheduler slows
+requests down rather than hanging them.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets
+HISTOGRAM_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Thread-safe request coalescer around a score(X) -> (predictions, timings) function"""
+    def __init__(self, score, max_batch_size=32, max_wait_ms=2.0, timeout=5.0, window=1024):
+        self.score_fn = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_requests = 1
+        self._carry = None
+        self._waits = deque(maxlen=window)
+        self.stats = {'requests': 0, 'batches': 0, 'rows': 0, 'max_requests': 0,
+                      'timeouts': 0, 'restarts': 0}
+        self.histogram = {bucket: 0 for bucket in HISTOGRAM_BUCKETS}
+        self.histogram['more'] = 0
+
+    @classmethod
+    def from_env(cls, score):
+        return cls(score, max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32)),
+                   max_wait_ms=float(os.environ.get('MICRO_BATCH_WAIT_MS', 2)),
+                   timeout=float(os.environ.get('MICRO_BATCH_TIMEOUT', 5.0)))
+
+    @property
+    def enabled(self):
+        return self.max_batch_size > 1
+
+    def _ensure_scheduler(self):
+        # Started lazily, again in a forked worker (threads don't survive
+        # fork), and again if the thread died
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._carry = None
+                elif self._thread is not None:
+                    # Same process: keep the queue so waiting requests are served
+                    logger.error("Micro-batch scheduler died, restarting it")
+                    self.stats['restarts'] += 1
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batch',
+                                                daemon=True)
+                self._thread.start()
+
+    def score(self, X):
+        """Same contract as score(X); rows are scored together with other requests'"""
+        if not self.enabled or len(X) >= self.max_batch_size:
+            return self.score_fn(X)
+        self._ensure_scheduler()
+        future = Future()
+        self._queue.put((np.asarray(X), time.perf_counter(), future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Cancelling keeps the scheduler from scoring these rows again
+            # if it gets to them later
+            future.cancel()
+            with self._lock:
+                self.stats['timeouts'] += 1
+            logger.warning("Micro-batch result not ready after %.1fs, scoring %d rows directly",
+                           self.timeout, len(X))
+            return self.score_fn(X)
+
+    def _collect(self):
+        first, self._carry = self._carry or self._queue.get(), None
+        items, n_rows = [first], len(first[0])
+        # Only hold the batch open when there is concurrency to exploit
+        busy = self._last_requests > 1 or not self._queue.empty()
+        deadline = time.perf_counter() + (self.max_wait if busy else 0)
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if n_rows + len(item[0]) > self.max_batch_size:
+                self._carry = item  # starts the next batch
+                break
+            items.append(item)
+            n_rows += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = [item for item in self._collect()
+                     if item[2].set_running_or_notify_cancel()]
+            if not items:
+                continue
+            started = time.perf_counter()
+            sizes = [len(X) for X, _, _ in items]
+            try:
+                predictions, timings = self.score_fn(np.vstack([X for X, _, _ in items]))
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for (_, _, future), size in zip(items, sizes):
+                future.set_result(({name: values[offset:offset + size]
+                                    for name, values in predictions.items()}, timings))
+                offset += size
+            self._record(items, sizes, started)
+
+    def _record(self, items, sizes, started):
+        self._last_requests = len(items)
+        with self._lock:
+            self.stats['requests'] += len(items)
+            self.stats['batches'] += 1
+            self.stats['rows'] += sum(sizes)
+            self.stats['max_requests'] = max(self.stats['max_requests'], len(items))
+            bucket = next((b for b in HISTOGRAM_BUCKETS if len(items) <= b), 'more')
+            self.histogram[bucket] += 1
+            self._waits.extend((started - submitted) * 1000 for _, submitted, _ in items)
+
+    def get_stats(self):
+        with self._lock:
+            waits = np.array(self._waits) if self._waits else np.zeros(1)
+            batches = self.stats['batches']
+            return {
+                **self.stats,
+                'enabled': self.enabled,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'timeout_s': self.timeout,
+                'avg_requests_per_batch': round(self.stats['requests'] / batches, 2) if batches else 0.0,
+                'requests_per_batch_histogram': {f'<={b}' if b != 'more' else f'>{HISTOGRAM_BUCKETS[-1]}': n
+                                                 for b, n in self.histogram.items()},
+                'queue_wait_ms': {
+                    'p50': round(float(np.percentile(waits, 50)), 3),
+                    'p99': round(float(np.percentile(waits, 99)), 3),
+                    'max': round(float(waits.max()), 3)
+                }
+            }
@@ -0,0 +1,309 @@
+"""Versioned schema migrations for the SQLite database
+
+The applied version is stored in PRAGMA user_version. Each migration runs in
+its own transaction together with the version bump, so a failed migration
+leaves the database at the previous version.
+
+Usage (from the backend directory):
+    python migrations.py            # apply pending migrations
+QUERY_PLAN_CHECKS are asserted by tests/test_migrations.py.
+"""
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+def _add_column_if_missing(conn, table, column, definition):
+    # Older databases were created by hand and may already have the column
+    if column not in _columns(conn, table):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _add_intervention_columns(conn):
+    # update_intervention_status writes completed_at and the dashboard reads
+    # effectiveness_score, but init_db never created either column
+    _add_column_if_missing(conn, 'interventions', 'completed_at', 'TIMESTAMP')
+    _add_column_if_missing(conn, 'interventions', 'effectiveness_score', 'REAL')
+
+def _add_query_indexes(conn):
+    statements = [
+        # Recent predictions / student listings: ORDER BY prediction_date DESC
+        'CREATE INDEX IF NOT EXISTS idx_students_prediction_date ON students (prediction_date)',
+        # Risk distribution and overall stats (covering: no table lookups)
+        'CREATE INDEX IF NOT EXISTS idx_students_risk_score ON students (risk_level, predicted_score)',
+        # Nationality stats (covering)
+        'CREATE INDEX IF NOT EXISTS idx_students_nationality '
+        'ON students (nationality, predicted_score, confidence)',
+        # Interventions per student
+        'CREATE INDEX IF NOT EXISTS idx_interventions_student_id ON interventions (student_id)',
+        # Intervention listing: ORDER BY created_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_interventions_created_at ON interventions (created_at)',
+        # Intervention stats grouped by type (covering)
+        'CREATE INDEX IF NOT EXISTS idx_interventions_type '
+        'ON interventions (intervention_type, priority, effectiveness_score)'
+    ]
+    for statement in statements:
+        conn.execute(statement)
+    conn.execute('ANALYZE')
+
+GRADE_RANGE_SQL = '''CASE
+        WHEN {score} >= 90 THEN 'A (90-100)'
+        WHEN {score} >= 80 THEN 'B (80-89)'
+        WHEN {score} >= 70 THEN 'C (70-79)'
+        WHEN {score} >= 60 THEN 'D (60-69)'
+        ELSE 'F (<60)'
+    END'''
+
+def _student_stats_statements(row, sign):
+    """Statements adding (sign=+1) or removing (sign=-1) a student row"""
+    grade_range = GRADE_RANGE_SQL.format(score=f'{row}.predicted_score')
+    return f'''
+        INSERT INTO grade_range_stats (grade_range, count, score_sum)
+        VALUES ({grade_range}, {sign}, {sign} * IFNULL({row}.predicted_score, 0))
+        ON CONFLICT (grade_range) DO UPDATE SET
+            count = count + excluded.count,
+            score_sum = score_sum + excluded.score_sum;
+        INSERT INTO risk_stats (risk_level, count, high_risk)
+        VALUES (IFNULL({row}.risk_level, ''), {sign},
+                {sign} * IFNULL({row}.risk_level IN ('High', 'Critical'), 0))
+        ON CONFLICT (risk_level) DO UPDATE SET
+            count = count + excluded.count,
+            high_risk = high_risk + excluded.high_risk;
+        INSERT INTO nationality_stats (nationality, count, score_sum, confidence_sum)
+        VALUES (IFNULL({row}.nationality, ''), {sign},
+                {sign} * IFNULL({row}.predicted_score, 0), {sign} * IFNULL({row}.confidence, 0))
+        ON CONFLICT (nationality) DO UPDATE SET
+            count = count + excluded.count,
+            score_sum = score_sum + excluded.score_sum,
+            confidence_sum = confidence_sum + excluded.confidence_sum;'''
+
+def _intervention_stats_statements(row, sign):
+    """Statements adding (sign=+1) or removing (sign=-1) an intervention row"""
+    return f'''
+        INSERT INTO intervention_type_stats
+            (intervention_type, count, priority_sum, effectiveness_sum, effectiveness_count)
+        VALUES (IFNULL({row}.intervention_type, ''), {sign}, {sign} * IFNULL({row}.priority, 0),
+                {sign} * IFNULL({row}.effectiveness_score, 0),
+                {sign} * ({row}.effectiveness_score IS NOT NULL))
+        ON CONFLICT (intervention_type) DO UPDATE SET
+            count = count + excluded.count,
+            priority_sum = priority_sum + excluded.priority_sum,
+            effectiveness_sum = effectiveness_sum + excluded.effectiveness_sum,
+            effectiveness_count = effectiveness_count + excluded.effectiveness_count;'''
+
+SUMMARY_CLEANUP_SQL = '''
+        DELETE FROM grade_range_stats WHERE count <= 0;
+        DELETE FROM risk_stats WHERE count <= 0;
+        DELETE FROM nationality_stats WHERE count <= 0;
+        DELETE FROM intervention_type_stats WHERE count <= 0;'''
+
+def _add_summary_tables(conn):
+    # Dashboard aggregates kept up to date by triggers, so every writer
+    # (predict, batch predict, interventions CRUD) updates them in its own
+    # transaction and the dashboard reads a handful of rows
+    conn.execute('''CREATE TABLE IF NOT EXISTS grade_range_stats
+                    (grade_range TEXT PRIMARY KEY,
+                     count INTEGER NOT NULL DEFAULT 0,
+                     score_sum REAL NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS risk_stats
+                    (risk_level TEXT PRIMARY KEY,
+                     count INTEGER NOT NULL DEFAULT 0,
+                     high_risk INTEGER NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS nationality_stats
+                    (nationality TEXT PRIMARY KEY,
+                     count INTEGER NOT NULL DEFAULT 0,
+                     score_sum REAL NOT NULL DEFAULT 0,
+                     confidence_sum REAL NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS intervention_type_stats
+                    (intervention_type TEXT PRIMARY KEY,
+                     count INTEGER NOT NULL DEFAULT 0,
+                     priority_sum REAL NOT NULL DEFAULT 0,
+                     effectiveness_sum REAL NOT NULL DEFAULT 0,
+                     effectiveness_count INTEGER NOT NULL DEFAULT 0)''')
+
+    _create_summary_triggers(conn)
+    _rebuild_summary_tables(conn)
+
+def _create_summary_triggers(conn):
+    triggers = {
+        'students_stats_insert': ('AFTER INSERT ON students',
+                                  _student_stats_statements('NEW', 1)),
+        'students_stats_delete': ('AFTER DELETE ON students',
+                                  _student_stats_statements('OLD', -1) + SUMMARY_CLEANUP_SQL),
+        'students_stats_update': ('AFTER UPDATE OF predicted_score, risk_level, nationality, '
+                                  'confidence ON students',
+                                  _student_stats_statements('OLD', -1) +
+                                  _student_stats_statements('NEW', 1) + SUMMARY_CLEANUP_SQL),
+        'interventions_stats_insert': ('AFTER INSERT ON interventions',
+                                       _intervention_stats_statements('NEW', 1)),
+        'interventions_stats_delete': ('AFTER DELETE ON interventions',
+                                       _intervention_stats_statements('OLD', -1) +
+                                       SUMMARY_CLEANUP_SQL),
+        'interventions_stats_update': ('AFTER UPDATE OF intervention_type, priority, '
+                                       'effectiveness_score ON interventions',
+                                       _intervention_stats_statements('OLD', -1) +
+                                       _intervention_stats_statements('NEW', 1) +
+                                       SUMMARY_CLEANUP_SQL)
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        conn.execute(f'CREATE TRIGGER {name} {event} BEGIN {body} END')
+
+def _rebuild_summary_tables(conn):
+    """Recompute the summary tables from the base tables"""
+    for table in ('grade_range_stats', 'risk_stats', 'nationality_stats',
+                  'intervention_type_stats'):
+        conn.execute(f'DELETE FROM {table}')
+
+    conn.execute(f'''INSERT INTO grade_range_stats (grade_range, count, score_sum)
+                     SELECT {GRADE_RANGE_SQL.format(score='predicted_score')} AS grade_range,
+                            COUNT(*), IFNULL(SUM(predicted_score), 0)
+                     FROM students GROUP BY grade_range''')
+    conn.execute('''INSERT INTO risk_stats (risk_level, count, high_risk)
+                    SELECT IFNULL(risk_level, ''), COUNT(*),
+                           IFNULL(SUM(risk_level IN ('High', 'Critical')), 0)
+                    FROM students GROUP BY IFNULL(risk_level, '')''')
+    conn.execute('''INSERT INTO nationality_stats (nationality, count, score_sum, confidence_sum)
+                    SELECT IFNULL(nationality, ''), COUNT(*),
+                           IFNULL(SUM(predicted_score), 0), IFNULL(SUM(confidence), 0)
+                    FROM students GROUP BY IFNULL(nationality, '')''')
+    conn.execute('''INSERT INTO intervention_type_stats
+                        (intervention_type, count, priority_sum, effectiveness_sum,
+                         effectiveness_count)
+                    SELECT IFNULL(intervention_type, ''), COUNT(*), IFNULL(SUM(priority), 0),
+                           IFNULL(SUM(effectiveness_score), 0), COUNT(effectiveness_score)
+                    FROM interventions GROUP BY IFNULL(intervention_type, '')''')
+
+def _add_pagination_indexes(conn):
+    # Filtered keyset pages: equality on the filter, then a range on the
+    # timestamp (the rowid breaks ties inside the index)
+    statements = [
+        'CREATE INDEX IF NOT EXISTS idx_students_risk_date ON students (risk_level, prediction_date)',
+        'CREATE INDEX IF NOT EXISTS idx_students_grade_date '
+        'ON students (predicted_grade, prediction_date)',
+        'CREATE INDEX IF NOT EXISTS idx_interventions_status_created '
+        'ON interventions (status, created_at)'
+    ]
+    for statement in statements:
+        conn.execute(statement)
+    conn.execute('ANALYZE')
+
+def _fix_null_risk_stats(conn):
+    # A NULL risk_level made the triggers write NULL into risk_stats.high_risk
+    # (NOT NULL), failing the insert; recreate them and recount
+    _create_summary_triggers(conn)
+    _rebuild_summary_tables(conn)
+
+def _add_id_allocator(conn):
+    # Backs db.IdAllocator: the next student id not yet handed out
+    conn.execute('''CREATE TABLE IF NOT EXISTS id_blocks
+                    (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)''')
+    conn.execute('''INSERT OR IGNORE INTO id_blocks (name, next_id)
+                    SELECT 'students', IFNULL(MAX(id), 0) + 1 FROM students''')
+
+# (version, description, function) in the order they must be applied
+MIGRATIONS = [
+    (1, 'add interventions.completed_at and effectiveness_score', _add_intervention_columns),
+    (2, 'add indexes for dashboard, listing and join queries', _add_query_indexes),
+    (3, 'add trigger-maintained dashboard summary tables', _add_summary_tables),
+    (4, 'add indexes for filtered keyset pagination', _add_pagination_indexes),
+    (5, 'add id_blocks table for reserving student ids', _add_id_allocator),
+    (6, 'recreate summary triggers to count NULL risk levels', _fix_null_risk_stats)
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Apply every migration newer than the database's user_version"""
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version <= get_version(conn):
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-check under the write lock in case another worker migrated
+            if version <= get_version(conn):
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        print(f"✓ Applied migration {version}: {description}")
+    return applied
+
+# Dashboard/listing queries and the index each is expected to use
+# (tests/test_migrations.py fails if a plan doesn't use it)
+QUERY_PLAN_CHECKS = [
+    ('recent predictions',
+     'SELECT name, predicted_score FROM students ORDER BY prediction_date DESC LIMIT 10',
+     'idx_students_prediction_date'),
+    # Either risk_level-leading index covers this (used to rebuild risk_stats)
+    ('risk distribution',
+     'SELECT risk_level, COUNT(*) FROM students GROUP BY risk_level',
+     'idx_students_risk_'),
+    ('overall stats',
+     '''SELECT COUNT(*), AVG(predicted_score),
+               SUM(CASE WHEN risk_level IN ('High', 'Critical') THEN 1 ELSE 0 END)
+        FROM students''',
+     'idx_students_risk_score'),
+    ('nationality stats',
+     '''SELECT nationality, COUNT(*) as count, AVG(predicted_score) as avg_score,
+               AVG(confidence) FROM students GROUP BY nationality''',
+     'idx_students_nationality'),
+    ('intervention stats',
+     '''SELECT intervention_type, COUNT(*), AVG(priority), AVG(effectiveness_score)
+        FROM interventions GROUP BY intervention_type''',
+     'idx_interventions_type'),
+    ('intervention listing',
+     '''SELECT i.*, s.name FROM interventions i
+        LEFT JOIN students s ON i.student_id = s.id
+        ORDER BY i.created_at DESC LIMIT 50''',
+     'idx_interventions_created_at'),
+    ('student page after cursor',
+     '''SELECT id, name, predicted_score, prediction_date, id FROM students
+        WHERE (prediction_date, id) < ('2024-06-01', 1000)
+        ORDER BY prediction_date DESC, id DESC LIMIT 50''',
+     'idx_students_prediction_date'),
+    ('student page by risk level',
+     '''SELECT id, name, predicted_score, prediction_date, id FROM students
+        WHERE risk_level = 'High' AND (prediction_date, id) < ('2024-06-01', 1000)
+        ORDER BY prediction_date DESC, id DESC LIMIT 50''',
+     'idx_students_risk_date'),
+    ('intervention page by status',
+     '''SELECT i.*, s.name, i.created_at, i.id FROM interventions i
+        LEFT JOIN students s ON i.student_id = s.id
+        WHERE i.status = 'pending' AND (i.created_at, i.id) < ('2024-06-01', 1000)
+        ORDER BY i.created_at DESC, i.id DESC LIMIT 50''',
+     'idx_interventions_status_created'),
+    ('interventions for a student',
+     'SELECT * FROM interventions WHERE student_id = 1',
+     'idx_interventions_student_id')
+]
+
+def check_query_plans(conn):
+    """Run EXPLAIN QUERY PLAN for each checked query
+
+    Returns a list of (name, plan, ok) where ok means the expected index
+    appears in the plan and the query doesn't need a temp B-tree to sort.
+    """
+    results = []
+    for name, query, index in QUERY_PLAN_CHECKS:
+        plan = ' | '.join(row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}'))
+        ok = index in plan and 'USE TEMP B-TREE' not in plan
+        results.append((name, plan, ok))
+    return results
+
+if __name__ == '__main__':
+    import db
+
+    conn = db.get_connection()
+    migrate(conn)
+    print(f"Schema version: {get_version(conn)} (latest {LATEST_VERSION})")
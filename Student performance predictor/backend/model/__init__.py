@@ -1,3 +1,9 @@
-from .train_models import EnsembleModel
+def __getattr__(name):
+    # Imported lazily so serving code (e.g. model.numpy_nn) doesn't pull in
+    # the training stack and TensorFlow
+    if name == 'EnsembleModel':
+        from .train_models import EnsembleModel
+        return EnsembleModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ['EnsembleModel']
\ No newline at end of file
+__all__ = ['EnsembleModel']
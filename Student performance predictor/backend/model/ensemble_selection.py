@@ -0,0 +1,209 @@
+"""Pick ensemble members and weights under an inference latency budget
+
+Each base model's serving cost is measured as the median single-row
+predict() time and the per-row time of a large batch call. Every subset
+of models whose summed single-row cost fits the budget gets non-negative
+least-squares weights (normalized to sum to 1, so models can drop out
+with a zero weight); the subset with the lowest RMSE wins. The result is
+written to model/ensemble_config.json, whose "weights" the Flask app
+reads at startup. Zero-weight models are not loaded at serving time.
+
+Weights and subsets are chosen on out-of-fold predictions for the
+training rows (each from a copy of the models fitted without that fold),
+so the held-out test rows only report the selected ensemble's metrics.
+
+Usage (from the backend directory, re-selecting for the saved models):
+    python model/ensemble_selection.py [--latency-budget-ms 1.0] [--tuned]
+"""
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+from scipy.optimize import nnls
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+CONFIG_PATH = 'model/ensemble_config.json'
+OOF_FOLDS = 5
+
+def _predict(model, X):
+    return np.asarray(model.predict(X), dtype=float).ravel()
+
+def measure_costs(models, X, single_runs=200, batch_size=1000, min_seconds=0.2):
+    """{name: {'single_row_ms', 'batch_ms_per_row'}} for each model
+
+    Single-row cost is the median over up to single_runs rows of X; batch
+    cost is the best of a few calls on batch_size rows (X repeated as
+    needed).
+    """
+    X = np.asarray(X, dtype=float)
+    batch = np.resize(X, (batch_size, X.shape[1]))
+    rows = [X[i % len(X)][None, :] for i in range(single_runs)]
+
+    costs = {}
+    for name, model in models.items():
+        _predict(model, rows[0])  # warm-up
+        timings = []
+        for row in rows:
+            t0 = time.perf_counter()
+            _predict(model, row)
+            timings.append(time.perf_counter() - t0)
+
+        batch_timings = []
+        start = time.perf_counter()
+        while len(batch_timings) < 3 or time.perf_counter() - start < min_seconds:
+            t0 = time.perf_counter()
+            _predict(model, batch)
+            batch_timings.append(time.perf_counter() - t0)
+
+        costs[name] = {
+            'single_row_ms': float(np.median(timings)) * 1000,
+            'batch_ms_per_row': min(batch_timings) * 1000 / batch_size
+        }
+    return costs
+
+def out_of_fold_predictions(fit_models, X, y, n_folds=OOF_FOLDS, random_state=42):
+    """{name: predictions for every row of X} from models that never saw the row
+
+    fit_models(X, y) returns {name: fitted model}; it is called once per fold.
+    """
+    from sklearn.model_selection import KFold
+
+    X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+    predictions = {}
+    folds = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    for i, (fit_idx, val_idx) in enumerate(folds.split(X)):
+        print(f"Out-of-fold predictions for ensemble selection: fold {i + 1}/{n_folds}")
+        for name, model in fit_models(X[fit_idx], y[fit_idx]).items():
+            predictions.setdefault(name, np.empty(len(X)))[val_idx] = _predict(model, X[val_idx])
+    return predictions
+
+def regression_metrics(y_true, y_pred):
+    return {
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'r2': float(r2_score(y_true, y_pred))
+    }
+
+def fit_weights(predictions, y):
+    """Non-negative weights summing to 1 for the columns of predictions"""
+    weights, _ = nnls(predictions, y)
+    if weights.sum() <= 0:
+        return np.full(predictions.shape[1], 1 / predictions.shape[1])
+    return weights / weights.sum()
+
+def select_ensemble(predictions, y, costs, latency_budget_ms=None):
+    """Best-RMSE weighted subset within the single-row latency budget
+
+    `predictions` maps model name -> predictions on the rows of y. Returns
+    a config dict with weights for every model (zero for dropped ones),
+    the members' single-row cost and the ensemble's metrics.
+    """
+    names = list(predictions)
+    y = np.asarray(y, dtype=float)
+    best = None
+    for size in range(1, len(names) + 1):
+        for subset in itertools.combinations(names, size):
+            weights = fit_weights(np.column_stack([predictions[n] for n in subset]), y)
+            members = [n for n, w in zip(subset, weights) if w > 0]
+            cost = sum(costs[n]['single_row_ms'] for n in members)
+            if latency_budget_ms is not None and cost > latency_budget_ms:
+                continue
+            y_pred = sum(predictions[n] * w for n, w in zip(subset, weights))
+            metrics = regression_metrics(y, y_pred)
+            if best is None or metrics['rmse'] < best['metrics']['rmse']:
+                best = {
+                    'weights': {n: 0.0 for n in names},
+                    'single_row_ms': cost,
+                    'metrics': metrics
+                }
+                best['weights'].update({n: float(w) for n, w in zip(subset, weights)})
+
+    if best is None:
+        # Nothing fits the budget: serve the single cheapest model
+        cheapest = min(names, key=lambda n: costs[n]['single_row_ms'])
+        print(f"Warning: no model fits the {latency_budget_ms} ms budget, using {cheapest}")
+        best = {
+            'weights': {n: float(n == cheapest) for n in names},
+            'single_row_ms': costs[cheapest]['single_row_ms'],
+            'metrics': regression_metrics(y, predictions[cheapest])
+        }
+    return best
+
+def select_and_save(models, oof_predictions, y_train, X_test, y_test, latency_budget_ms=None,
+                    path=CONFIG_PATH):
+    """Select on out-of-fold training predictions, report on the test rows
+
+    `models` are the fitted serving models (timed on X_test's inputs),
+    `oof_predictions` maps each of them to out_of_fold_predictions() for
+    the rows of y_train. Writes and returns the ensemble config; its
+    'metrics' and 'model_metrics' are on the test rows.
+    """
+    costs = measure_costs(models, X_test)
+    selection = select_ensemble(oof_predictions, y_train, costs, latency_budget_ms)
+    predictions = {name: _predict(model, X_test) for name, model in models.items()}
+    y_pred = sum(predictions[name] * weight for name, weight in selection['weights'].items())
+
+    config = {
+        'weights': selection['weights'],
+        'latency_budget_ms': latency_budget_ms,
+        'single_row_ms': selection['single_row_ms'],
+        'metrics': regression_metrics(y_test, y_pred),
+        'oof_metrics': selection['metrics'],
+        'oof_rows': len(y_train),
+        'model_costs': costs,
+        'model_metrics': {name: regression_metrics(y_test, pred)
+                          for name, pred in predictions.items()},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+    return config
+
+def print_selection(config):
+    print(f"\n{'model':<16} {'weight':>7} {'1-row ms':>9} {'batch us/row':>13} {'RMSE':>7}")
+    for name, weight in config['weights'].items():
+        cost = config['model_costs'][name]
+        print(f"{name:<16} {weight:>7.3f} {cost['single_row_ms']:>9.3f} "
+              f"{cost['batch_ms_per_row'] * 1000:>13.2f} {config['model_metrics'][name]['rmse']:>7.2f}")
+    metrics = config['metrics']
+    print(f"Selected ensemble: {config['single_row_ms']:.3f} ms/row (budget "
+          f"{config['latency_budget_ms']}), weights fitted on {config['oof_rows']} out-of-fold "
+          f"training rows (RMSE {config['oof_metrics']['rmse']:.2f})")
+    print(f"Test rows: MAE {metrics['mae']:.2f}, RMSE {metrics['rmse']:.2f}, "
+          f"R² {metrics['r2']:.3f}\n")
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import warnings
+
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from model.feature_store import FeatureStore, dataset_name
+    from model.train_models import _tuned_params, selection_fitter
+    from registry import load_registered_models, DEFAULT_MODELS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='data/student-dataset.csv')
+    parser.add_argument('--latency-budget-ms', type=float, default=None)
+    parser.add_argument('--tuned', action='store_true',
+                        help='fit the out-of-fold copies with the model/search.py parameters')
+    parser.add_argument('--sequential', action='store_true',
+                        help='fit the out-of-fold copies one model at a time')
+    args = parser.parse_args()
+
+    X, y, _ = FeatureStore().load(dataset_name(args.source), args.source)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = joblib.load('model/scaler.pkl')
+    params = _tuned_params(args.source) if args.tuned else None
+    oof = out_of_fold_predictions(selection_fitter(not args.sequential, None, params),
+                                  scaler.transform(X_train), y_train)
+    config = select_and_save(load_registered_models(DEFAULT_MODELS), oof, y_train,
+                             scaler.transform(X_test), y_test, args.latency_budget_ms)
+    print_selection(config)
+    print(f"✓ Saved {CONFIG_PATH}")
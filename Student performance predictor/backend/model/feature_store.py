@@ -0,0 +1,158 @@
+"""On-disk cache of engineered training matrices, one entry per dataset
+
+Each dataset (e.g. one CSV per school) gets a directory under
+model/feature_store/ holding
+
+    X.npy                 float64 (n_rows, n_features), columns in FEATURE_COLUMNS order
+    y.npy                 float64 (n_rows,) target
+    label_encoders.pkl    encoders fitted on that dataset
+    meta.json             source hash, feature-code version, shape, build time
+
+An entry is reused only while both the source file's SHA-256 and the
+feature-code version (a hash of build_training_features and the column
+list) match, so editing either the data or the feature code triggers a
+rebuild. Matrices are opened with mmap_mode='r'.
+
+Usage (from the backend directory):
+    python model/feature_store.py data/schools/*.csv
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'model/feature_store'
+
+def _training_code():
+    try:
+        from model import train_models
+    except ImportError:
+        import train_models
+    return train_models
+
+def source_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def feature_code_version():
+    """Hash of the feature engineering code and output columns"""
+    code = _training_code()
+    digest = hashlib.sha256(inspect.getsource(code.build_training_features).encode())
+    digest.update('\n'.join(code.FEATURE_COLUMNS + [code.TARGET_COLUMN]).encode())
+    return digest.hexdigest()[:16]
+
+def dataset_name(path):
+    """Store key for a source file: its base name without extension"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+class FeatureStore:
+    """Engineered matrices cached per dataset, rebuilt only when stale"""
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._version = None
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = feature_code_version()
+        return self._version
+
+    def _entry_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def read_meta(self, name):
+        try:
+            with open(os.path.join(self._entry_dir(name), 'meta.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, name, source_path, digest=None):
+        meta = self.read_meta(name)
+        if meta is None or meta['feature_version'] != self.version:
+            return False
+        return meta['source_hash'] == (digest or source_hash(source_path))
+
+    def build(self, name, source_path, digest=None):
+        """Engineer features for source_path and (re)write the entry"""
+        code = _training_code()
+        digest = digest or source_hash(source_path)
+        features, label_encoders = code.build_training_features(pd.read_csv(source_path))
+
+        os.makedirs(self.root, exist_ok=True)
+        # Write into a sibling temp dir and swap it in, so a crash mid-build
+        # never leaves a half-written entry that looks fresh
+        staging = tempfile.mkdtemp(prefix=f'.{name}-', dir=self.root)
+        try:
+            np.save(os.path.join(staging, 'X.npy'),
+                    features[code.FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+            np.save(os.path.join(staging, 'y.npy'),
+                    features[code.TARGET_COLUMN].to_numpy(dtype=np.float64))
+            joblib.dump(label_encoders, os.path.join(staging, 'label_encoders.pkl'))
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump({
+                    'source': source_path,
+                    'source_hash': digest,
+                    'feature_version': self.version,
+                    'columns': code.FEATURE_COLUMNS,
+                    'n_rows': len(features),
+                    'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+                }, f, indent=2)
+
+            entry = self._entry_dir(name)
+            if os.path.exists(entry):
+                shutil.rmtree(entry)
+            os.replace(staging, entry)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def refresh(self, sources):
+        """Bring every entry up to date
+
+        `sources` maps dataset name -> CSV path. Returns {name: 'cached' |
+        'built'}.
+        """
+        status = {}
+        for name, path in sources.items():
+            digest = source_hash(path)
+            if self.is_fresh(name, path, digest):
+                status[name] = 'cached'
+            else:
+                self.build(name, path, digest)
+                status[name] = 'built'
+        return status
+
+    def load(self, name, source_path=None):
+        """(X, y, label_encoders) for a dataset, X and y memory-mapped
+
+        With source_path given, the entry is refreshed first if stale.
+        """
+        if source_path is not None:
+            self.refresh({name: source_path})
+        entry = self._entry_dir(name)
+        X = np.load(os.path.join(entry, 'X.npy'), mmap_mode='r')
+        y = np.load(os.path.join(entry, 'y.npy'), mmap_mode='r')
+        label_encoders = joblib.load(os.path.join(entry, 'label_encoders.pkl'))
+        return X, y, label_encoders
+
+if __name__ == '__main__':
+    import sys
+
+    store = FeatureStore()
+    paths = sys.argv[1:] or ['data/student-dataset.csv']
+    start = time.perf_counter()
+    status = store.refresh({dataset_name(path): path for path in paths})
+    for name, state in status.items():
+        print(f"{name:<30} {state}")
+    print(f"Feature version {store.version}, {time.perf_counter() - start:.2f}s")
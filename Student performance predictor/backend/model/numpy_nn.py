@@ -0,0 +1,93 @@
+import numpy as np
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'tanh': np.tanh
+}
+
+def fold_sequential_layers(layers):
+    """Convert Keras Dense/BatchNormalization/Dropout layers to plain arrays
+
+    Each BatchNormalization is an affine map x * scale + shift at inference
+    time, so it is folded into the kernel and bias of the next Dense layer.
+    Dropout is the identity at inference and is dropped. Returns a list of
+    (kernel, bias, activation) tuples.
+    """
+    folded = []
+    pending_scale, pending_shift = None, None
+
+    for layer in layers:
+        kind = layer.__class__.__name__
+        if kind == 'Dense':
+            kernel, bias = [w.astype(np.float64) for w in layer.get_weights()]
+            if pending_scale is not None:
+                bias = pending_shift @ kernel + bias
+                kernel = pending_scale[:, None] * kernel
+                pending_scale, pending_shift = None, None
+            folded.append((kernel, bias, layer.activation.__name__))
+        elif kind == 'BatchNormalization':
+            weights = [w.astype(np.float64) for w in layer.get_weights()]
+            gamma = weights.pop(0) if layer.scale else 1.0
+            beta = weights.pop(0) if layer.center else 0.0
+            moving_mean, moving_var = weights
+            scale = gamma / np.sqrt(moving_var + layer.epsilon)
+            shift = beta - moving_mean * scale
+            if pending_scale is not None:
+                # Two BatchNorms in a row compose into one affine map
+                scale, shift = pending_scale * scale, pending_shift * scale + shift
+            pending_scale, pending_shift = scale, shift
+        elif kind in ('Dropout', 'InputLayer'):
+            continue
+        else:
+            raise ValueError(f"Unsupported layer for NumPy export: {kind}")
+
+    if pending_scale is not None:
+        # Trailing BatchNorm becomes a diagonal linear layer
+        folded.append((np.diag(pending_scale), pending_shift, 'linear'))
+
+    return folded
+
+class NumpyMLP:
+    """Pure-NumPy forward pass for the exported neural network
+
+    Drop-in replacement for the Keras model in the serving path:
+    predict() accepts (and ignores) Keras' `verbose` argument and returns
+    an (n_samples, n_outputs) array.
+    """
+    def __init__(self, kernels, biases, activations):
+        self.kernels = [np.ascontiguousarray(k) for k in kernels]
+        self.biases = [np.ascontiguousarray(b) for b in biases]
+        self.activations = list(activations)
+        for name in self.activations:
+            if name not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {name}")
+
+    @classmethod
+    def from_layers(cls, layers):
+        folded = fold_sequential_layers(layers)
+        return cls(*zip(*folded))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = int(data['n_layers'])
+            kernels = [data[f'kernel_{i}'] for i in range(n_layers)]
+            biases = [data[f'bias_{i}'] for i in range(n_layers)]
+            activations = [str(a) for a in data['activations']]
+        return cls(kernels, biases, activations)
+
+    def save(self, path):
+        arrays = {'n_layers': np.array(len(self.kernels)),
+                  'activations': np.array(self.activations)}
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            arrays[f'kernel_{i}'] = kernel
+            arrays[f'bias_{i}'] = bias
+        np.savez(path, **arrays)
+
+    def predict(self, X, verbose=0):
+        h = np.asarray(X, dtype=np.float64)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            h = ACTIVATIONS[activation](h @ kernel + bias)
+        return h
@@ -0,0 +1,158 @@
+"""Fit the independent base models concurrently under a shared CPU budget
+
+Each model is fitted in its own freshly spawned worker process (so peak
+memory is attributable to that model and native thread pools don't leak
+between fits). The training matrix is written once to a temporary .npy
+file and memory-mapped by every worker instead of being pickled to each.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+import joblib
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Relative share of the CPU budget per model: the forest parallelizes over
+# trees almost perfectly, the boosters and the network less so
+CPU_SHARES = {
+    'random_forest': 2,
+    'xgboost': 1,
+    'lightgbm': 1,
+    'neural_network': 1
+}
+
+def _fit_functions():
+    try:
+        from model.train_models import FIT_FUNCTIONS
+    except ImportError:
+        from train_models import FIT_FUNCTIONS
+    return FIT_FUNCTIONS
+
+def split_cpu_budget(names, cpu_budget=None, shares=CPU_SHARES):
+    """Threads per model, given a total CPU budget (default: all cores)
+
+    If the budget covers every model, all of them run at once and the
+    cores are split by share; otherwise each gets one thread and at most
+    `cpu_budget` run at a time.
+    """
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    if cpu_budget <= len(names):
+        return {name: 1 for name in names}
+
+    total_share = sum(shares.get(name, 1) for name in names)
+    threads = {name: max(1, cpu_budget * shares.get(name, 1) // total_share) for name in names}
+    # Hand out cores lost to rounding, largest share first
+    for name in sorted(names, key=lambda n: -shares.get(n, 1)):
+        if sum(threads.values()) >= cpu_budget:
+            break
+        threads[name] += 1
+    return threads
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return float('nan')
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _timed_fit(name, X, y, n_threads, params=None):
+    from threadpoolctl import threadpool_limits
+
+    start = time.perf_counter()
+    with threadpool_limits(n_threads):
+        model = _fit_functions()[name](X, y, n_threads, **(params or {}))
+    return model, time.perf_counter() - start
+
+def save_model(name, model, directory):
+    if name == 'neural_network':
+        path = os.path.join(directory, f'{name}.h5')
+        model.save(path)
+    else:
+        path = os.path.join(directory, f'{name}.pkl')
+        joblib.dump(model, path)
+    return path
+
+def load_model(name, path):
+    if name == 'neural_network':
+        from tensorflow import keras
+        return keras.models.load_model(path)
+    return joblib.load(path)
+
+def _fit_worker(name, data_dir, n_threads, params=None):
+    X = np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r')
+    start_rss = peak_rss_mb()
+    model, wall_s = _timed_fit(name, X, y, n_threads, params)
+    return {
+        'name': name,
+        'path': save_model(name, model, data_dir),
+        'threads': n_threads,
+        'wall_s': wall_s,
+        'peak_rss_mb': peak_rss_mb(),
+        'fit_rss_mb': peak_rss_mb() - start_rss
+    }
+
+def print_report(report, total_s):
+    print(f"\n{'model':<16} {'threads':>7} {'wall s':>8} {'peak RSS MB':>12} {'fit +MB':>8}")
+    for name, stats in report.items():
+        print(f"{name:<16} {stats['threads']:>7} {stats['wall_s']:>8.1f} "
+              f"{stats['peak_rss_mb']:>12.0f} {stats['fit_rss_mb']:>8.0f}")
+    serial_s = sum(stats['wall_s'] for stats in report.values())
+    print(f"Total wall time {total_s:.1f}s (sum of fits {serial_s:.1f}s)\n")
+
+def train_parallel(X, y, names=None, cpu_budget=None, params=None):
+    """Fit the base models in a process pool
+
+    `params` optionally maps a model name to hyperparameter overrides.
+    Returns ({name: fitted model}, {name: {threads, wall_s, peak_rss_mb, fit_rss_mb}}).
+    """
+    names = list(names or _fit_functions())
+    threads = split_cpu_budget(names, cpu_budget)
+    max_workers = min(len(names), cpu_budget or os.cpu_count() or 1)
+    print(f"Fitting {len(names)} models in {max_workers} processes, threads: {threads}")
+
+    start = time.perf_counter()
+    fitted, report = {}, {}
+    with tempfile.TemporaryDirectory(prefix='train-') as data_dir:
+        np.save(os.path.join(data_dir, 'X.npy'), np.ascontiguousarray(X, dtype=np.float64))
+        np.save(os.path.join(data_dir, 'y.npy'), np.asarray(y, dtype=np.float64))
+
+        # spawn: forking after OpenMP/TensorFlow have started threads can hang
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                 max_tasks_per_child=1) as pool:
+            futures = [pool.submit(_fit_worker, name, data_dir, threads[name],
+                                   (params or {}).get(name)) for name in names]
+            for future in as_completed(futures):
+                stats = future.result()
+                print(f"✓ {stats['name']} fitted in {stats['wall_s']:.1f}s")
+                report[stats['name']] = stats
+
+        # Load before the temporary directory goes away
+        for name in names:
+            fitted[name] = load_model(name, report[name].pop('path'))
+
+    report = {name: report[name] for name in names}
+    print_report(report, time.perf_counter() - start)
+    return fitted, report
+
+def train_sequential(X, y, names=None, cpu_budget=None, params=None):
+    """Fit the base models one after another in this process (same report)"""
+    names = list(names or _fit_functions())
+    n_threads = cpu_budget or os.cpu_count() or 1
+    start = time.perf_counter()
+    fitted, report = {}, {}
+    for name in names:
+        start_rss = peak_rss_mb()
+        fitted[name], wall_s = _timed_fit(name, X, y, n_threads, (params or {}).get(name))
+        print(f"✓ {name} fitted in {wall_s:.1f}s")
+        report[name] = {'threads': n_threads, 'wall_s': wall_s,
+                        'peak_rss_mb': peak_rss_mb(), 'fit_rss_mb': peak_rss_mb() - start_rss}
+    print_report(report, time.perf_counter() - start)
+    return fitted, report
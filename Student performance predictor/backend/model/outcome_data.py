@@ -0,0 +1,155 @@
+"""Data and preprocessing for the academic outcome models (GPA and GradeClass)
+
+Mirrors the preparation in Student_Academic_Outcome_Estimation (1).ipynb:
+the same feature lists, the same stratified 80/20 split and the same
+full_pipeline (median imputer, StandardScaler and Yeo-Johnson
+PowerTransformer for the numeric columns, one-hot encoding for the
+categorical ones), so results here are comparable with the notebook.
+
+Usage (from the backend directory):
+    from model.outcome_data import prepare
+    data = prepare()    # data['X_train_processed'], data['y_train_reg'], ...
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_selection import SelectKBest, f_regression
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, PowerTransformer, StandardScaler
+
+# Student_performance_data.csv sits at the repository root
+DATA_PATH = '../../Student_performance_data.csv'
+
+NUMERIC_FEATURES = ['Age', 'StudyTimeWeekly', 'Absences', 'ParentalSupport']
+CATEGORICAL_FEATURES = ['Gender', 'Ethnicity', 'ParentalEducation', 'Tutoring',
+                        'Extracurricular', 'Sports', 'Music', 'Volunteering']
+TARGET_REG = 'GPA'
+TARGET_CLS = 'GradeClass'
+ID_COLUMN = 'StudentID'
+
+def load_data(path=DATA_PATH):
+    return pd.read_csv(path)
+
+def split_data(df, test_size=0.2, random_state=42):
+    """X_train, X_test, y_train_reg, y_test_reg, y_train_cls, y_test_cls
+
+    GradeClass is stored as 0.0-4.0; it is returned as int labels.
+    """
+    X = df.drop([TARGET_REG, TARGET_CLS, ID_COLUMN], axis=1)
+    y_cls = df[TARGET_CLS].astype(int)
+    return train_test_split(X, df[TARGET_REG], y_cls, test_size=test_size,
+                            random_state=random_state, stratify=y_cls)
+
+def build_full_pipeline():
+    """The notebook's unfitted full_pipeline"""
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler()),
+        ('power_transform', PowerTransformer(method='yeo-johnson'))
+    ])
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+    ])
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, NUMERIC_FEATURES),
+            ('cat', categorical_transformer, CATEGORICAL_FEATURES)
+        ],
+        remainder='passthrough'
+    )
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('feature_selection', SelectKBest(score_func=f_regression, k='all'))
+    ])
+
+def compile_full_pipeline(full_pipeline, columns):
+    """A fitted full_pipeline reduced to plain arrays, for transform_compiled
+
+    `columns` is the order of the input columns transform_compiled will
+    be given. Scoring one row through the ColumnTransformer costs ~5 ms
+    of per-step overhead; the same arithmetic on arrays takes ~50 µs.
+    """
+    preprocessor = full_pipeline.named_steps['preprocessor']
+    numeric = preprocessor.named_transformers_['num'].named_steps
+    categorical = preprocessor.named_transformers_['cat'].named_steps
+    power, onehot = numeric['power_transform'], categorical['onehot']
+    index = {name: i for i, name in enumerate(columns)}
+    remainder = [preprocessor.feature_names_in_[i] for name, _, cols in preprocessor.transformers_
+                 if name == 'remainder' and preprocessor.remainder == 'passthrough' for i in cols]
+    return {
+        'numeric_index': np.array([index[name] for name in NUMERIC_FEATURES]),
+        'numeric_fill': numeric['imputer'].statistics_.astype(float),
+        'numeric_mean': numeric['scaler'].mean_,
+        'numeric_scale': numeric['scaler'].scale_,
+        'lambdas': power.lambdas_,
+        'power_mean': power._scaler.mean_,
+        'power_scale': power._scaler.scale_,
+        'categorical_index': np.array([index[name] for name in CATEGORICAL_FEATURES]),
+        'categorical_fill': categorical['imputer'].statistics_.astype(float),
+        # One output column per (categorical column, category)
+        'category_column': np.concatenate([np.full(len(values), i)
+                                           for i, values in enumerate(onehot.categories_)]),
+        'category_value': np.concatenate(onehot.categories_).astype(float),
+        'remainder_index': np.array([index[name] for name in remainder], dtype=int),
+        'selected': full_pipeline.named_steps['feature_selection'].get_support(indices=True)
+    }
+
+def _yeo_johnson(x, lambdas):
+    """PowerTransformer's Yeo-Johnson transform, column-wise"""
+    eps = np.spacing(1.0)
+    positive, negative = np.maximum(x, 0), np.minimum(x, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pos = np.where(np.abs(lambdas) < eps, np.log1p(positive),
+                       (np.power(positive + 1, lambdas) - 1) / lambdas)
+        neg = np.where(np.abs(lambdas - 2) < eps, -np.log1p(-negative),
+                       -(np.power(-negative + 1, 2 - lambdas) - 1) / (2 - lambdas))
+    return np.where(x >= 0, pos, neg)
+
+def transform_compiled(compiled, X):
+    """full_pipeline.transform on an (n, columns) float array, in NumPy"""
+    X = np.asarray(X, dtype=np.float64)
+    numeric = X[:, compiled['numeric_index']]
+    numeric = np.where(np.isnan(numeric), compiled['numeric_fill'], numeric)
+    numeric = (numeric - compiled['numeric_mean']) / compiled['numeric_scale']
+    numeric = _yeo_johnson(numeric, compiled['lambdas'])
+    numeric = (numeric - compiled['power_mean']) / compiled['power_scale']
+
+    categorical = X[:, compiled['categorical_index']]
+    categorical = np.where(np.isnan(categorical), compiled['categorical_fill'], categorical)
+    # handle_unknown='ignore': an unseen category encodes as all zeros
+    onehot = categorical[:, compiled['category_column']] == compiled['category_value']
+
+    out = np.hstack([numeric, onehot, X[:, compiled['remainder_index']]])
+    return out[:, compiled['selected']]
+
+def array_hash(*arrays):
+    """Short content hash of one or more arrays (values, dtype and shape)"""
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.dtype.str}{array.shape}'.encode())
+        digest.update(array.data)
+    return digest.hexdigest()[:16]
+
+def prepare(path=DATA_PATH):
+    """Split the data and fit full_pipeline on the training rows
+
+    Returns a dict with the raw splits, the fitted full_pipeline and
+    X_train_processed / X_test_processed (float64 arrays).
+    """
+    X_train, X_test, y_train_reg, y_test_reg, y_train_cls, y_test_cls = split_data(load_data(path))
+    full_pipeline = build_full_pipeline()
+    X_train_processed = full_pipeline.fit_transform(X_train, y_train_reg)
+    return {
+        'X_train': X_train, 'X_test': X_test,
+        'y_train_reg': y_train_reg.to_numpy(), 'y_test_reg': y_test_reg.to_numpy(),
+        'y_train_cls': y_train_cls.to_numpy(), 'y_test_cls': y_test_cls.to_numpy(),
+        'full_pipeline': full_pipeline,
+        'X_train_processed': np.asarray(X_train_processed, dtype=float),
+        'X_test_processed': np.asarray(full_pipeline.transform(X_test), dtype=float)
+    }
@@ -0,0 +1,306 @@
+"""PCA and t-SNE maps of the outcome data that scale to every student
+
+Replaces the dimensionality-reduction cells of
+Student_Academic_Outcome_Estimation (1).ipynb, which ran PCA(0.95) on
+X_train_processed and t-SNE on its first 1000 rows only (t-SNE on all
+1913 training rows already takes ~15s on one core, and grows faster
+than linearly). Here:
+
+    PCA       randomized, or IncrementalPCA in batches for inputs larger
+              than PCA_BATCH_ROWS (memmaps included); keeps the
+              components covering `variance` of it, as PCA(0.95) does
+    t-SNE     Barnes-Hut, on SAMPLE_ROWS landmark rows in PCA space,
+              sampled stratified by GradeClass instead of the first rows
+    the rest  placed from their nearest landmarks in PCA space, in
+              blocks, so the whole set is mapped in seconds
+
+Maps are cached under model/outcome_embeddings/ keyed by a hash of the
+data and the parameters, so asking again only loads them. cohorts()
+clusters the students (MiniBatchKMeans in PCA space) into a JSON-ready
+view: size, GPA, grade mix, what sets each cluster apart, and a capped
+sample of points to plot.
+
+Usage (from the backend directory):
+    python model/outcome_embedding.py [--students cohort.csv] [--clusters 8]
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from model.outcome_data import array_hash
+except ImportError:
+    from outcome_data import array_hash
+
+EMBEDDING_DIR = 'model/outcome_embeddings'
+# Bumped when the cached arrays change meaning
+EMBEDDING_VERSION = 1
+PCA_VARIANCE = 0.95
+PCA_BATCH_ROWS = 100_000
+# Components fitted before trimming to PCA_VARIANCE (all of them for the
+# notebook's 25 features)
+PCA_MAX_COMPONENTS = 50
+# Landmark rows embedded by t-SNE, and the iterations it runs (250 of
+# them early exaggeration); more of either is slower for little gain
+SAMPLE_ROWS = 1000
+TSNE_ITERATIONS = 500
+PERPLEXITY = 30
+# Each landmark stratum keeps at least this many rows (rare grades)
+MIN_PER_STRATUM = 20
+# Other rows sit at their nearest landmark, pulled PULL of the way
+# towards the kernel-weighted mean of their N_NEIGHBORS nearest
+N_NEIGHBORS = 5
+PULL = 0.25
+BLOCK_ROWS = 1 << 16
+POINTS_PER_CLUSTER = 200
+
+def stratified_sample(n_rows, size, strata=None, random_state=42):
+    """Sorted indices of `size` rows, in proportion to each stratum"""
+    if size >= n_rows:
+        return np.arange(n_rows)
+    rng = np.random.RandomState(random_state)
+    if strata is None:
+        return np.sort(rng.choice(n_rows, size, replace=False))
+    _, inverse, counts = np.unique(np.asarray(strata), return_inverse=True, return_counts=True)
+    quota = np.round(counts / n_rows * size).astype(int)
+    quota = np.minimum(counts, np.maximum(quota, MIN_PER_STRATUM))
+    picks = [rng.choice(np.flatnonzero(inverse == i), q, replace=False)
+             for i, q in enumerate(quota)]
+    return np.sort(np.concatenate(picks))
+
+def fit_pca(X, variance=PCA_VARIANCE, batch_rows=PCA_BATCH_ROWS, random_state=42):
+    """mean, components and explained variance ratios of X
+
+    components keeps the first components reaching `variance` of the
+    total; explained_variance_ratio covers all fitted ones (the
+    notebook's cumulative variance plot).
+    """
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    n_rows, n_features = X.shape
+    n_components = min(n_features, PCA_MAX_COMPONENTS)
+    if n_rows > batch_rows:
+        pca = IncrementalPCA(n_components=n_components)
+        # Equal batches, so the last one isn't smaller than n_components
+        bounds = np.linspace(0, n_rows, -(-n_rows // batch_rows) + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            pca.partial_fit(np.asarray(X[start:stop], dtype=np.float64))
+    else:
+        pca = PCA(n_components=n_components, svd_solver='randomized',
+                  random_state=random_state).fit(X)
+
+    ratio = pca.explained_variance_ratio_
+    kept = min(int(np.searchsorted(np.cumsum(ratio), variance)) + 1, len(ratio))
+    return {'mean': pca.mean_.astype(np.float32),
+            'components': pca.components_[:kept].astype(np.float32),
+            'explained_variance_ratio': ratio}
+
+def project(pca, X, block_rows=BLOCK_ROWS):
+    """(n, components) float32 PCA coordinates of X, block by block"""
+    out = np.empty((len(X), len(pca['components'])), dtype=np.float32)
+    for start in range(0, len(X), block_rows):
+        block = np.asarray(X[start:start + block_rows], dtype=np.float32) - pca['mean']
+        np.dot(block, pca['components'].T, out=out[start:start + block_rows])
+    return out
+
+def _tsne(Z, perplexity, random_state):
+    from sklearn.manifold import TSNE
+
+    # n_iter was renamed max_iter in scikit-learn 1.5
+    iterations = ('max_iter' if 'max_iter' in TSNE().get_params() else 'n_iter')
+    tsne = TSNE(n_components=2, perplexity=min(perplexity, len(Z) - 1), init='pca',
+                learning_rate='auto', random_state=random_state, n_jobs=-1,
+                **{iterations: TSNE_ITERATIONS})
+    return tsne.fit_transform(Z).astype(np.float32)
+
+def place(embedding, Z, block_rows=BLOCK_ROWS):
+    """(n, 2) map coordinates of rows with PCA coordinates Z
+
+    Each row goes to its nearest landmark, moved PULL of the way towards
+    the mean of its N_NEIGHBORS nearest landmarks, weighted by a
+    Gaussian of their distance relative to the nearest one. Works for
+    rows that weren't in the fitted data too (e.g. the test split).
+    """
+    from sklearn.neighbors import NearestNeighbors
+
+    landmarks, landmark_map = embedding['landmark_points'], embedding['landmark_map']
+    index = NearestNeighbors(n_neighbors=min(N_NEIGHBORS, len(landmarks))).fit(landmarks)
+    out = np.empty((len(Z), 2), dtype=np.float32)
+    for start in range(0, len(Z), block_rows):
+        distance, neighbors = index.kneighbors(Z[start:start + block_rows])
+        weights = np.exp(-np.square(distance / (distance[:, :1] + 1e-6)))
+        mean = np.einsum('nk,nkd->nd', weights, landmark_map[neighbors]) / weights.sum(axis=1,
+                                                                                keepdims=True)
+        nearest = landmark_map[neighbors[:, 0]]
+        out[start:start + block_rows] = nearest + PULL * (mean - nearest)
+    return out
+
+def _cache_key(X, strata, params):
+    data = array_hash(X) if strata is None else array_hash(X, np.asarray(strata))
+    return f"{data}-{array_hash(np.frombuffer(json.dumps(params).encode(), dtype=np.uint8))[:8]}"
+
+def embed(X, strata=None, sample_rows=SAMPLE_ROWS, perplexity=PERPLEXITY,
+          variance=PCA_VARIANCE, random_state=42, cache_dir=EMBEDDING_DIR):
+    """2-D map of every row of X (cached)
+
+    X is a processed feature matrix (e.g. X_train_processed or a memmap);
+    strata, if given, labels each row for the landmark sample (GradeClass).
+    Returns a dict with 'map' (n, 2), 'landmarks' (row indices), 'pca'
+    (fit_pca's dict), the landmarks' PCA coordinates and map positions,
+    'key', 'seconds' (to build) and 'cached'.
+    """
+    params = {'version': EMBEDDING_VERSION, 'sample_rows': sample_rows, 'perplexity': perplexity,
+              'variance': variance, 'random_state': random_state, 'iterations': TSNE_ITERATIONS,
+              'n_neighbors': N_NEIGHBORS, 'pull': PULL}
+    key = _cache_key(X, strata, params)
+    path = os.path.join(cache_dir, f'{key}.npz')
+    meta_path = os.path.join(cache_dir, f'{key}.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with np.load(path) as arrays:
+            embedding = {name: arrays[name] for name in ('map', 'landmarks', 'landmark_points',
+                                                         'landmark_map')}
+            embedding['pca'] = {name: arrays[f'pca_{name}'] for name in
+                                ('mean', 'components', 'explained_variance_ratio')}
+        return {**embedding, 'key': key, 'seconds': meta['seconds'], 'cached': True}
+
+    start = time.perf_counter()
+    pca = fit_pca(X, variance, random_state=random_state)
+    Z = project(pca, X)
+    landmarks = stratified_sample(len(X), sample_rows, strata, random_state)
+    embedding = {'landmarks': landmarks, 'landmark_points': Z[landmarks],
+                 'landmark_map': _tsne(Z[landmarks], perplexity, random_state), 'pca': pca}
+    embedding['map'] = place(embedding, Z)
+    embedding['map'][landmarks] = embedding['landmark_map']
+    seconds = time.perf_counter() - start
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Temp name + rename, and the meta file last: it marks the entry complete
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **{name: embedding[name] for name in ('map', 'landmarks', 'landmark_points',
+                                                          'landmark_map')},
+                 **{f'pca_{name}': value for name, value in pca.items()})
+    os.replace(tmp_path, path)
+    with open(meta_path, 'w') as f:
+        json.dump({**params, 'n_rows': len(X), 'n_features': X.shape[1],
+                   'n_components': len(pca['components']), 'seconds': seconds,
+                   'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f, indent=2)
+    return {**embedding, 'key': key, 'seconds': seconds, 'cached': False}
+
+def cohorts(embedding, X, frame=None, gpa=None, grade_class=None, grade_labels=None,
+            n_clusters=8, points_per_cluster=POINTS_PER_CLUSTER, random_state=42):
+    """Cluster-level view of the students mapped by embed()
+
+    Students are clustered with MiniBatchKMeans on their PCA coordinates.
+    frame (raw fields, one row per student) gives each cluster's mean
+    profile and the three fields furthest from the overall mean (in
+    standard deviations); gpa and grade_class its outcomes. Returns a
+    JSON-ready dict, clusters largest first, and the cluster of each row.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    Z = project(embedding['pca'], X)
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096, n_init=3,
+                             random_state=random_state).fit(Z)
+    labels = kmeans.labels_
+    sizes = np.bincount(labels, minlength=n_clusters)
+    rng = np.random.RandomState(random_state)
+
+    if frame is not None:
+        frame = frame.reset_index(drop=True)
+        means = frame.groupby(labels).mean()
+        overall_mean, overall_std = frame.mean(), frame.std().replace(0, 1)
+    if grade_class is not None:
+        grade_class = np.asarray(grade_class).astype(int)
+        grade_counts = pd.crosstab(labels, grade_class)
+
+    clusters = []
+    for cluster in np.argsort(-sizes):
+        members = np.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+        points = embedding['map'][rng.choice(members, min(points_per_cluster, len(members)),
+                                             replace=False)]
+        view = {'cluster': int(cluster), 'size': int(len(members)),
+                'share': float(len(members) / len(labels)),
+                'centre': np.median(embedding['map'][members], axis=0).round(3).tolist(),
+                'points': points.round(3).tolist()}
+        if gpa is not None:
+            values = np.asarray(gpa)[members]
+            view['gpa'] = {'mean': float(values.mean()),
+                           'p25': float(np.percentile(values, 25)),
+                           'p75': float(np.percentile(values, 75))}
+        if grade_class is not None:
+            counts = grade_counts.loc[cluster]
+            view['grades'] = {(grade_labels[g] if grade_labels else str(g)): float(n / len(members))
+                              for g, n in counts.items()}
+        if frame is not None:
+            profile = means.loc[cluster]
+            z = (profile - overall_mean) / overall_std
+            view['profile'] = {name: float(value) for name, value in profile.items()}
+            view['distinguishing'] = [{'field': name, 'mean': float(profile[name]),
+                                       'z': float(z[name])}
+                                      for name in z.abs().sort_values(ascending=False).index[:3]]
+        clusters.append(view)
+
+    return {'n_students': int(len(labels)), 'n_clusters': n_clusters,
+            'explained_variance_ratio': embedding['pca']['explained_variance_ratio'].tolist(),
+            'n_components': len(embedding['pca']['components']),
+            'clusters': clusters}, labels
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from model.outcome_data import (DATA_PATH, TARGET_CLS, TARGET_REG, compile_full_pipeline,
+                                    prepare, transform_compiled)
+    from model.outcome_export import GRADE_LABELS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH, help='training data for full_pipeline')
+    parser.add_argument('--students', help='CSV of students to map (default: the training split)')
+    parser.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS)
+    parser.add_argument('--clusters', type=int, default=8)
+    parser.add_argument('--output', help='cohort view JSON (default: next to the cached map)')
+    args = parser.parse_args()
+
+    data = prepare(args.data)
+    columns = list(data['X_train'].columns)
+    if args.students:
+        frame = pd.read_csv(args.students)
+        missing = [name for name in columns if name not in frame]
+        if missing:
+            raise SystemExit(f"{args.students}: missing fields {', '.join(missing)}")
+        # The NumPy form of full_pipeline: same output, no per-chunk overhead
+        X = transform_compiled(compile_full_pipeline(data['full_pipeline'], columns),
+                               frame[columns].to_numpy(dtype=float))
+        gpa = frame[TARGET_REG].to_numpy() if TARGET_REG in frame else None
+        grade_class = frame[TARGET_CLS].to_numpy().astype(int) if TARGET_CLS in frame else None
+        frame = frame[columns]
+    else:
+        X, frame = data['X_train_processed'], data['X_train']
+        gpa, grade_class = data['y_train_reg'], data['y_train_cls']
+
+    embedding = embed(X, grade_class, sample_rows=args.sample_rows)
+    start = time.perf_counter()
+    view, _ = cohorts(embedding, X, frame, gpa, grade_class, GRADE_LABELS, args.clusters)
+    cohort_s = time.perf_counter() - start
+
+    output = args.output or os.path.join(EMBEDDING_DIR, f"{embedding['key']}-cohorts.json")
+    with open(output, 'w') as f:
+        json.dump(view, f)
+    built = 'cached' if embedding['cached'] else f"{embedding['seconds']:.1f}s"
+    print(f"\n✓ {len(X):,} students mapped with {len(embedding['landmarks']):,} t-SNE landmarks, "
+          f"{view['n_components']} PCA components ({built})")
+    print(f"✓ {args.clusters} clusters in {cohort_s:.1f}s:")
+    for cluster in view['clusters']:
+        outcome = f"GPA {cluster['gpa']['mean']:.2f}" if 'gpa' in cluster else ''
+        apart = ', '.join(f"{d['field']} {d['z']:+.1f}σ" for d in cluster['distinguishing'])
+        print(f"    #{cluster['cluster']} {cluster['size']:>7,} students  {outcome}  {apart}")
+    print(f"✓ Saved {output}")
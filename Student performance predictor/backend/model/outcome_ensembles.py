@@ -0,0 +1,280 @@
+"""Voting and stacking ensembles built from cached base-model fits
+
+The notebook fits its tuned base models, then VotingRegressor,
+VotingClassifier and StackingRegressor refit every one of them again
+(stacking five more times each, for its out-of-fold predictions).
+TrainingEngine fits each base estimator once per training set and
+caches, under model/outcome_cache/<data>/<estimator>/,
+
+    estimator.joblib   the estimator fitted on all training rows
+    oof.npy            its out-of-fold predictions (predict for
+                       regressors, predict_proba for classifiers)
+    *.json             class, params and how long each part took
+
+keyed by a hash of the estimator's class and params and of X and y.
+Each part is computed the first time something needs it, so voting
+never pays for the cross-validation fits.
+
+Ensembles are then assembled from the cache as ordinary fitted sklearn
+VotingRegressor / VotingClassifier / StackingRegressor /
+StackingClassifier objects; a stacking ensemble only fits its final
+estimator on the cached out-of-fold predictions. Out-of-fold predictions
+use the same unshuffled 5-fold split as sklearn's stacking, so the
+result predicts exactly like StackingRegressor.fit would.
+
+Usage (from the backend directory):
+    python model/outcome_ensembles.py     # the notebook's three ensembles
+"""
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+from scipy.optimize import nnls
+from sklearn.base import clone
+from sklearn.ensemble import (StackingClassifier, StackingRegressor, VotingClassifier,
+                              VotingRegressor)
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.model_selection import check_cv, cross_val_predict
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import Bunch
+
+try:
+    from model.outcome_data import array_hash
+    from model.search import config_id
+except ImportError:
+    from outcome_data import array_hash
+    from search import config_id
+
+CACHE_DIR = 'model/outcome_cache'
+PARTS = {'estimator': 'estimator.joblib', 'oof': 'oof.npy'}
+
+def estimator_key(estimator):
+    """Hash of an estimator's class and params (fitted or not)"""
+    cls = type(estimator)
+    return config_id({'class': f'{cls.__module__}.{cls.__qualname__}',
+                      'params': {k: repr(v) for k, v in estimator.get_params().items()}})
+
+def _oof_method(estimator, problem_type):
+    # What stacking's stack_method='auto' would pick
+    if problem_type == 'regression':
+        return 'predict'
+    for method in ('predict_proba', 'decision_function', 'predict'):
+        if hasattr(estimator, method):
+            return method
+
+class TrainingEngine:
+    """Fits base estimators once per training set and assembles ensembles from them"""
+    def __init__(self, X, y, problem_type='regression', cv=5, cache_dir=CACHE_DIR, n_jobs=None):
+        if problem_type not in ('regression', 'classification'):
+            raise ValueError("problem_type must be 'regression' or 'classification'")
+        self.X = np.asarray(X, dtype=float)
+        self.problem_type = problem_type
+        self.n_jobs = n_jobs
+        self.label_encoder = None
+        y = np.asarray(y)
+        if problem_type == 'classification':
+            # sklearn's voting and stacking classifiers fit on encoded labels
+            self.label_encoder = LabelEncoder().fit(y)
+            y = self.label_encoder.transform(y)
+        self.y = y
+        self.cv = check_cv(cv, y, classifier=problem_type == 'classification')
+        self.root = os.path.join(cache_dir, f'{array_hash(self.X, self.y)}-{problem_type}-cv{cv}')
+        self._entries = {}
+        self.stats = {'fits': 0, 'cache_hits': 0, 'fit_s': 0.0, 'saved_s': 0.0}
+
+    def _cached(self, estimator, part, compute):
+        """part ('estimator' or 'oof') for estimator, computed on a cache miss"""
+        key = estimator_key(estimator)
+        entry = self._entries.setdefault(key, {})
+        entry_dir = os.path.join(self.root, key)
+        path = os.path.join(entry_dir, PARTS[part])
+        meta_path = os.path.join(entry_dir, f'{part}.json')
+
+        if part not in entry and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            value = joblib.load(path) if part == 'estimator' else np.load(path)
+            entry[part] = (value, meta)
+        elif part in entry:
+            value, meta = entry[part]
+        else:
+            start = time.perf_counter()
+            value = compute()
+            cls = type(estimator)
+            meta = {'class': f'{cls.__module__}.{cls.__qualname__}',
+                    'params': {k: repr(v) for k, v in estimator.get_params().items()},
+                    'seconds': time.perf_counter() - start,
+                    'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+            if part == 'oof':
+                meta['method'] = _oof_method(estimator, self.problem_type)
+            os.makedirs(entry_dir, exist_ok=True)
+            # Temp name + rename, and the meta file last: it marks the part
+            # as complete, so an interrupted fit is simply redone
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                if part == 'estimator':
+                    joblib.dump(value, f)
+                else:
+                    np.save(f, value)
+            os.replace(tmp_path, path)
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f, indent=2)
+            entry[part] = (value, meta)
+            self.stats['fits'] += 1
+            self.stats['fit_s'] += meta['seconds']
+            return value, meta
+
+        self.stats['cache_hits'] += 1
+        self.stats['saved_s'] += meta['seconds']
+        return value, meta
+
+    def fitted(self, estimator):
+        """estimator fitted on all training rows"""
+        return self._cached(estimator, 'estimator',
+                            lambda: clone(estimator).fit(self.X, self.y))[0]
+
+    def oof(self, estimator):
+        """estimator's out-of-fold predictions on the training rows"""
+        method = _oof_method(estimator, self.problem_type)
+        return self._cached(estimator, 'oof', lambda: cross_val_predict(
+            clone(estimator), self.X, self.y, cv=self.cv, method=method, n_jobs=self.n_jobs))[0]
+
+    def oof_predictions(self, estimators):
+        """{name: out-of-fold predictions} for [(name, estimator)]"""
+        return {name: self.oof(estimator) for name, estimator in estimators}
+
+    def fit_weights(self, estimators):
+        """Non-negative voting weights fitted on the out-of-fold predictions
+
+        Regression weights minimise squared error on y; classification
+        weights minimise squared error of the averaged probabilities
+        against the one-hot labels.
+        """
+        oof = self.oof_predictions(estimators)
+        if self.problem_type == 'regression':
+            columns, target = [oof[name] for name, _ in estimators], self.y
+        else:
+            columns = [oof[name].ravel() for name, _ in estimators]
+            target = np.eye(len(self.label_encoder.classes_))[self.y].ravel()
+        weights, _ = nnls(np.column_stack(columns), target.astype(float))
+        if weights.sum() <= 0:
+            return [1 / len(estimators)] * len(estimators)
+        return list(weights / weights.sum())
+
+    def _attach(self, ensemble, estimators):
+        fitted = [self.fitted(estimator) for _, estimator in estimators]
+        ensemble.estimators_ = fitted
+        ensemble.named_estimators_ = Bunch(**{name: est for (name, _), est in
+                                              zip(estimators, fitted)})
+        return fitted
+
+    def voting(self, estimators, weights=None):
+        """Fitted VotingRegressor (or soft VotingClassifier) over [(name, estimator)]
+
+        weights may be a list, None (equal) or 'oof' (fit_weights).
+        """
+        if isinstance(weights, str) and weights == 'oof':
+            weights = self.fit_weights(estimators)
+        if self.problem_type == 'regression':
+            ensemble = VotingRegressor(estimators, weights=weights, n_jobs=self.n_jobs)
+        else:
+            ensemble = VotingClassifier(estimators, voting='soft', weights=weights,
+                                        n_jobs=self.n_jobs)
+            ensemble.le_ = self.label_encoder
+            ensemble.classes_ = self.label_encoder.classes_
+        self._attach(ensemble, estimators)
+        return ensemble
+
+    def stacking(self, estimators, final_estimator=None, passthrough=False):
+        """Fitted StackingRegressor/StackingClassifier; only final_estimator is fitted here"""
+        if final_estimator is None:
+            final_estimator = Ridge() if self.problem_type == 'regression' else LogisticRegression()
+        if self.problem_type == 'regression':
+            ensemble = StackingRegressor(estimators, final_estimator=final_estimator,
+                                         passthrough=passthrough, n_jobs=self.n_jobs)
+        else:
+            ensemble = StackingClassifier(estimators, final_estimator=final_estimator,
+                                          passthrough=passthrough, n_jobs=self.n_jobs)
+            ensemble._label_encoder = self.label_encoder
+            ensemble.classes_ = self.label_encoder.classes_
+        self._attach(ensemble, estimators)
+        ensemble.stack_method_ = [_oof_method(estimator, self.problem_type)
+                                  for _, estimator in estimators]
+
+        predictions = [self.oof(estimator) for _, estimator in estimators]
+        start = time.perf_counter()
+        X_meta = ensemble._concatenate_predictions(self.X, predictions)
+        ensemble.final_estimator_ = clone(final_estimator).fit(X_meta, self.y)
+        self.stats['fit_s'] += time.perf_counter() - start
+        return ensemble
+
+    def get_stats(self):
+        return {**self.stats, 'cache_dir': self.root}
+
+def notebook_members(problem_type, stacking=False):
+    """The notebook's ensemble members with the parameters tuned by outcome_tuning.py
+
+    Voting uses the tuned RandomForest, XGBoost, LightGBM (and CatBoost,
+    if installed); the stacking regressor uses a 100-tree forest and the
+    default boosters, as in the notebook.
+    """
+    try:
+        from model.outcome_tuning import classification_models, load_best_params, regression_models
+    except ImportError:
+        from outcome_tuning import classification_models, load_best_params, regression_models
+
+    models = regression_models() if problem_type == 'regression' else classification_models()
+    names = {'RandomForest': 'rf', 'XGBoost': 'xgb', 'LightGBM': 'lgbm', 'CatBoost': 'catboost'}
+    if stacking:
+        models['RandomForest'].set_params(n_estimators=100)
+        return [(names[m], models[m]) for m in ('RandomForest', 'XGBoost', 'LightGBM')]
+    tuned = load_best_params(problem_type)
+    return [(short, models[m].set_params(**tuned.get(m, {})))
+            for m, short in names.items() if m in models]
+
+def print_stats(engine, label):
+    stats = engine.get_stats()
+    print(f"  {label}: {stats['fits']} base fits ({stats['fit_s']:.1f}s), "
+          f"{stats['cache_hits']} cache hits ({stats['saved_s']:.1f}s of fitting reused)")
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, r2_score
+    from model.outcome_data import DATA_PATH, prepare
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--weights', choices=['equal', 'oof'], default='equal',
+                        help="voting weights: equal (as in the notebook) or fitted on OOF predictions")
+    args = parser.parse_args()
+    weights = 'oof' if args.weights == 'oof' else None
+
+    data = prepare(args.data)
+    X_train, X_test = data['X_train_processed'], data['X_test_processed']
+
+    start = time.perf_counter()
+    reg = TrainingEngine(X_train, data['y_train_reg'], 'regression')
+    ensemble_regressor = reg.voting(notebook_members('regression'), weights=weights)
+    stacking_regressor = reg.stacking(notebook_members('regression', stacking=True),
+                                      final_estimator=Ridge(alpha=1.0))
+    cls = TrainingEngine(X_train, data['y_train_cls'], 'classification')
+    ensemble_classifier = cls.voting(notebook_members('classification'), weights=weights)
+    elapsed = time.perf_counter() - start
+
+    y_test_reg, y_test_cls = data['y_test_reg'], data['y_test_cls']
+    for name, model in (('Voting regression', ensemble_regressor),
+                        ('Stacking regression', stacking_regressor)):
+        pred = model.predict(X_test)
+        print(f"{name}: R² {r2_score(y_test_reg, pred):.4f}, "
+              f"RMSE {np.sqrt(mean_squared_error(y_test_reg, pred)):.4f}")
+    pred = ensemble_classifier.predict(X_test)
+    print(f"Voting classification: accuracy {accuracy_score(y_test_cls, pred):.4f}, "
+          f"F1 {f1_score(y_test_cls, pred, average='weighted'):.4f}")
+    print(f"\nBuilt in {elapsed:.1f}s")
+    print_stats(reg, 'regression')
+    print_stats(cls, 'classification')
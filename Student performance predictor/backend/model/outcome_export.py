@@ -0,0 +1,190 @@
+"""Export the notebook's GPA / GradeClass pipeline as one versioned artifact
+
+Trains on Student_performance_data.csv exactly as the notebook does
+(outcome_data.py): the fitted full_pipeline, the VotingRegressor for GPA
+(or the StackingRegressor, with --regressor stacking) and the soft
+VotingClassifier for GradeClass, built through outcome_ensembles.py with
+the parameters tuned by outcome_tuning.py when available. Alongside
+those sklearn objects the artifact holds array-only compiled forms of the
+pipeline and the tree ensembles (outcome_data.compile_full_pipeline and
+tree_compiler.py), checked against the native predictions before saving:
+
+    model/outcome/pipeline-<version>.joblib
+    model/outcome/current.json      version, file, metrics (what the API loads)
+
+<version> is the build time plus a hash of the training data. Older
+artifacts are kept; pointing current.json back at one rolls back.
+model/outcome/ is not committed (each artifact is ~10 MB and loads only
+with the scikit-learn it was exported with): build it wherever the API
+runs, or copy the directory from a build machine with the same
+requirements.txt. Until it exists /api/predict/gpa answers "GPA model not
+loaded".
+
+Usage (from the backend directory):
+    python model/outcome_export.py [--regressor stacking]
+The Flask API serves it at /api/predict/gpa (see outcome_service.py).
+"""
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+
+ARTIFACT_DIR = 'model/outcome'
+FORMAT_VERSION = 1
+# GradeClass 0-4 as letter grades (A: GPA >= 3.5, ..., F: GPA < 2.0)
+GRADE_LABELS = ['A', 'B', 'C', 'D', 'F']
+
+def _library_versions():
+    import lightgbm
+    import sklearn
+    import xgboost
+    return {'scikit-learn': sklearn.__version__, 'xgboost': xgboost.__version__,
+            'lightgbm': lightgbm.__version__, 'numpy': np.__version__}
+
+def _tree_members(ensemble):
+    """tree_compiler name of each member of an ensemble (None where it can't compile)"""
+    members = []
+    for estimator in ensemble.estimators_:
+        kind = type(estimator).__name__
+        name = ('random_forest' if kind.startswith('RandomForest') else
+                'xgboost' if kind.startswith('XGB') else
+                'lightgbm' if kind.startswith('LGBM') else None)
+        # A node table holds one model of each kind
+        members.append(name if name not in members else None)
+    return members
+
+def compile_models(artifact):
+    """Array-only compiled forms of full_pipeline and the ensembles' members
+
+    Members tree_compiler can't flatten (e.g. CatBoost) stay native, as
+    does a classifier without soft voting (its probabilities aren't an
+    average of its members').
+    """
+    from model.outcome_data import compile_full_pipeline
+    from model.tree_compiler import CompiledForest
+
+    full_pipeline = artifact['full_pipeline']
+    n_features = len(full_pipeline.named_steps['feature_selection'].get_support(indices=True))
+    compiled = {'pipeline': compile_full_pipeline(full_pipeline, artifact['input_columns'])}
+
+    for kind, n_outputs in (('regressor', 1), ('classifier', len(artifact['classifier'].classes_))):
+        ensemble = artifact[kind]
+        members = _tree_members(ensemble)
+        if kind == 'classifier' and getattr(ensemble, 'voting', None) != 'soft':
+            members = [None] * len(members)
+        models = {name: estimator for name, estimator in zip(members, ensemble.estimators_) if name}
+        compiled[kind] = models and {
+            'members': members,
+            'forest': CompiledForest.from_models(models, n_features, n_outputs).to_arrays()}
+    return compiled
+
+def verify_compiled(artifact, X, atol=1e-4):
+    """Max abs difference between the compiled and native predictions on X"""
+    from outcome_service import OutcomePredictor
+
+    native, _ = OutcomePredictor(artifact, backend='native').score(X)
+    compiled, _ = OutcomePredictor(artifact, backend='compiled').score(X)
+    report = {name: float(np.abs(native[name] - compiled[name]).max())
+              for name in ('gpa', 'probabilities')}
+    for name, max_diff in report.items():
+        if max_diff > atol:
+            raise ValueError(f"Compiled {name} differs from native (max abs diff {max_diff:.2e})")
+    return report
+
+def export(data_path, regressor='voting', artifact_dir=ARTIFACT_DIR):
+    """Train, evaluate and write the artifact; returns the manifest"""
+    from sklearn.linear_model import Ridge
+    from sklearn.metrics import (accuracy_score, f1_score, mean_absolute_error,
+                                 mean_squared_error, r2_score)
+
+    from model.feature_store import source_hash
+    from model.outcome_data import array_hash, prepare
+    from model.outcome_ensembles import TrainingEngine, notebook_members
+
+    data = prepare(data_path)
+    X_train, X_test = data['X_train_processed'], data['X_test_processed']
+    reg = TrainingEngine(X_train, data['y_train_reg'], 'regression')
+    if regressor == 'stacking':
+        model_reg = reg.stacking(notebook_members('regression', stacking=True),
+                                 final_estimator=Ridge(alpha=1.0))
+    else:
+        model_reg = reg.voting(notebook_members('regression'))
+    model_cls = TrainingEngine(X_train, data['y_train_cls'], 'classification').voting(
+        notebook_members('classification'))
+
+    pred_reg = model_reg.predict(X_test)
+    pred_cls = model_cls.predict(X_test)
+    metrics = {
+        'gpa': {'r2': float(r2_score(data['y_test_reg'], pred_reg)),
+                'rmse': float(np.sqrt(mean_squared_error(data['y_test_reg'], pred_reg))),
+                'mae': float(mean_absolute_error(data['y_test_reg'], pred_reg))},
+        'grade_class': {'accuracy': float(accuracy_score(data['y_test_cls'], pred_cls)),
+                        'f1': float(f1_score(data['y_test_cls'], pred_cls, average='weighted'))}
+    }
+
+    X_raw = data['X_train']
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{array_hash(X_train, data['y_train_reg'])[:8]}"
+    artifact = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'input_columns': list(X_raw.columns),
+        # Median training row, used to warm the pipeline up at load time
+        'reference_row': X_raw.median().to_dict(),
+        'grade_labels': GRADE_LABELS,
+        'full_pipeline': data['full_pipeline'],
+        'regressor': model_reg,
+        'classifier': model_cls,
+        'metrics': metrics,
+        'training_data': {'file': os.path.basename(data_path), 'sha256': source_hash(data_path),
+                          'n_train': len(X_raw), 'n_test': len(data['X_test'])},
+        'library_versions': _library_versions()
+    }
+    artifact['compiled'] = compile_models(artifact)
+    # Checked on the training and test rows
+    X_all = np.vstack([X_raw.to_numpy(dtype=float), data['X_test'][X_raw.columns].to_numpy(dtype=float)])
+    compiled_diff = verify_compiled(artifact, X_all)
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    filename = f'pipeline-{version}.joblib'
+    tmp_path = os.path.join(artifact_dir, f'.{filename}.tmp')
+    joblib.dump(artifact, tmp_path, compress=3)
+    os.replace(tmp_path, os.path.join(artifact_dir, filename))
+
+    manifest = {key: artifact[key] for key in ('format_version', 'version', 'created_at',
+                                               'metrics', 'training_data', 'library_versions')}
+    manifest.update({'file': filename, 'regressor': type(model_reg).__name__,
+                     'classifier': type(model_cls).__name__,
+                     'compiled': {name: bool(artifact['compiled'][name])
+                                  for name in ('regressor', 'classifier')},
+                     'compiled_max_abs_diff': compiled_diff})
+    # current.json is swapped last, so the API never sees a missing artifact
+    tmp_path = os.path.join(artifact_dir, '.current.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(artifact_dir, 'current.json'))
+    return manifest
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from model.outcome_data import DATA_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--regressor', choices=['voting', 'stacking'], default='voting')
+    args = parser.parse_args()
+
+    manifest = export(args.data, args.regressor)
+    gpa, grade = manifest['metrics']['gpa'], manifest['metrics']['grade_class']
+    print(f"\n✓ {manifest['regressor']} GPA: R² {gpa['r2']:.4f}, RMSE {gpa['rmse']:.4f}")
+    print(f"✓ {manifest['classifier']} GradeClass: accuracy {grade['accuracy']:.4f}, "
+          f"F1 {grade['f1']:.4f}")
+    print(f"✓ Compiled regressor: {manifest['compiled']['regressor']}, classifier: "
+          f"{manifest['compiled']['classifier']} (max abs diff vs native "
+          f"{max(manifest['compiled_max_abs_diff'].values()):.1e})")
+    print(f"✓ Saved {os.path.join(ARTIFACT_DIR, manifest['file'])} (version {manifest['version']})")
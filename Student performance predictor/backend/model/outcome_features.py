@@ -0,0 +1,180 @@
+"""Engineered features for the academic outcome models, computed in one pass
+
+Replaces engineer_features from Student_Academic_Outcome_Estimation (1).ipynb,
+which ignored its argument (it copied the global df) and added each of
+its twelve columns with a separate pandas assignment. Here the features
+are computed from the frame passed in, block by block, straight into a
+preallocated float32 matrix laid out as
+
+    INPUT_COLUMNS (the 12 raw predictors) + ENGINEERED_FEATURES (12)
+
+Each block's inputs are copied in and its features computed with in-place
+NumPy ufuncs while the block is still in cache, so no full-size
+temporaries are allocated. For files larger than RAM, engineer_csv
+streams a CSV in chunks into a memory-mapped .npy under
+model/outcome_features/, memoized by the file's SHA-256 and a hash of
+the feature code: asking for the same file again just maps the result.
+
+Usage (from the backend directory):
+    from model.outcome_features import engineer_matrix, engineer_features, engineer_csv
+    X = engineer_matrix(df)                    # (n, 24) float32
+    X = engineer_csv('students.csv')           # memory-mapped, cached
+"""
+import hashlib
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from model.feature_store import dataset_name, source_hash
+except ImportError:
+    from feature_store import dataset_name, source_hash
+
+FEATURE_CACHE_DIR = 'model/outcome_features'
+# Rows per block: inputs and outputs of a block (~6 MB) stay in cache
+BLOCK_ROWS = 1 << 16
+CSV_CHUNK_ROWS = 1_000_000
+
+INPUT_COLUMNS = ['Age', 'Gender', 'Ethnicity', 'ParentalEducation', 'StudyTimeWeekly',
+                 'Absences', 'Tutoring', 'ParentalSupport', 'Extracurricular', 'Sports',
+                 'Music', 'Volunteering']
+ENGINEERED_FEATURES = ['TotalExtracurricular', 'StudyEfficiency', 'SupportScore',
+                       'TutoringImpact', 'Study_ParentSupport', 'Age_Study',
+                       'Absence_Performance', 'Tutoring_Support', 'StudyTime_squared',
+                       'Absences_squared', 'StudyTime_sqrt', 'Absences_log']
+OUTPUT_COLUMNS = INPUT_COLUMNS + ENGINEERED_FEATURES
+
+def _fill_block(out):
+    """Compute the engineered columns of an (n, 24) block from its input columns"""
+    c = {name: out[:, i] for i, name in enumerate(INPUT_COLUMNS)}
+    e = {name: out[:, len(INPUT_COLUMNS) + i] for i, name in enumerate(ENGINEERED_FEATURES)}
+    study, absences = c['StudyTimeWeekly'], c['Absences']
+
+    total = e['TotalExtracurricular']
+    np.add(c['Extracurricular'], c['Sports'], out=total)
+    np.add(total, c['Music'], out=total)
+    np.add(total, c['Volunteering'], out=total)
+
+    np.add(absences, 1, out=e['StudyEfficiency'])
+    np.divide(study, e['StudyEfficiency'], out=e['StudyEfficiency'])
+    np.multiply(c['ParentalSupport'], c['ParentalEducation'], out=e['SupportScore'])
+    np.divide(e['SupportScore'], 4, out=e['SupportScore'])
+
+    np.multiply(c['Tutoring'], study, out=e['TutoringImpact'])
+    np.divide(e['TutoringImpact'], 10, out=e['TutoringImpact'])
+    np.multiply(study, c['ParentalSupport'], out=e['Study_ParentSupport'])
+    np.multiply(c['Age'], study, out=e['Age_Study'])
+
+    np.multiply(absences, c['ParentalEducation'], out=e['Absence_Performance'])
+    np.multiply(c['Tutoring'], c['ParentalSupport'], out=e['Tutoring_Support'])
+
+    np.square(study, out=e['StudyTime_squared'])
+    np.square(absences, out=e['Absences_squared'])
+    np.add(study, 0.1, out=e['StudyTime_sqrt'])
+    np.sqrt(e['StudyTime_sqrt'], out=e['StudyTime_sqrt'])
+    np.log1p(absences, out=e['Absences_log'])
+
+def feature_code_version():
+    """Short hash of the feature code and column layout"""
+    code = inspect.getsource(_fill_block) + ','.join(OUTPUT_COLUMNS)
+    return hashlib.sha1(code.encode()).hexdigest()[:12]
+
+def engineer_matrix(X, out=None, block_rows=BLOCK_ROWS):
+    """(n, 24) float32 matrix of X's inputs and engineered features
+
+    X is a DataFrame with the INPUT_COLUMNS (other columns are ignored).
+    Pass `out` to fill a preallocated array or memmap of that shape.
+    """
+    missing = [name for name in INPUT_COLUMNS if name not in X.columns]
+    if missing:
+        raise ValueError(f"Missing input columns: {missing}")
+    n_rows = len(X)
+    if out is None:
+        out = np.empty((n_rows, len(OUTPUT_COLUMNS)), dtype=np.float32)
+    elif out.shape != (n_rows, len(OUTPUT_COLUMNS)):
+        raise ValueError(f"out has shape {out.shape}, expected {(n_rows, len(OUTPUT_COLUMNS))}")
+
+    # Column arrays are views of the frame's blocks, not copies
+    columns = [X[name].to_numpy() for name in INPUT_COLUMNS]
+    for start in range(0, n_rows, block_rows):
+        block = out[start:start + block_rows]
+        for i, column in enumerate(columns):
+            block[:, i] = column[start:start + block_rows]
+        _fill_block(block)
+    return out
+
+def engineer_features(X):
+    """Drop-in for the notebook's engineer_features: X plus the engineered columns"""
+    matrix = engineer_matrix(X)
+    engineered = pd.DataFrame(matrix[:, len(INPUT_COLUMNS):], columns=ENGINEERED_FEATURES,
+                              index=X.index)
+    return pd.concat([X, engineered], axis=1)
+
+def engineer_chunks(chunks, out):
+    """Fill out (e.g. a memmap) from an iterable of DataFrame chunks; returns rows written"""
+    row = 0
+    for chunk in chunks:
+        engineer_matrix(chunk, out=out[row:row + len(chunk)])
+        row += len(chunk)
+    return row
+
+def _count_rows(path, chunk_size=1 << 24):
+    """Data rows in a CSV with a header (counts line breaks)"""
+    lines, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    return lines - 1 + (last != b'\n')
+
+def engineer_csv(path, cache_dir=FEATURE_CACHE_DIR, chunk_rows=CSV_CHUNK_ROWS):
+    """Engineered matrix for a CSV of any size, memory-mapped and memoized
+
+    The result is written to <cache_dir>/<name>-<file hash>-<code version>.npy
+    in chunks, so memory use is bounded by chunk_rows whatever the file
+    size, and reused while neither the file nor the feature code changes.
+    """
+    key = f'{dataset_name(path)}-{source_hash(path)[:12]}-{feature_code_version()}'
+    out_path = os.path.join(cache_dir, f'{key}.npy')
+    if os.path.exists(out_path):
+        return np.load(out_path, mmap_mode='r')
+
+    os.makedirs(cache_dir, exist_ok=True)
+    n_rows = _count_rows(path)
+    tmp_path = f'{out_path}.tmp'
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                    shape=(n_rows, len(OUTPUT_COLUMNS)))
+    try:
+        chunks = pd.read_csv(path, usecols=INPUT_COLUMNS, dtype=np.float32, chunksize=chunk_rows)
+        written = engineer_chunks(chunks, out)
+        if written != n_rows:
+            raise ValueError(f"{path}: read {written} rows, expected {n_rows}")
+        out.flush()
+        del out
+        # Renamed into place only when complete
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return np.load(out_path, mmap_mode='r')
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', help='CSV files to engineer')
+    parser.add_argument('--chunk-rows', type=int, default=CSV_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    for source in args.sources:
+        start = time.perf_counter()
+        matrix = engineer_csv(source, chunk_rows=args.chunk_rows)
+        print(f"{source}: {matrix.shape[0]:,} rows x {matrix.shape[1]} features "
+              f"in {time.perf_counter() - start:.2f}s -> {matrix.filename}")
@@ -0,0 +1,441 @@
+"""Parallel, resumable tuning of the notebook's regression and classification models
+
+A drop-in for tune_and_evaluate_models in
+Student_Academic_Outcome_Estimation (1).ipynb. The notebook runs
+cross_val_score and RandomizedSearchCV model after model, re-splitting
+the folds and copying X_train_processed into every job. Here:
+
+  * X_train_processed is written once as .npy and memory-mapped by the
+    workers, keyed by a hash of its contents
+  * fold indices (5-fold for the baseline score, 3-fold for the search,
+    stratified for classification, as in sklearn) are computed once
+  * every (model, parameter sample) trial of every model goes into one
+    process pool, one thread per worker
+  * boosters (XGBoost, LightGBM, CatBoost, GradientBoosting) stop early
+    on a slice of each fold's training rows; the final refit uses the
+    median best iteration across folds
+  * finished trials are appended to model/tuning/<data>/<track>-<labels>/<model>.jsonl,
+    so an interrupted run resumes where it stopped
+
+Trials sample the same parameters as RandomizedSearchCV(n_iter=20,
+random_state=42). CatBoost is tuned when it is installed.
+
+Usage (from the backend directory):
+    python model/outcome_tuning.py [--track regression] [--models XGBoost Ridge]
+                                   [--n-iter 20] [--workers 4]
+or from the notebook, with the backend directory on sys.path:
+    from model.outcome_tuning import tune_and_evaluate_models, param_grids
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import (accuracy_score, f1_score, mean_absolute_error,
+                             mean_squared_error, r2_score)
+from sklearn.model_selection import KFold, ParameterSampler, StratifiedKFold, train_test_split
+
+try:
+    from model.outcome_data import array_hash
+    from model.search import TrialLog, config_id
+except ImportError:
+    from outcome_data import array_hash
+    from search import TrialLog, config_id
+
+TUNING_DIR = 'model/tuning'
+EARLY_STOPPING_ROUNDS = 20
+# Share of each fold's training rows held out to decide when a booster stops
+EARLY_STOPPING_FRACTION = 0.1
+
+param_grids = {
+    'RandomForest': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [10, 20, 30, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4]
+    },
+    'XGBoost': {
+        'n_estimators': [100, 200],
+        'max_depth': [3, 5, 7],
+        'learning_rate': [0.01, 0.1, 0.3],
+        'subsample': [0.8, 1.0],
+        'colsample_bytree': [0.8, 1.0]
+    },
+    'LightGBM': {
+        'n_estimators': [100, 200],
+        'max_depth': [5, 10, 15],
+        'learning_rate': [0.01, 0.1, 0.2],
+        'num_leaves': [31, 63, 127],
+        'subsample': [0.8, 1.0]
+    },
+    'CatBoost': {
+        'iterations': [100, 200],
+        'depth': [4, 6, 8],
+        'learning_rate': [0.01, 0.1, 0.2],
+        'l2_leaf_reg': [1, 3, 5]
+    },
+    'LinearRegression': {
+        'fit_intercept': [True, False]
+    },
+    'Ridge': {
+        'alpha': [0.1, 1.0, 10.0, 100.0]
+    },
+    'Lasso': {
+        'alpha': [0.001, 0.01, 0.1, 1.0]
+    },
+    'ElasticNet': {
+        'alpha': [0.1, 1.0, 10.0],
+        'l1_ratio': [0.25, 0.5, 0.75]
+    },
+    'LogisticRegression': {
+        'C': [0.01, 0.1, 1.0, 10.0, 100.0],
+        'solver': ['liblinear', 'saga']
+    },
+    'GradientBoosting': {
+        'n_estimators': [100, 200],
+        'max_depth': [3, 5, 7],
+        'learning_rate': [0.01, 0.1, 0.3],
+        'subsample': [0.8, 1.0]
+    },
+    'SVR': {
+        'C': [0.1, 1, 10, 100],
+        'kernel': ['rbf', 'linear', 'poly']
+    },
+    'SVC': {
+        'C': [0.1, 1, 10, 100],
+        'kernel': ['rbf', 'linear']
+    },
+    'MLP': {
+        'hidden_layer_sizes': [(50,), (100,), (50, 50), (100, 50, 25)],
+        'activation': ['relu', 'tanh'],
+        'alpha': [0.0001, 0.001, 0.01]
+    }
+}
+
+def _catboost():
+    try:
+        import catboost
+        return catboost
+    except ImportError:
+        print("CatBoost is not installed, skipping it")
+        return None
+
+def regression_models():
+    """The notebook's regression models (single-threaded; trials run in parallel)"""
+    import lightgbm as lgb
+    import xgboost as xgb
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, Ridge
+
+    models = {
+        'LinearRegression': LinearRegression(),
+        'Ridge': Ridge(random_state=42),
+        'Lasso': Lasso(random_state=42),
+        'ElasticNet': ElasticNet(random_state=42),
+        'RandomForest': RandomForestRegressor(random_state=42),
+        'GradientBoosting': GradientBoostingRegressor(random_state=42),
+        'XGBoost': xgb.XGBRegressor(random_state=42, verbosity=0, n_jobs=1),
+        'LightGBM': lgb.LGBMRegressor(random_state=42, verbose=-1, n_jobs=1)
+    }
+    cb = _catboost()
+    if cb is not None:
+        models['CatBoost'] = cb.CatBoostRegressor(random_state=42, verbose=0, thread_count=1)
+    return models
+
+def classification_models():
+    """The notebook's classification models"""
+    import lightgbm as lgb
+    import xgboost as xgb
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    models = {
+        'LogisticRegression': LogisticRegression(random_state=42, max_iter=1000),
+        'RandomForest': RandomForestClassifier(random_state=42),
+        'GradientBoosting': GradientBoostingClassifier(random_state=42),
+        'XGBoost': xgb.XGBClassifier(random_state=42, verbosity=0, n_jobs=1),
+        'LightGBM': lgb.LGBMClassifier(random_state=42, verbose=-1, n_jobs=1)
+    }
+    cb = _catboost()
+    if cb is not None:
+        models['CatBoost'] = cb.CatBoostClassifier(random_state=42, verbose=0, thread_count=1)
+    return models
+
+def sample_params(grid, n_iter, seed=42):
+    """The parameter sets RandomizedSearchCV(n_iter, random_state=seed) would try"""
+    n_total = int(np.prod([len(values) for values in grid.values()]))
+    samples = ParameterSampler(grid, n_iter=min(n_iter, n_total), random_state=seed)
+    # ParameterSampler returns numpy scalars for some grids
+    return [{key: (value.item() if hasattr(value, 'item') else value)
+             for key, value in params.items()} for params in samples]
+
+def _fold_indices(y, n_splits, problem_type):
+    """[(fit_idx, stop_idx, val_idx)] with cross_val_score's default splitter
+
+    stop_idx is the slice of the training rows boosters stop early on.
+    """
+    if problem_type == 'classification':
+        splitter = StratifiedKFold(n_splits)
+    else:
+        splitter = KFold(n_splits)
+    folds = []
+    for train_idx, val_idx in splitter.split(np.zeros(len(y)), y):
+        stratify = y[train_idx] if problem_type == 'classification' else None
+        fit_idx, stop_idx = train_test_split(train_idx, test_size=EARLY_STOPPING_FRACTION,
+                                             random_state=0, stratify=stratify)
+        folds.append((np.sort(fit_idx), np.sort(stop_idx), val_idx))
+    return folds
+
+def stage_data(X_train, y_train, problem_type, cv=3, baseline_cv=5, tuning_dir=TUNING_DIR):
+    """Write X, y and fold indices once; returns the run directory
+
+    X goes to tuning_dir/<hash of X>/X.npy (shared by both tracks), the
+    labels and folds to a <track>-<hash of y> directory below it.
+    """
+    X_train = np.asarray(X_train, dtype=float)
+    y_train = np.asarray(y_train)
+    data_dir = os.path.join(tuning_dir, array_hash(X_train))
+    run_dir = os.path.join(data_dir, f'{problem_type}-{array_hash(y_train)}')
+    os.makedirs(run_dir, exist_ok=True)
+
+    # Written under a temporary name and renamed, so a reader never sees a
+    # partial file
+    x_path = os.path.join(data_dir, 'X.npy')
+    if not os.path.exists(x_path):
+        np.save(x_path + '.tmp.npy', X_train)
+        os.replace(x_path + '.tmp.npy', x_path)
+    for n_splits in (cv, baseline_cv):
+        path = os.path.join(run_dir, f'folds-{n_splits}.npz')
+        if not os.path.exists(path):
+            folds = _fold_indices(y_train, n_splits, problem_type)
+            arrays = {f'{part}_{k}': idx for k, fold in enumerate(folds)
+                      for part, idx in zip(('fit', 'stop', 'val'), fold)}
+            np.savez(path + '.tmp.npz', **arrays)
+            os.replace(path + '.tmp.npz', path)
+    y_path = os.path.join(run_dir, 'y.npy')
+    if not os.path.exists(y_path):
+        np.save(y_path + '.tmp.npy', y_train)
+        os.replace(y_path + '.tmp.npy', y_path)
+    return run_dir
+
+def _load_folds(run_dir, n_splits):
+    with np.load(os.path.join(run_dir, f'folds-{n_splits}.npz')) as data:
+        return [(data[f'fit_{k}'], data[f'stop_{k}'], data[f'val_{k}']) for k in range(n_splits)]
+
+def _iterations_param(estimator):
+    return 'iterations' if type(estimator).__module__.startswith('catboost') else 'n_estimators'
+
+def fit_with_early_stopping(estimator, X_fit, y_fit, X_stop, y_stop,
+                            rounds=EARLY_STOPPING_ROUNDS):
+    """Fit, stopping boosters early on (X_stop, y_stop)
+
+    Returns the number of boosting iterations used, or None for models
+    that don't boost.
+    """
+    module = type(estimator).__module__
+    if module.startswith('xgboost'):
+        estimator.set_params(early_stopping_rounds=rounds)
+        estimator.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], verbose=False)
+        return int(estimator.best_iteration) + 1
+    if module.startswith('lightgbm'):
+        import lightgbm as lgb
+        estimator.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)],
+                      callbacks=[lgb.early_stopping(rounds, verbose=False)])
+        return int(estimator.best_iteration_ or estimator.n_estimators)
+    if module.startswith('catboost'):
+        estimator.fit(X_fit, y_fit, eval_set=(X_stop, y_stop), early_stopping_rounds=rounds)
+        return int(estimator.get_best_iteration()) + 1
+    if hasattr(estimator, 'n_iter_no_change'):
+        # sklearn's gradient boosting holds out its own validation_fraction
+        estimator.set_params(n_iter_no_change=rounds, validation_fraction=EARLY_STOPPING_FRACTION)
+        estimator.fit(np.concatenate([X_fit, X_stop]), np.concatenate([y_fit, y_stop]))
+        return int(estimator.n_estimators_)
+    estimator.fit(np.concatenate([X_fit, X_stop]), np.concatenate([y_fit, y_stop]))
+    return None
+
+def _score(problem_type, y_true, y_pred):
+    if problem_type == 'regression':
+        return float(r2_score(y_true, y_pred))
+    return float(accuracy_score(y_true, y_pred))
+
+def _trial_worker(estimator, params, run_dir, n_splits, problem_type, early_stopping):
+    from threadpoolctl import threadpool_limits
+
+    X = np.load(os.path.join(os.path.dirname(run_dir), 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(run_dir, 'y.npy'))
+    scores, iterations = [], []
+    start = time.perf_counter()
+    with threadpool_limits(1):
+        for fit_idx, stop_idx, val_idx in _load_folds(run_dir, n_splits):
+            model = clone(estimator).set_params(**params)
+            if early_stopping:
+                n_iter = fit_with_early_stopping(model, X[fit_idx], y[fit_idx],
+                                                 X[stop_idx], y[stop_idx])
+                iterations.append(n_iter)
+            else:
+                train_idx = np.sort(np.concatenate([fit_idx, stop_idx]))
+                model.fit(X[train_idx], y[train_idx])
+            scores.append(_score(problem_type, y[val_idx], model.predict(X[val_idx])))
+    return {
+        'scores': scores,
+        'score': float(np.mean(scores)),
+        'std': float(np.std(scores)),
+        'iterations': iterations if any(n is not None for n in iterations) else None,
+        'fit_s': time.perf_counter() - start
+    }
+
+def _refit_worker(estimator, params, run_dir):
+    from threadpoolctl import threadpool_limits
+
+    X = np.load(os.path.join(os.path.dirname(run_dir), 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(run_dir, 'y.npy'))
+    with threadpool_limits(1):
+        return clone(estimator).set_params(**params).fit(np.asarray(X), y)
+
+def _metrics(problem_type, y_train, y_pred_train, y_test, y_pred_test):
+    if problem_type == 'regression':
+        return {
+            'Train_R2': r2_score(y_train, y_pred_train),
+            'Test_R2': r2_score(y_test, y_pred_test),
+            'Train_RMSE': np.sqrt(mean_squared_error(y_train, y_pred_train)),
+            'Test_RMSE': np.sqrt(mean_squared_error(y_test, y_pred_test)),
+            'Train_MAE': mean_absolute_error(y_train, y_pred_train),
+            'Test_MAE': mean_absolute_error(y_test, y_pred_test)
+        }
+    return {
+        'Train_Accuracy': accuracy_score(y_train, y_pred_train),
+        'Test_Accuracy': accuracy_score(y_test, y_pred_test),
+        'Train_F1': f1_score(y_train, y_pred_train, average='weighted'),
+        'Test_F1': f1_score(y_test, y_pred_test, average='weighted')
+    }
+
+def tune_and_evaluate_models(X_train, X_test, y_train, y_test, models_dict, param_grids_dict,
+                             problem_type='regression', n_iter=20, cv=3, baseline_cv=5,
+                             workers=None, early_stopping=True, tuning_dir=TUNING_DIR):
+    """Same inputs and outputs as the notebook's function: (results DataFrame, best_models)
+
+    Every model's baseline CV and parameter samples run in one process
+    pool; finished trials are checkpointed and skipped on the next run.
+    """
+    X_train = np.asarray(X_train, dtype=float)
+    y_train = np.asarray(y_train)
+    run_dir = stage_data(X_train, y_train, problem_type, cv, baseline_cv, tuning_dir)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    logs, samples, jobs = {}, {}, []
+    for model_name, model in models_dict.items():
+        # Changing a model's fixed params (e.g. random_state) starts a new log
+        base_key = config_id({k: repr(v) for k, v in model.get_params().items()})
+        logs[model_name] = TrialLog(os.path.join(run_dir, f'{model_name}.jsonl'),
+                                    f'{cv}-{baseline_cv}-{int(early_stopping)}-{base_key}')
+        done = logs[model_name].load()
+        samples[model_name] = sample_params(param_grids_dict[model_name], n_iter)
+        trials = [('baseline', {}, baseline_cv)] + [(config_id(p), p, cv)
+                                                    for p in samples[model_name]]
+        jobs += [(model_name, cid, params, n_splits) for cid, params, n_splits in trials
+                 if (cid, 0) not in done]
+
+    n_done = sum(len(log.load()) for log in logs.values())
+    print(f"{problem_type}: {len(jobs)} trials to run, {n_done} already done, {workers} workers")
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(_trial_worker, models_dict[name], params, run_dir, n_splits,
+                               problem_type, early_stopping): (name, cid, params)
+                   for name, cid, params, n_splits in jobs}
+        for future in as_completed(futures):
+            name, cid, params = futures[future]
+            record = {'config_id': cid, 'rung': 0, 'params': params, **future.result()}
+            logs[name].append(record)
+            print(f"  {name} {cid}: {record['score']:.4f} (±{record['std']:.4f}) "
+                  f"in {record['fit_s']:.1f}s")
+
+        # Refit each model's best sample on all training rows
+        best = {}
+        for model_name, model in models_dict.items():
+            done = logs[model_name].load()
+            # Params come from the samples, not the log (JSON turns tuples into lists)
+            record, params = max(((done[(config_id(p), 0)], dict(p)) for p in samples[model_name]),
+                                 key=lambda trial: trial[0]['score'])
+            if record['iterations']:
+                params[_iterations_param(model)] = int(np.median(record['iterations']))
+            best[model_name] = (record, done[('baseline', 0)], params,
+                                pool.submit(_refit_worker, model, params, run_dir))
+
+    results, best_models = [], {}
+    for model_name, (record, baseline, params, future) in best.items():
+        best_model = future.result()
+        metrics = _metrics(problem_type, y_train, best_model.predict(X_train),
+                           y_test, best_model.predict(np.asarray(X_test, dtype=float)))
+        results.append({
+            'Model': model_name,
+            'CV_Score': record['score'],
+            'CV_Std': baseline['std'],
+            **metrics,
+            'Best_Params': params
+        })
+        best_models[model_name] = best_model
+        print(f"{model_name}: CV {record['score']:.4f}, best params {params}")
+
+    print(f"Tuned {len(models_dict)} {problem_type} models in {time.perf_counter() - start:.1f}s")
+    return pd.DataFrame(results), best_models
+
+def save_best_params(results, problem_type, tuning_dir=TUNING_DIR):
+    """Merge each model's tuned params into tuning_dir/best_params.json"""
+    path = os.path.join(tuning_dir, 'best_params.json')
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        saved = {}
+    saved[problem_type] = {row['Model']: row['Best_Params'] for _, row in results.iterrows()}
+    os.makedirs(tuning_dir, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(saved, f, indent=2)
+    return path
+
+def load_best_params(problem_type, tuning_dir=TUNING_DIR):
+    """Tuned {model: params} for a track, or {} if it was never tuned"""
+    try:
+        with open(os.path.join(tuning_dir, 'best_params.json')) as f:
+            return json.load(f).get(problem_type, {})
+    except FileNotFoundError:
+        return {}
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    # Run as a script: make model.* importable here and in the workers
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from model.outcome_data import DATA_PATH, prepare
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--track', choices=['regression', 'classification', 'both'],
+                        default='both')
+    parser.add_argument('--models', nargs='+', help='subset of the models to tune')
+    parser.add_argument('--n-iter', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-early-stopping', action='store_true')
+    args = parser.parse_args()
+
+    data = prepare(args.data)
+    tracks = ['regression', 'classification'] if args.track == 'both' else [args.track]
+    for track in tracks:
+        models = regression_models() if track == 'regression' else classification_models()
+        if args.models:
+            models = {name: model for name, model in models.items() if name in args.models}
+        suffix = 'reg' if track == 'regression' else 'cls'
+        results, _ = tune_and_evaluate_models(
+            data['X_train_processed'], data['X_test_processed'],
+            data[f'y_train_{suffix}'], data[f'y_test_{suffix}'], models, param_grids,
+            problem_type=track, n_iter=args.n_iter, workers=args.workers,
+            early_stopping=not args.no_early_stopping)
+        print(results.drop(columns='Best_Params').to_string(index=False))
+        print(f"✓ Best parameters saved to {save_best_params(results, track)}")
@@ -0,0 +1,379 @@
+"""Asynchronous successive halving (ASHA) over the base models' hyperparameters
+
+Each learner has a discrete search space and a resource (trees for the
+boosters and the forest, epochs for the network). Configurations start at
+the smallest resource; whenever a worker is free, the top 1/eta of a rung's
+finished trials are promoted to eta times the resource, otherwise a new
+configuration is started. Trials run in a process pool, one thread each,
+on a scaled train/validation split cached once as .npy and memory-mapped
+by the workers. The held-out test rows used by train_models.py are never
+seen.
+
+Every finished trial is appended to model/search/<dataset>/<learner>.jsonl,
+so an interrupted search resumes where it stopped. Records are reused only
+on the same split, eta and rung resources (a different --eta trains each
+rung at a different resource). Trials record both validation accuracy and
+single-row inference latency; the objective only decides how they are
+ranked, and the winner is the best trial on the highest rung reached:
+
+    accuracy   highest R²
+    latency    fastest model whose R² is within --r2-tolerance of the best
+
+Usage (from the backend directory):
+    python model/search.py [--learners xgboost lightgbm] [--trials 27]
+                           [--objective latency] [--workers 4]
+Best parameters go to model/search/<dataset>/best_params.json, which
+`python model/train_models.py --tuned` picks up.
+"""
+import hashlib
+import json
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from sklearn.model_selection import train_test_split, ParameterSampler
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import mean_absolute_error, r2_score
+
+SEARCH_DIR = 'model/search'
+
+# Discrete search space per learner
+SEARCH_SPACES = {
+    'random_forest': {
+        'max_depth': [6, 10, 15, 20, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': [1.0, 0.5, 0.3]
+    },
+    'xgboost': {
+        'max_depth': [2, 3, 4, 6, 8],
+        'learning_rate': [0.01, 0.03, 0.05, 0.1],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.5, 0.8, 1.0],
+        'min_child_weight': [1, 3, 5]
+    },
+    'lightgbm': {
+        'max_depth': [3, 5, 7, -1],
+        'num_leaves': [7, 15, 31],
+        'learning_rate': [0.01, 0.03, 0.05, 0.1],
+        'min_child_samples': [5, 10, 20],
+        'subsample': [0.7, 1.0],
+        'subsample_freq': [1],
+        'colsample_bytree': [0.5, 0.8, 1.0]
+    },
+    'neural_network': {
+        'learning_rate': [0.0003, 0.001, 0.003],
+        'batch_size': [16, 32, 64]
+    }
+}
+
+# (parameter, maximum) each learner's budget is measured in
+RESOURCES = {
+    'random_forest': ('n_estimators', 300),
+    'xgboost': ('n_estimators', 600),
+    'lightgbm': ('n_estimators', 600),
+    'neural_network': ('epochs', 150)
+}
+
+OBJECTIVES = ('accuracy', 'latency')
+
+def _training_code():
+    try:
+        from model import train_models
+    except ImportError:
+        import train_models
+    return train_models
+
+def rung_resources(max_resource, eta=3, n_rungs=3):
+    """Resource per rung, smallest first, ending at max_resource"""
+    return [max(1, int(round(max_resource / eta ** (n_rungs - 1 - k)))) for k in range(n_rungs)]
+
+def config_id(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+def sample_configs(learner, n, seed=0):
+    """n distinct configurations, always the same ones for a given seed"""
+    space = SEARCH_SPACES[learner]
+    n_total = int(np.prod([len(values) for values in space.values()]))
+    configs = list(ParameterSampler(space, n_iter=min(n, n_total), random_state=seed))
+    # ParameterSampler returns numpy scalars for some grids
+    return [{key: (value.item() if hasattr(value, 'item') else value)
+             for key, value in config.items()} for config in configs]
+
+def prepare_split(source='data/student-dataset.csv', search_dir=SEARCH_DIR, store=None):
+    """Scaled train/validation split shared by every trial
+
+    Cached under search_dir/<dataset>/split-<key>/ where the key covers the
+    source hash and feature-code version. Returns (split_dir, key).
+    """
+    try:
+        from model.feature_store import FeatureStore, dataset_name
+    except ImportError:
+        from feature_store import FeatureStore, dataset_name
+
+    name = dataset_name(source)
+    store = store or FeatureStore()
+    store.refresh({name: source})
+    meta = store.read_meta(name)
+    key = f"{meta['source_hash'][:12]}-{meta['feature_version']}"
+    split_dir = os.path.join(search_dir, name, f'split-{key}')
+    if os.path.exists(os.path.join(split_dir, 'y_val.npy')):
+        return split_dir, key
+
+    X, y, _ = store.load(name)
+    # Same outer split as train_models.py; tune on part of its training rows
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.25,
+                                                  random_state=42)
+    scaler = StandardScaler().fit(X_fit)
+    os.makedirs(split_dir, exist_ok=True)
+    np.save(os.path.join(split_dir, 'X_fit.npy'), scaler.transform(X_fit))
+    np.save(os.path.join(split_dir, 'y_fit.npy'), np.asarray(y_fit))
+    np.save(os.path.join(split_dir, 'X_val.npy'), scaler.transform(X_val))
+    # Written last: its presence marks the split as complete
+    np.save(os.path.join(split_dir, 'y_val.npy'), np.asarray(y_val))
+    return split_dir, key
+
+def _serving_model(learner, model):
+    # The network is served through its NumPy export, so time that
+    if learner == 'neural_network':
+        from model.numpy_nn import NumpyMLP
+        return NumpyMLP.from_layers(model.layers)
+    return model
+
+def single_row_latency_ms(model, X, runs=50):
+    """Median single-row predict() time in milliseconds"""
+    rows = [X[i:i + 1] for i in range(min(runs, len(X)))]
+    model.predict(rows[0])  # warm-up
+    timings = []
+    for row in rows:
+        t0 = time.perf_counter()
+        model.predict(row)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(timings))
+
+def _trial_worker(learner, params, split_dir):
+    from threadpoolctl import threadpool_limits
+
+    fit = _training_code().FIT_FUNCTIONS[learner]
+    load = lambda name: np.load(os.path.join(split_dir, f'{name}.npy'), mmap_mode='r')
+    X_fit, y_fit, X_val, y_val = load('X_fit'), load('y_fit'), load('X_val'), load('y_val')
+
+    with threadpool_limits(1):
+        start = time.perf_counter()
+        model = _serving_model(learner, fit(X_fit, y_fit, 1, **params))
+        fit_s = time.perf_counter() - start
+        y_pred = np.asarray(model.predict(X_val)).ravel()
+        latency_ms = single_row_latency_ms(model, np.asarray(X_val))
+    return {
+        'r2': float(r2_score(y_val, y_pred)),
+        'mae': float(mean_absolute_error(y_val, y_pred)),
+        'latency_ms': latency_ms,
+        'fit_s': fit_s
+    }
+
+class TrialLog:
+    """Append-only JSONL record of finished trials for one learner"""
+    def __init__(self, path, split_key, eta=None, resources=None):
+        self.path = path
+        self.split_key = split_key
+        # A rung index only means a resource for a given ASHA schedule
+        self.schedule = {} if eta is None else {'eta': eta, 'resources': list(resources)}
+
+    def load(self):
+        """Finished trials on the current split and schedule, {(config_id, rung): record}"""
+        records = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # partially written last line
+                    if (record.get('split') == self.split_key and
+                            all(record.get(k) == v for k, v in self.schedule.items())):
+                        records[(record['config_id'], record['rung'])] = record
+        except FileNotFoundError:
+            pass
+        return records
+
+    def append(self, record):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({**record, 'split': self.split_key, **self.schedule}) + '\n')
+
+def rank(records, objective, r2_tolerance=0.01):
+    """Records ordered best first under the objective"""
+    records = list(records)
+    if not records:
+        return []
+    if objective == 'accuracy':
+        return sorted(records, key=lambda r: -r['r2'])
+    best_r2 = max(r['r2'] for r in records)
+    good = sorted((r for r in records if r['r2'] >= best_r2 - r2_tolerance),
+                  key=lambda r: r['latency_ms'])
+    rest = sorted((r for r in records if r['r2'] < best_r2 - r2_tolerance),
+                  key=lambda r: -r['r2'])
+    return good + rest
+
+class ASHA:
+    """Promotion bookkeeping for one learner's search"""
+    def __init__(self, configs, resources, eta, objective, r2_tolerance, done):
+        self.configs = {config_id(c): c for c in configs}
+        self.resources = resources
+        self.eta = eta
+        self.objective = objective
+        self.r2_tolerance = r2_tolerance
+        self.results = [dict() for _ in resources]  # rung -> {config_id: record}
+        for (cid, rung), record in done.items():
+            if cid in self.configs and rung < len(resources):
+                self.results[rung][cid] = record
+        self.running = set()
+        self.new = [cid for cid in self.configs if cid not in self.results[0]]
+
+    def _promotable(self, rung):
+        finished = self.results[rung]
+        top = rank(finished.values(), self.objective, self.r2_tolerance)[:len(finished) // self.eta]
+        for record in top:
+            job = (record['config_id'], rung + 1)
+            if job[0] not in self.results[rung + 1] and job not in self.running:
+                return job
+        return None
+
+    def next_job(self):
+        """(config_id, rung) to run next, or None if nothing is runnable now"""
+        for rung in reversed(range(len(self.resources) - 1)):
+            job = self._promotable(rung)
+            if job:
+                break
+        else:
+            job = (self.new.pop(0), 0) if self.new else None
+        if job:
+            self.running.add(job)
+        return job
+
+    def finish(self, job, record):
+        self.running.discard(job)
+        self.results[job[1]][job[0]] = record
+
+    def best(self):
+        """Best finished trial on the highest rung reached
+
+        Lower rungs were trained with less resource, so a configuration that
+        was never promoted can't outrank the ones trained further.
+        """
+        for finished in reversed(self.results):
+            if finished:
+                return rank(finished.values(), self.objective, self.r2_tolerance)[0]
+        return None
+
+def search(learner, split_dir, split_key, pool, n_trials=27, eta=3, objective='accuracy',
+           r2_tolerance=0.01, workers=1, log_dir=SEARCH_DIR, seed=0):
+    """Run (or resume) ASHA for one learner; returns the best record"""
+    param_name, max_resource = RESOURCES[learner]
+    resources = rung_resources(max_resource, eta)
+    log = TrialLog(os.path.join(log_dir, f'{learner}.jsonl'), split_key, eta, resources)
+    done = log.load()
+    asha = ASHA(sample_configs(learner, n_trials, seed), resources, eta, objective,
+                r2_tolerance, done)
+    print(f"\n{learner}: {len(asha.configs)} configs, {param_name} rungs {resources}, "
+          f"{len(done)} trials already done")
+
+    pending = {}
+    while True:
+        while len(pending) < workers:
+            job = asha.next_job()
+            if job is None:
+                break
+            cid, rung = job
+            params = {**asha.configs[cid], param_name: resources[rung]}
+            pending[pool.submit(_trial_worker, learner, params, split_dir)] = (job, params)
+        if not pending:
+            break
+
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            (cid, rung), params = pending.pop(future)
+            record = {'config_id': cid, 'rung': rung, 'params': params, **future.result()}
+            log.append(record)
+            asha.finish((cid, rung), record)
+            print(f"  rung {rung} {cid}: R² {record['r2']:.3f}, "
+                  f"{record['latency_ms']:.2f} ms/row, fit {record['fit_s']:.1f}s")
+
+    best = asha.best()
+    print(f"Best {learner} ({objective}): R² {best['r2']:.3f}, "
+          f"{best['latency_ms']:.2f} ms/row, {best['params']}")
+    return best
+
+def load_best_params(source='data/student-dataset.csv', search_dir=SEARCH_DIR):
+    """Tuned {learner: params} for a dataset, or {} if it was never searched"""
+    try:
+        from model.feature_store import dataset_name
+    except ImportError:
+        from feature_store import dataset_name
+    try:
+        with open(os.path.join(search_dir, dataset_name(source), 'best_params.json')) as f:
+            return {learner: entry['params'] for learner, entry in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+
+def run_search(source='data/student-dataset.csv', learners=None, n_trials=27, eta=3,
+               objective='accuracy', r2_tolerance=0.01, workers=None, search_dir=SEARCH_DIR):
+    """Search every learner and merge the winners into best_params.json"""
+    try:
+        from model.feature_store import dataset_name
+    except ImportError:
+        from feature_store import dataset_name
+
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    learners = learners or list(SEARCH_SPACES)
+    workers = workers or os.cpu_count() or 1
+    split_dir, split_key = prepare_split(source, search_dir)
+    log_dir = os.path.join(search_dir, dataset_name(source))
+
+    best = {}
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for learner in learners:
+            best[learner] = search(learner, split_dir, split_key, pool, n_trials, eta,
+                                   objective, r2_tolerance, workers, log_dir)
+
+    path = os.path.join(log_dir, 'best_params.json')
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        saved = {}
+    for learner, record in best.items():
+        saved[learner] = {'objective': objective, 'params': record['params'],
+                          'r2': record['r2'], 'mae': record['mae'],
+                          'latency_ms': record['latency_ms']}
+    with open(path, 'w') as f:
+        json.dump(saved, f, indent=2)
+    print(f"\n✓ Best parameters saved to {path}")
+    return best
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    # Run as a script: make model.* importable here and in the workers
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='data/student-dataset.csv')
+    parser.add_argument('--learners', nargs='+', choices=list(SEARCH_SPACES))
+    parser.add_argument('--trials', type=int, default=27,
+                        help='configurations sampled per learner')
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--objective', choices=OBJECTIVES, default='accuracy')
+    parser.add_argument('--r2-tolerance', type=float, default=0.01,
+                        help='R² a latency search may give up for speed')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    run_search(args.source, args.learners, args.trials, args.eta, args.objective,
+               args.r2_tolerance, args.workers)
@@ -5,51 +5,57 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.base import BaseEstimator, RegressorMixin
-import xgboost as xgb
-import lightgbm as lgb
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers, callbacks
 import joblib
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
-print("=" * 60)
-print("STUDENT PERFORMANCE PREDICTION MODEL TRAINING")
-print("=" * 60)
+# xgboost, lightgbm and TensorFlow are imported inside the functions that
+# need them, so unpickling EnsembleModel or exporting the network doesn't
+# pay for the whole training stack
 
 # Define EnsembleModel at module level so it can be pickled
 class EnsembleModel(BaseEstimator, RegressorMixin):
     """Ensemble model that combines predictions from multiple models"""
-    def __init__(self, rf_model=None, xgb_model=None, lgb_model=None, nn_model=None):
+    def __init__(self, rf_model=None, xgb_model=None, lgb_model=None, nn_model=None,
+                 weights=None):
         self.rf_model = rf_model
         self.xgb_model = xgb_model
         self.lgb_model = lgb_model
         self.nn_model = nn_model
+        # {model name: weight}; None means equal weights
+        self.weights = weights
         
     def fit(self, X, y):
         # This ensemble doesn't need to fit, just use pre-fitted models
         return self
     
     def predict(self, X):
-        if self.rf_model is None or self.xgb_model is None or self.lgb_model is None or self.nn_model is None:
+        members = {
+            'random_forest': self.rf_model,
+            'xgboost': self.xgb_model,
+            'lightgbm': self.lgb_model,
+            'neural_network': self.nn_model
+        }
+        # Pickles from before weights existed use equal weights
+        weights = getattr(self, 'weights', None) or {name: 0.25 for name in members}
+        if any(members[name] is None for name, w in weights.items() if w > 0):
             raise ValueError("All models must be provided before prediction")
         
-        rf_pred = self.rf_model.predict(X)
-        xgb_pred = self.xgb_model.predict(X)
-        lgb_pred = self.lgb_model.predict(X)
-        nn_pred = self.nn_model.predict(X).flatten()
-        
-        # Weighted average
-        return (rf_pred * 0.25 + xgb_pred * 0.25 + 
-                lgb_pred * 0.25 + nn_pred * 0.25)
+        # Weighted average; zero-weight models are never called
+        prediction = 0
+        for name, weight in weights.items():
+            if weight > 0:
+                prediction = prediction + weight * np.asarray(members[name].predict(X)).flatten()
+        return prediction
     
     def get_params(self, deep=True):
         return {
             'rf_model': self.rf_model,
             'xgb_model': self.xgb_model,
             'lgb_model': self.lgb_model,
-            'nn_model': self.nn_model
+            'nn_model': self.nn_model,
+            'weights': self.weights
         }
     
     def set_params(self, **params):
@@ -57,12 +63,34 @@ class EnsembleModel(BaseEstimator, RegressorMixin):
             setattr(self, key, value)
         return self
 
-def load_and_prepare_data():
+# Model input order, written to model/feature_columns.txt (EXACTLY 26 features)
+FEATURE_COLUMNS = [
+    'english.grade', 'math.grade', 'sciences.grade', 'language.grade',
+    'overall_grade', 'academic_consistency', 'consistency_score',
+    'portfolio.rating', 'coverletter.rating', 'refletter.rating',
+    'application_strength', 'strong_recommendation', 'strong_portfolio',
+    'age', 'attendance_rate', 'extracurricular_score',
+    'education_hub_distance', 'multiple_weak_subjects',
+    'low_application_score', 'math_english_diff', 'science_language_diff',
+    'academic_potential', 'performance_index',
+    'gender_encoded', 'nationality_encoded', 'ethnic.group_encoded'
+]
+
+TARGET_COLUMN = 'performance_score'
+
+def load_and_prepare_data(path='data/student-dataset.csv'):
     """Load dataset and create features"""
     print("Loading dataset...")
-    df = pd.read_csv('data/student-dataset.csv')
+    df = pd.read_csv(path)
     print(f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
-    
+    return build_training_features(df)
+
+def build_training_features(df):
+    """Engineered features, target and fitted label encoders for a raw dataset
+
+    The feature store hashes this function's source, so any change here
+    invalidates the cached matrices.
+    """
     # Create features DataFrame
     features = pd.DataFrame()
     
@@ -147,8 +175,11 @@ def load_and_prepare_data():
     print(f"Created {features.shape[1]} features")
     return features, label_encoders
 
-def create_neural_network(input_dim):
+def create_neural_network(input_dim, learning_rate=0.001):
     """Create a neural network model"""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    
     model = keras.Sequential([
         layers.Input(shape=(input_dim,)),
         layers.Dense(128, activation='relu'),
@@ -168,33 +199,204 @@ def create_neural_network(input_dim):
     ])
     
     model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
         loss='mse',
         metrics=['mae', 'mse']
     )
     
     return model
 
-def train_models():
-    """Train all models"""
-    print("\nPreparing data for training...")
-    features, label_encoders = load_and_prepare_data()
-    
-    # Define feature columns (EXACTLY 25 features)
-    feature_columns = [
-        'english.grade', 'math.grade', 'sciences.grade', 'language.grade',
-        'overall_grade', 'academic_consistency', 'consistency_score',
-        'portfolio.rating', 'coverletter.rating', 'refletter.rating',
-        'application_strength', 'strong_recommendation', 'strong_portfolio',
-        'age', 'attendance_rate', 'extracurricular_score',
-        'education_hub_distance', 'multiple_weak_subjects',
-        'low_application_score', 'math_english_diff', 'science_language_diff',
-        'academic_potential', 'performance_index',
-        'gender_encoded', 'nationality_encoded', 'ethnic.group_encoded'
-    ]
-    
-    X = features[feature_columns]
-    y = features['performance_score']
+def _reset_threads(model):
+    # Thread counts used for training are saved with the model; restore the
+    # library default so serving isn't pinned to the training budget
+    model.set_params(n_jobs=type(model)().get_params()['n_jobs'])
+    return model
+
+# Hyperparameters per base model; the fit functions accept overrides
+# (e.g. from model/search.py)
+DEFAULT_PARAMS = {
+    'random_forest': {
+        'n_estimators': 100,
+        'max_depth': 15,
+        'min_samples_split': 5,
+        'min_samples_leaf': 2
+    },
+    'xgboost': {
+        'n_estimators': 100,
+        'max_depth': 6,
+        'learning_rate': 0.05
+    },
+    'lightgbm': {
+        'n_estimators': 100,
+        'max_depth': 7,
+        'learning_rate': 0.05
+    },
+    'neural_network': {
+        'epochs': 100,
+        'batch_size': 32,
+        'learning_rate': 0.001
+    }
+}
+
+def fit_random_forest(X, y, n_threads=1, **params):
+    model = RandomForestRegressor(
+        **{**DEFAULT_PARAMS['random_forest'], **params},
+        random_state=42,
+        n_jobs=n_threads
+    )
+    model.fit(X, y)
+    return _reset_threads(model)
+
+def fit_xgboost(X, y, n_threads=1, **params):
+    import xgboost as xgb
+    
+    model = xgb.XGBRegressor(
+        **{**DEFAULT_PARAMS['xgboost'], **params},
+        random_state=42,
+        n_jobs=n_threads
+    )
+    model.fit(X, y)
+    return _reset_threads(model)
+
+def fit_lightgbm(X, y, n_threads=1, **params):
+    import lightgbm as lgb
+    
+    model = lgb.LGBMRegressor(
+        **{**DEFAULT_PARAMS['lightgbm'], **params},
+        random_state=42,
+        n_jobs=n_threads,
+        verbose=-1
+    )
+    model.fit(X, y)
+    return _reset_threads(model)
+
+def fit_neural_network(X, y, n_threads=1, **params):
+    import tensorflow as tf
+    from tensorflow.keras import callbacks
+    
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # TensorFlow was already initialized in this process
+        pass
+    
+    params = {**DEFAULT_PARAMS['neural_network'], **params}
+    model = create_neural_network(X.shape[1], learning_rate=params['learning_rate'])
+    early_stopping = callbacks.EarlyStopping(
+        monitor='val_loss',
+        patience=20,
+        restore_best_weights=True
+    )
+    model.fit(
+        X, y,
+        validation_split=0.2,
+        epochs=params['epochs'],
+        batch_size=params['batch_size'],
+        callbacks=[early_stopping],
+        verbose=0
+    )
+    return model
+
+# Fit function per base model, in training/report order
+FIT_FUNCTIONS = {
+    'random_forest': fit_random_forest,
+    'xgboost': fit_xgboost,
+    'lightgbm': fit_lightgbm,
+    'neural_network': fit_neural_network
+}
+
+def export_neural_network_npz(nn_model, path='model/neural_network.npz'):
+    """Fold BatchNorm into the Dense weights and save plain arrays to .npz"""
+    try:
+        from model.numpy_nn import NumpyMLP
+    except ImportError:
+        from numpy_nn import NumpyMLP
+    
+    numpy_model = NumpyMLP.from_layers(nn_model.layers)
+    numpy_model.save(path)
+    return numpy_model
+
+def verify_numpy_export(nn_model, path, X, atol=1e-4):
+    """Check the exported NumPy network against Keras on X"""
+    try:
+        from model.numpy_nn import NumpyMLP
+    except ImportError:
+        from numpy_nn import NumpyMLP
+    
+    keras_pred = nn_model.predict(X, verbose=0)
+    numpy_pred = NumpyMLP.load(path).predict(X)
+    max_diff = float(np.max(np.abs(keras_pred - numpy_pred)))
+    if not np.allclose(keras_pred, numpy_pred, atol=atol, rtol=1e-5):
+        raise ValueError(f"NumPy export differs from Keras (max abs diff {max_diff:.2e})")
+    return max_diff
+
+def export_saved_network(h5_path='model/neural_network.h5', npz_path='model/neural_network.npz'):
+    """Export an already trained network without retraining"""
+    from tensorflow import keras
+    
+    nn_model = keras.models.load_model(h5_path)
+    export_neural_network_npz(nn_model, npz_path)
+    
+    # Verify on random inputs in the scaled feature space
+    X_check = np.random.RandomState(0).normal(size=(256, nn_model.input_shape[1]))
+    max_diff = verify_numpy_export(nn_model, npz_path, X_check)
+    print(f"✓ Exported {npz_path} (max abs diff vs Keras: {max_diff:.2e})")
+
+def selection_fitter(parallel=True, cpu_budget=None, params=None):
+    """fit(X, y) -> {name: serving model}, for ensemble_selection's out-of-fold copies
+
+    The network is returned as its NumPy export, the way the app serves it.
+    """
+    try:
+        from model.orchestrator import train_parallel, train_sequential
+        from model.numpy_nn import NumpyMLP
+    except ImportError:
+        from orchestrator import train_parallel, train_sequential
+        from numpy_nn import NumpyMLP
+    train = train_parallel if parallel else train_sequential
+
+    def fit(X, y):
+        fitted, _ = train(X, y, cpu_budget=cpu_budget, params=params)
+        fitted['neural_network'] = NumpyMLP.from_layers(fitted['neural_network'].layers)
+        return fitted
+    return fit
+
+def _feature_store():
+    try:
+        from model.feature_store import FeatureStore, dataset_name
+    except ImportError:
+        from feature_store import FeatureStore, dataset_name
+    return FeatureStore, dataset_name
+
+def train_models(parallel=True, cpu_budget=None, source='data/student-dataset.csv',
+                 output_dir='model', store=None, params=None, latency_budget_ms=None):
+    """Train all models on one dataset and save them to output_dir
+
+    With parallel=True the four base models are fitted concurrently in
+    worker processes sharing a CPU budget (default: all cores). Features
+    come from the feature store, which only re-engineers them when the
+    source file or the feature code changed. `params` maps a model name
+    to hyperparameter overrides (see model/search.py). Ensemble weights
+    are fitted within latency_budget_ms (single-row ms, default unlimited)
+    on out-of-fold predictions for the training rows and written to
+    ensemble_config.json; the test rows are only used for reporting.
+    """
+    try:
+        from model.orchestrator import train_parallel, train_sequential
+    except ImportError:
+        from orchestrator import train_parallel, train_sequential
+    FeatureStore, dataset_name = _feature_store()
+    
+    print("=" * 60)
+    print("STUDENT PERFORMANCE PREDICTION MODEL TRAINING")
+    print("=" * 60)
+    
+    print(f"\nPreparing data for training ({source})...")
+    store = store or FeatureStore()
+    X, y, label_encoders = store.load(dataset_name(source), source)
+    feature_columns = FEATURE_COLUMNS
+    os.makedirs(output_dir, exist_ok=True)
     
     print(f"X shape: {X.shape}, y shape: {y.shape}")
     
@@ -211,55 +413,17 @@ def train_models():
     print("\nTraining models...")
     print("-" * 40)
     
-    # 1. Random Forest
-    print("1. Training Random Forest...")
-    rf_model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42
-    )
-    rf_model.fit(X_train_scaled, y_train)
-    
-    # 2. XGBoost
-    print("2. Training XGBoost...")
-    xgb_model = xgb.XGBRegressor(
-        n_estimators=100,
-        max_depth=6,
-        learning_rate=0.05,
-        random_state=42
-    )
-    xgb_model.fit(X_train_scaled, y_train)
-    
-    # 3. LightGBM
-    print("3. Training LightGBM...")
-    lgb_model = lgb.LGBMRegressor(
-        n_estimators=100,
-        max_depth=7,
-        learning_rate=0.05,
-        random_state=42
-    )
-    lgb_model.fit(X_train_scaled, y_train)
-    
-    # 4. Neural Network
-    print("4. Training Neural Network...")
-    nn_model = create_neural_network(X_train_scaled.shape[1])
-    
-    early_stopping = callbacks.EarlyStopping(
-        monitor='val_loss',
-        patience=20,
-        restore_best_weights=True
-    )
-    
-    nn_model.fit(
-        X_train_scaled, y_train,
-        validation_split=0.2,
-        epochs=100,
-        batch_size=32,
-        callbacks=[early_stopping],
-        verbose=0
-    )
+    # 1-4. Base models (independent, so they can train concurrently)
+    if parallel:
+        fitted, training_report = train_parallel(X_train_scaled, y_train,
+                                                 cpu_budget=cpu_budget, params=params)
+    else:
+        fitted, training_report = train_sequential(X_train_scaled, y_train,
+                                                   cpu_budget=cpu_budget, params=params)
+    rf_model = fitted['random_forest']
+    xgb_model = fitted['xgboost']
+    lgb_model = fitted['lightgbm']
+    nn_model = fitted['neural_network']
     
     # 5. Create Ensemble Model using the module-level class
     print("5. Creating Ensemble Model...")
@@ -306,20 +470,54 @@ def train_models():
     print("SAVING MODELS")
     print("=" * 60)
     
-    joblib.dump(rf_model, 'model/random_forest.pkl')
-    joblib.dump(xgb_model, 'model/xgboost.pkl')
-    joblib.dump(lgb_model, 'model/lightgbm.pkl')
-    nn_model.save('model/neural_network.h5')
+    joblib.dump(rf_model, os.path.join(output_dir, 'random_forest.pkl'))
+    joblib.dump(xgb_model, os.path.join(output_dir, 'xgboost.pkl'))
+    joblib.dump(lgb_model, os.path.join(output_dir, 'lightgbm.pkl'))
+    nn_model.save(os.path.join(output_dir, 'neural_network.h5'))
+    
+    # Export a TensorFlow-free copy of the network for serving
+    numpy_model = export_neural_network_npz(nn_model, os.path.join(output_dir, 'neural_network.npz'))
+    max_diff = verify_numpy_export(nn_model, os.path.join(output_dir, 'neural_network.npz'), X_test_scaled)
+    print(f"✓ NumPy network export verified (max abs diff: {max_diff:.2e})")
+    
+    # Compile the tree models into one node table for fast small-batch serving
+    try:
+        from model.tree_compiler import CompiledForest, verify_compiled
+    except ImportError:
+        from tree_compiler import CompiledForest, verify_compiled
+    tree_models = {'random_forest': rf_model, 'xgboost': xgb_model, 'lightgbm': lgb_model}
+    compiled = CompiledForest.from_models(tree_models, X_train_scaled.shape[1])
+    verify_compiled(compiled, tree_models, X_test_scaled)
+    compiled.save(os.path.join(output_dir, 'compiled_trees.npz'))
+    print(f"✓ Compiled {compiled.n_trees} trees to {output_dir}/compiled_trees.npz")
+    
+    # Weight the ensemble by accuracy within the serving latency budget,
+    # timing the models the way the app serves them. Weights are fitted on
+    # out-of-fold predictions for the training rows, never on the test rows
+    try:
+        from model.ensemble_selection import (out_of_fold_predictions, select_and_save,
+                                              print_selection)
+    except ImportError:
+        from ensemble_selection import out_of_fold_predictions, select_and_save, print_selection
+    oof_predictions = out_of_fold_predictions(selection_fitter(parallel, cpu_budget, params),
+                                              X_train_scaled, y_train)
+    serving_models = dict(tree_models, neural_network=numpy_model)
+    selection = select_and_save(serving_models, oof_predictions, y_train, X_test_scaled, y_test,
+                                latency_budget_ms, os.path.join(output_dir, 'ensemble_config.json'))
+    print_selection(selection)
+    ensemble_model.weights = selection['weights']
+    results['Selected Ensemble'] = {key.upper() if key != 'r2' else 'R2': value
+                                    for key, value in selection['metrics'].items()}
     
     # Save ensemble model
-    joblib.dump(ensemble_model, 'model/ensemble.pkl')
+    joblib.dump(ensemble_model, os.path.join(output_dir, 'ensemble.pkl'))
     
     # Save preprocessing objects
-    joblib.dump(scaler, 'model/scaler.pkl')
-    joblib.dump(label_encoders, 'model/label_encoders.pkl')
+    joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
+    joblib.dump(label_encoders, os.path.join(output_dir, 'label_encoders.pkl'))
     
     # Save feature columns
-    with open('model/feature_columns.txt', 'w') as f:
+    with open(os.path.join(output_dir, 'feature_columns.txt'), 'w') as f:
         f.write('\n'.join(feature_columns))
     
     print("\n✓ Models saved successfully!")
@@ -327,7 +525,7 @@ def train_models():
     print("✓ Ready for deployment!")
     
     # Save evaluation results
-    with open('model/model_performance.txt', 'w') as f:
+    with open(os.path.join(output_dir, 'model_performance.txt'), 'w') as f:
         f.write("MODEL PERFORMANCE METRICS\n")
         f.write("=" * 40 + "\n\n")
         for name, metrics in results.items():
@@ -335,8 +533,88 @@ def train_models():
             f.write(f"  MAE:  {metrics['MAE']:.2f}\n")
             f.write(f"  RMSE: {metrics['RMSE']:.2f}\n")
             f.write(f"  R²:   {metrics['R2']:.3f}\n\n")
+        
+        f.write("TRAINING RESOURCES\n")
+        f.write("=" * 40 + "\n\n")
+        for name, stats in training_report.items():
+            f.write(f"{name}: {stats['threads']} threads, {stats['wall_s']:.1f}s, "
+                    f"peak RSS {stats['peak_rss_mb']:.0f} MB\n")
+        
+        f.write("\nINFERENCE COST AND ENSEMBLE WEIGHTS\n")
+        f.write("=" * 40 + "\n\n")
+        for name, cost in selection['model_costs'].items():
+            f.write(f"{name}: weight {selection['weights'][name]:.3f}, "
+                    f"{cost['single_row_ms']:.3f} ms single row, "
+                    f"{cost['batch_ms_per_row'] * 1000:.2f} us/row batched\n")
+        f.write(f"Latency budget: {selection['latency_budget_ms']} ms, "
+                f"selected ensemble {selection['single_row_ms']:.3f} ms/row\n")
+        f.write(f"Weights fitted on out-of-fold predictions for {selection['oof_rows']} "
+                f"training rows (RMSE {selection['oof_metrics']['rmse']:.2f}); "
+                f"Selected Ensemble metrics above are on the test rows\n")
+    
+    return results
+
+def _tuned_params(source):
+    try:
+        from model.search import load_best_params
+    except ImportError:
+        from search import load_best_params
+    params = load_best_params(source)
+    if not params:
+        print(f"No search results for {source}, using default hyperparameters")
+    return params
+
+def train_schools(sources, output_root='model/schools', parallel=True, cpu_budget=None,
+                  tuned=False, latency_budget_ms=None):
+    """Train one model set per school dataset
+
+    Every source's features are brought up to date first (only changed
+    files are re-engineered), then each school is trained into
+    output_root/<name>/, with that school's searched hyperparameters if
+    tuned is set.
+    """
+    FeatureStore, dataset_name = _feature_store()
+    store = FeatureStore()
+    names = {dataset_name(path): path for path in sources}
+    if len(names) != len(sources):
+        raise ValueError("School datasets must have distinct file names")
+    
+    status = store.refresh(names)
+    for name, state in status.items():
+        print(f"Features for {name}: {state}")
     
+    results = {}
+    for name, path in names.items():
+        params = _tuned_params(path) if tuned else None
+        results[name] = train_models(parallel=parallel, cpu_budget=cpu_budget, source=path,
+                                     output_dir=os.path.join(output_root, name), store=store,
+                                     params=params, latency_budget_ms=latency_budget_ms)
     return results
 
 if __name__ == '__main__':
-    train_models()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Train the student performance models')
+    parser.add_argument('--export-nn', action='store_true',
+                        help='only export the saved network to model/neural_network.npz')
+    parser.add_argument('--sequential', action='store_true',
+                        help='fit the base models one after another in this process')
+    parser.add_argument('--cpus', type=int, default=None,
+                        help='CPU budget shared by the base models (default: all cores)')
+    parser.add_argument('--schools', nargs='+', metavar='CSV',
+                        help='train one model set per school dataset into model/schools/<name>/')
+    parser.add_argument('--tuned', action='store_true',
+                        help='use the hyperparameters found by model/search.py')
+    parser.add_argument('--latency-budget-ms', type=float, default=None,
+                        help='single-row inference budget for the selected ensemble')
+    args = parser.parse_args()
+    
+    if args.export_nn:
+        export_saved_network()
+    elif args.schools:
+        train_schools(args.schools, parallel=not args.sequential, cpu_budget=args.cpus,
+                      tuned=args.tuned, latency_budget_ms=args.latency_budget_ms)
+    else:
+        params = _tuned_params('data/student-dataset.csv') if args.tuned else None
+        train_models(parallel=not args.sequential, cpu_budget=args.cpus, params=params,
+                     latency_budget_ms=args.latency_budget_ms)
\ No newline at end of file
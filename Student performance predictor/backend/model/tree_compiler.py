@@ -0,0 +1,360 @@
+"""Compile the tree models into one array-backed node table
+
+RandomForest, XGBoost and LightGBM are flattened into shared arrays
+(feature index, threshold, children, leaf value) and scored by a
+vectorized NumPy traversal over all trees at once, which avoids the
+per-call overhead of the native predict() implementations. Multiclass
+classifiers compile the same way, with a per-class value at each leaf
+(used for the GPA/GradeClass models, model/outcome_export.py).
+
+Usage (from the backend directory):
+    python model/tree_compiler.py            # compile, verify, save
+"""
+import json
+import numpy as np
+
+TREE_MODELS = ['random_forest', 'xgboost', 'lightgbm']
+
+class _NodeTableBuilder:
+    """Accumulates nodes for many trees into flat lists"""
+    def __init__(self, n_features, n_outputs=1):
+        self.n_features = n_features
+        self.n_outputs = n_outputs
+        self.feature, self.threshold = [], []
+        self.left, self.right = [], []
+        self.default_left, self.value = [], []
+        self.roots, self.tree_group = [], []
+
+    def add_node(self):
+        self.feature.append(0)
+        self.threshold.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.default_left.append(False)
+        self.value.append(0.0 if self.n_outputs == 1 else np.zeros(self.n_outputs))
+        return len(self.feature) - 1
+
+    def set_split(self, node, feature, threshold, left, right, default_left):
+        self.feature[node] = feature
+        self.threshold[node] = threshold
+        self.left[node] = left
+        self.right[node] = right
+        self.default_left[node] = default_left
+
+    def set_leaf(self, node, value):
+        # Leaves point at themselves so traversal can run a fixed depth
+        self.left[node] = node
+        self.right[node] = node
+        self.value[node] = value
+
+    def output_value(self, value, output):
+        """Leaf value of a tree that only contributes to one output (class)"""
+        if self.n_outputs == 1:
+            return value
+        values = np.zeros(self.n_outputs)
+        values[output] = value
+        return values
+
+def _add_sklearn_forest(builder, group, forest):
+    n_features = builder.n_features
+    n_trees = len(forest.estimators_)
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        nodes = [builder.add_node() for _ in range(tree.node_count)]
+        for i, node in enumerate(nodes):
+            if tree.children_left[i] == -1:
+                # The forest prediction is the mean over trees (for a
+                # classifier, of each tree's class fractions at the leaf)
+                if builder.n_outputs == 1:
+                    value = tree.value[i, 0, 0]
+                else:
+                    value = tree.value[i, 0] / tree.value[i, 0].sum()
+                builder.set_leaf(node, value / n_trees)
+            else:
+                # sklearn compares float32-cast features with `<=`, so the
+                # split reads from the float32 copy of X (offset by n_features)
+                builder.set_split(node, n_features + int(tree.feature[i]),
+                                  float(tree.threshold[i]),
+                                  nodes[tree.children_left[i]],
+                                  nodes[tree.children_right[i]], False)
+        builder.roots.append(nodes[0])
+        builder.tree_group.append(group)
+
+def _add_xgboost(builder, group, model):
+    booster = model.get_booster()
+    feature_names = booster.feature_names
+    n_features = builder.n_features
+
+    def feature_index(split):
+        if feature_names:
+            return feature_names.index(split)
+        return int(split[1:])
+
+    def add(tree, output):
+        node = builder.add_node()
+        if 'leaf' in tree:
+            builder.set_leaf(node, builder.output_value(float(tree['leaf']), output))
+            return node
+        children = {child['nodeid']: child for child in tree['children']}
+        left = add(children[tree['yes']], output)
+        right = add(children[tree['no']], output)
+        # XGBoost goes left when x < t on float32 values; x < t is the same
+        # as x <= (largest float32 below t)
+        threshold = np.nextafter(np.float32(tree['split_condition']), np.float32(-np.inf))
+        builder.set_split(node, n_features + feature_index(tree['split']), float(threshold),
+                          left, right, tree['missing'] == tree['yes'])
+        return node
+
+    config = json.loads(booster.save_config())
+    # Each boosting round adds num_parallel_tree trees for every class
+    per_class = int(config['learner']['gradient_booster']['gbtree_model_param']['num_parallel_tree'])
+    for i, dump in enumerate(booster.get_dump(dump_format='json')):
+        builder.roots.append(add(json.loads(dump), (i // per_class) % builder.n_outputs))
+        builder.tree_group.append(group)
+    return float(config['learner']['learner_model_param']['base_score'])
+
+def _add_lightgbm(builder, group, model):
+    dump = model.booster_.dump_model()
+
+    def add(tree, output):
+        node = builder.add_node()
+        if 'leaf_value' in tree:
+            builder.set_leaf(node, builder.output_value(float(tree['leaf_value']), output))
+            return node
+        if tree['decision_type'] != '<=':
+            raise ValueError(f"Unsupported LightGBM split: {tree['decision_type']}")
+        if tree['missing_type'] == 'Zero':
+            raise ValueError("LightGBM zero-as-missing splits are not supported")
+        left = add(tree['left_child'], output)
+        right = add(tree['right_child'], output)
+        # LightGBM compares the float64 features directly
+        builder.set_split(node, int(tree['split_feature']), float(tree['threshold']),
+                          left, right, bool(tree['default_left']))
+        return node
+
+    # A multiclass model adds one tree per class in every iteration
+    for i, tree_info in enumerate(dump['tree_info']):
+        builder.roots.append(add(tree_info['tree_structure'], i % builder.n_outputs))
+        builder.tree_group.append(group)
+
+class CompiledForest:
+    """Tree models flattened into one node table
+
+    Every model is a group of trees; a model's prediction is the sum of its
+    trees' leaf values plus its base score. Split features index into
+    [X, float32(X)] so each model sees its native comparison precision.
+    Multiclass classifiers have one leaf value per class (value is 2-D).
+    """
+    ARRAYS = ['feature', 'threshold', 'left', 'right', 'default_left', 'value',
+              'roots', 'tree_group', 'base_scores']
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, tree_group, base_scores, group_names, n_features):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.tree_group = np.asarray(tree_group, dtype=np.int32)
+        self.base_scores = np.asarray(base_scores, dtype=np.float64)
+        self.group_names = list(group_names)
+        self.n_features = int(n_features)
+
+        # children[2 * node + go_right] is the next node
+        self.children = np.column_stack([self.left, self.right]).ravel()
+        self.tree_depth = self._tree_depths()
+        self.max_depth = int(self.tree_depth.max()) if len(self.tree_depth) else 0
+        # Deepest trees first, so each traversal step works on a prefix
+        self.depth_order = np.argsort(-self.tree_depth, kind='stable')
+        self.group_matrix = np.zeros((len(self.roots), len(self.group_names)))
+        self.group_matrix[np.arange(len(self.roots)), self.tree_group] = 1.0
+
+    @classmethod
+    def from_models(cls, models, n_features, n_outputs=1):
+        """Compile the tree models present in a {name: model} dict
+
+        Pass n_outputs=n_classes for multiclass classifiers (see
+        CompiledModel.predict_proba).
+        """
+        builder = _NodeTableBuilder(n_features, n_outputs)
+        group_names, base_scores = [], []
+
+        for name in TREE_MODELS:
+            if name not in models:
+                continue
+            group = len(group_names)
+            if name == 'random_forest':
+                _add_sklearn_forest(builder, group, models[name])
+                base_score = 0.0
+            elif name == 'xgboost':
+                base_score = _add_xgboost(builder, group, models[name])
+            else:
+                _add_lightgbm(builder, group, models[name])
+                base_score = 0.0
+            group_names.append(name)
+            base_scores.append(base_score)
+
+        return cls(builder.feature, builder.threshold, builder.left, builder.right,
+                   builder.default_left, builder.value, builder.roots,
+                   builder.tree_group, base_scores, group_names, n_features)
+
+    def _tree_depths(self):
+        """Number of splits on the longest root-to-leaf path of each tree"""
+        depths = np.zeros(len(self.roots), dtype=np.int32)
+        frontier = self.roots
+        owner = np.arange(len(self.roots))
+        depth = 0
+        while True:
+            internal = self.left[frontier] != frontier
+            frontier, owner = frontier[internal], owner[internal]
+            if frontier.size == 0:
+                return depths
+            depth += 1
+            depths[owner] = depth
+            frontier = np.concatenate([self.left[frontier], self.right[frontier]])
+            owner = np.concatenate([owner, owner])
+
+    @classmethod
+    def from_arrays(cls, data):
+        """Rebuild from to_arrays() output (or an opened .npz)"""
+        arrays = {name: data[name] for name in cls.ARRAYS}
+        group_names = [str(name) for name in data['group_names']]
+        return cls(group_names=group_names, n_features=int(data['n_features']), **arrays)
+
+    def to_arrays(self):
+        """The node table as a dict of plain NumPy arrays"""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays.update(group_names=np.array(self.group_names), n_features=np.array(self.n_features))
+        return arrays
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays(data)
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaf_indices(self, X, trees=None):
+        """Leaf node reached by every (row, tree) pair
+
+        Returns (leaves, trees): leaves has shape (n_rows, len(trees)) and
+        trees gives the tree each column belongs to (deepest first).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        X_all = np.hstack([X, X.astype(np.float32).astype(np.float64)])
+        flat_X = X_all.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X_all.shape[1])[:, None]
+        has_nan = np.isnan(X).any()
+
+        if trees is None:
+            trees = self.depth_order
+        else:
+            trees = trees[np.argsort(-self.tree_depth[trees], kind='stable')]
+        depths = self.tree_depth[trees]
+
+        idx = np.repeat(self.roots[trees][None, :], X.shape[0], axis=0)
+        for step in range(int(depths[0]) if len(depths) else 0):
+            # Only trees deeper than `step` can still be on a split node
+            active = np.count_nonzero(depths > step)
+            nodes = idx[:, :active]
+            x = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~self.default_left.take(nodes), go_right)
+            idx[:, :active] = self.children.take(2 * nodes + go_right)
+        return idx, trees
+
+    def predict_all(self, X):
+        """Score every model in one traversal; returns {name: predictions}"""
+        leaves, trees = self.leaf_indices(X)
+        if self.value.ndim == 1:
+            sums = self.value.take(leaves) @ self.group_matrix[trees] + self.base_scores
+        else:
+            # (rows, trees, outputs) -> (rows, groups, outputs)
+            sums = np.einsum('rto,tg->rgo', self.value.take(leaves, axis=0),
+                             self.group_matrix[trees]) + self.base_scores[:, None]
+        return {name: sums[:, group] for group, name in enumerate(self.group_names)}
+
+    def model_view(self, name):
+        """A predict()-able view over one model's trees (for the serving engine)"""
+        return CompiledModel(self, self.group_names.index(name))
+
+class CompiledModel:
+    """One model's trees inside a CompiledForest"""
+    def __init__(self, forest, group):
+        self.forest = forest
+        self.group = group
+        self.name = forest.group_names[group]
+        self.trees = np.flatnonzero(forest.tree_group == group)
+
+    def predict(self, X):
+        leaves, _ = self.forest.leaf_indices(X, self.trees)
+        # (rows, trees) or, for a classifier, (rows, trees, classes)
+        values = self.forest.value.take(leaves, axis=0)
+        return values.sum(axis=1) + self.forest.base_scores[self.group]
+
+    def predict_proba(self, X):
+        """Class probabilities of a classifier compiled with n_outputs > 1
+
+        A forest's sums are already mean class fractions; a boosted
+        model's per-class margins go through a softmax.
+        """
+        scores = self.predict(X)
+        if self.name != 'random_forest':
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+def verify_compiled(compiled, models, X, atol=1e-3):
+    """Compare compiled predictions against the native predict() calls"""
+    compiled_pred = compiled.predict_all(X)
+    report = {}
+    for name in compiled.group_names:
+        native = np.asarray(models[name].predict(X), dtype=np.float64)
+        max_diff = float(np.max(np.abs(native - compiled_pred[name])))
+        report[name] = max_diff
+        if max_diff > atol:
+            raise ValueError(f"Compiled {name} differs from native predict (max abs diff {max_diff:.2e})")
+    return report
+
+def compile_saved_models(output_path='model/compiled_trees.npz'):
+    """Compile model/*.pkl, verify against the originals and save"""
+    import joblib
+    import pandas as pd
+
+    scaler = joblib.load('model/scaler.pkl')
+    with open('model/feature_columns.txt', 'r') as f:
+        feature_columns = [line.strip() for line in f]
+    models = {name: joblib.load(f'model/{name}.pkl') for name in TREE_MODELS}
+
+    compiled = CompiledForest.from_models(models, len(feature_columns))
+    print(f"✓ Compiled {compiled.n_trees} trees, {len(compiled.feature)} nodes, "
+          f"max depth {compiled.max_depth}")
+
+    # Verify on the training distribution plus random points around it
+    try:
+        from model.train_models import load_and_prepare_data
+    except ImportError:
+        from train_models import load_and_prepare_data
+    features, _ = load_and_prepare_data()
+    X_data = scaler.transform(features[feature_columns])
+    X_random = np.random.RandomState(0).normal(size=(1000, len(feature_columns))) * 2
+    report = verify_compiled(compiled, models, np.vstack([X_data, X_random]))
+    for name, max_diff in report.items():
+        print(f"✓ {name}: max abs diff vs native predict {max_diff:.2e}")
+
+    compiled.save(output_path)
+    print(f"✓ Saved {output_path}")
+    return compiled
+
+if __name__ == '__main__':
+    compile_saved_models()
@@ -0,0 +1,213 @@
+"""GPA and GradeClass predictions from the exported notebook pipeline
+
+Loads the artifact that model/outcome/current.json points at (written by
+model/outcome_export.py) once, and scores raw student rows with it:
+full_pipeline, then the GPA regressor and the GradeClass classifier.
+Each ensemble member can run two ways, with the same results:
+
+    native     its sklearn / XGBoost / LightGBM predict() call; cheapest
+               per row on large batches
+    compiled   its trees in a node table (model/tree_compiler.py), with
+               no per-call overhead, so far faster for a few rows
+
+and the ensemble averages (or stacks) the members' outputs exactly as the
+sklearn ensemble does. Unless the backend is native, full_pipeline also
+runs as NumPy arithmetic (outcome_data.py), with identical output. At
+startup warm_up() times both paths of every member at growing batch
+sizes and routes batches up to the crossover to the compiled trees, so
+single rows and micro-batches (micro_batch.py) take the fast path and
+large CSV uploads the native one.
+
+Configured with
+    OUTCOME_MODEL=model/outcome/current.json   # manifest to load, empty disables
+    OUTCOME_BACKEND=auto                       # auto|native|compiled
+"""
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model.outcome_data import transform_compiled
+from model.outcome_export import FORMAT_VERSION
+from model.tree_compiler import CompiledForest
+
+MANIFEST_PATH = 'model/outcome/current.json'
+# Batch sizes timed by warm_up() to find where compiled trees stop winning
+WARM_UP_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+def _best_ms(fn, X, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+class OutcomePredictor:
+    """Scores raw student rows with an exported outcome artifact"""
+    def __init__(self, artifact, backend='auto'):
+        if backend not in ('auto', 'native', 'compiled'):
+            raise ValueError(f"Unknown OUTCOME_BACKEND: {backend}")
+        self.artifact = artifact
+        self.version = artifact['version']
+        self.columns = artifact['input_columns']
+        self.grade_labels = artifact['grade_labels']
+        self.full_pipeline = artifact['full_pipeline']
+        self.regressor = artifact['regressor']
+        self.classifier = artifact['classifier']
+        self.classes = self.classifier.classes_
+
+        compiled = (artifact.get('compiled') or {}) if backend != 'native' else {}
+        self.compiled_pipeline = compiled.get('pipeline')
+        # (label, native estimator, compiled view or None) per ensemble member
+        self.members = {}
+        for kind in ('regressor', 'classifier'):
+            if compiled.get(kind):
+                forest = CompiledForest.from_arrays(compiled[kind]['forest'])
+                self.members[kind] = [
+                    (name or type(estimator).__name__, estimator, name and forest.model_view(name))
+                    for name, estimator in zip(compiled[kind]['members'], artifact[kind].estimators_)]
+        self.backend = backend if self.members else 'native'
+        # Largest batch each member scores through its compiled trees (set
+        # by warm_up in auto mode)
+        self.compiled_max_rows = {kind: [0] * len(members) for kind, members in self.members.items()}
+        self.stats = {'calls': 0, 'rows': 0}
+
+    @classmethod
+    def load(cls, manifest_path=MANIFEST_PATH, backend='auto'):
+        """Load the artifact named in the manifest and warm it up"""
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        artifact = joblib.load(os.path.join(os.path.dirname(manifest_path), manifest['file']))
+        if artifact.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{manifest['file']}: artifact format {artifact.get('format_version')}, "
+                             f"expected {FORMAT_VERSION} (re-run model/outcome_export.py)")
+
+        import sklearn
+        trained_with = artifact['library_versions']['scikit-learn']
+        if trained_with != sklearn.__version__:
+            print(f"Warning: {manifest['file']} was exported with scikit-learn {trained_with}, "
+                  f"running {sklearn.__version__}")
+
+        predictor = cls(artifact, backend)
+        predictor.warm_up()
+        return predictor
+
+    @classmethod
+    def from_env(cls):
+        """The configured predictor, or None if OUTCOME_MODEL is empty"""
+        manifest_path = os.environ.get('OUTCOME_MODEL', MANIFEST_PATH)
+        if not manifest_path:
+            return None
+        return cls.load(manifest_path, os.environ.get('OUTCOME_BACKEND', 'auto'))
+
+    def features(self, records):
+        """(n, columns) float matrix of a DataFrame of raw student fields"""
+        missing = [name for name in self.columns if name not in records]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        return records[self.columns].to_numpy(dtype=float)
+
+    def transform(self, X):
+        if self.compiled_pipeline is not None:
+            return transform_compiled(self.compiled_pipeline, X)
+        return self.full_pipeline.transform(pd.DataFrame(X, columns=self.columns))
+
+    def _member_outputs(self, kind, Xp):
+        method = 'predict' if kind == 'regressor' else 'predict_proba'
+        outputs = []
+        for (_, estimator, compiled), cutoff in zip(self.members[kind], self.compiled_max_rows[kind]):
+            if compiled is not None and (self.backend == 'compiled' or len(Xp) <= cutoff):
+                estimator = compiled
+            outputs.append(getattr(estimator, method)(Xp))
+        return outputs
+
+    def predict_gpa(self, Xp):
+        if 'regressor' not in self.members:
+            return self.regressor.predict(Xp)
+        predictions = np.column_stack(self._member_outputs('regressor', Xp))
+        if hasattr(self.regressor, 'final_estimator_'):
+            # StackingRegressor: the final estimator sees the member predictions
+            if self.regressor.passthrough:
+                predictions = np.hstack([predictions, Xp])
+            return self.regressor.final_estimator_.predict(predictions)
+        return np.average(predictions, axis=1, weights=self.regressor.weights)
+
+    def predict_proba(self, Xp):
+        if 'classifier' not in self.members:
+            return self.classifier.predict_proba(Xp)
+        # Soft voting: the weighted mean of the members' probabilities
+        return np.average(self._member_outputs('classifier', Xp), axis=0,
+                          weights=self.classifier.weights)
+
+    def score(self, X):
+        """Score an (n, columns) matrix of raw fields
+
+        Returns (predictions, timings) like app.score_features, so it can
+        sit behind a MicroBatcher: predictions holds 'gpa', 'grade_class'
+        and 'probabilities' (n, classes), timings the milliseconds spent
+        in each stage.
+        """
+        timings = {}
+        start = time.perf_counter()
+        Xp = self.transform(X)
+        timings['preprocess'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        gpa = np.clip(self.predict_gpa(Xp), 0.0, 4.0)
+        timings['regressor'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        probabilities = self.predict_proba(Xp)
+        timings['classifier'] = (time.perf_counter() - start) * 1000
+
+        self.stats['calls'] += 1
+        self.stats['rows'] += len(X)
+        return {'gpa': gpa, 'grade_class': self.classes[probabilities.argmax(axis=1)],
+                'probabilities': probabilities}, timings
+
+    def warm_up(self, repeats=3):
+        """Score the reference row once, then pick the compiled batch cutoffs
+
+        The first predict calls pay for lazy imports and allocations, so
+        they happen here rather than in the first request. In auto mode
+        every compiled member then scores growing batches of the reference
+        row both ways; batches up to the largest size where its compiled
+        trees were faster go to them.
+        """
+        reference = self.artifact['reference_row']
+        row = np.array([[reference[name] for name in self.columns]], dtype=float)
+        self.score(row)
+        Xp = self.transform(row)
+        for kind, members in self.members.items():
+            method = 'predict' if kind == 'regressor' else 'predict_proba'
+            for i, (_, estimator, compiled) in enumerate(members):
+                if compiled is None or self.backend != 'auto':
+                    continue
+                native, compiled = getattr(estimator, method), getattr(compiled, method)
+                cutoff = 0
+                for size in WARM_UP_SIZES:
+                    batch = np.repeat(Xp, size, axis=0)
+                    if _best_ms(compiled, batch, repeats) >= _best_ms(native, batch, repeats):
+                        break
+                    cutoff = size
+                self.compiled_max_rows[kind][i] = cutoff
+        self.stats = {'calls': 0, 'rows': 0}
+
+    def get_stats(self):
+        return {
+            'version': self.version,
+            'created_at': self.artifact['created_at'],
+            'regressor': type(self.regressor).__name__,
+            'classifier': type(self.classifier).__name__,
+            'backend': self.backend,
+            'compiled_max_rows': {kind: {label: cutoff for (label, _, compiled), cutoff
+                                         in zip(members, self.compiled_max_rows[kind])
+                                         if compiled is not None}
+                                  for kind, members in self.members.items()},
+            'metrics': self.artifact['metrics'],
+            **self.stats
+        }
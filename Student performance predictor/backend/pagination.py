@@ -0,0 +1,99 @@
+"""Keyset (cursor) pagination for the listing and export endpoints
+
+Pages are ordered newest first by a (timestamp, id) key. Instead of an
+OFFSET, the next page starts strictly after the last key of the previous
+one, so every page is an index range scan no matter how deep it is. The
+key is handed to clients as an opaque cursor string.
+"""
+import base64
+import binascii
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_PAGE_SIZE = 1000
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def decode_cursor(token):
+    """Key encoded in a cursor string (None for the first page)"""
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    if not isinstance(key, list) or len(key) != 2:
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return key
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Validate a `limit` query parameter"""
+    if value in (None, ''):
+        return default
+    size = int(value)
+    if size < 1:
+        raise ValueError('limit must be positive')
+    return min(size, MAX_PAGE_SIZE)
+
+class KeysetQuery:
+    """A SELECT paginated on a descending (timestamp, id) key
+
+    `columns` is the select list and `source` the FROM clause (with any
+    JOINs); `key` names the two key columns as they appear in it, e.g.
+    ('i.created_at', 'i.id'). `filters` maps request arguments to the
+    column they must equal.
+    """
+    def __init__(self, columns, source, key, filters=None):
+        self.columns = columns
+        self.source = source
+        self.key = key
+        self.filters = filters or {}
+
+    def _sql(self, args, after, limit):
+        where, params = [], []
+        for name, column in self.filters.items():
+            if args.get(name):
+                where.append(f'{column} = ?')
+                params.append(args[name])
+        if after is not None:
+            where.append(f'({self.key[0]}, {self.key[1]}) < (?, ?)')
+            params.extend(after)
+
+        # The key columns are selected last and stripped from the rows
+        sql = f'SELECT {self.columns}, {self.key[0]}, {self.key[1]} FROM {self.source}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {self.key[0]} DESC, {self.key[1]} DESC LIMIT ?'
+        params.append(limit)
+        return sql, params
+
+    def fetch(self, conn, args, after=None, limit=DEFAULT_PAGE_SIZE, null=None):
+        """One page: returns (rows as dicts, key of the last row or None)"""
+        cursor = conn.execute(*self._sql(args, after, limit))
+        names = [column[0] for column in cursor.description][:-2]
+        rows, last_key = [], None
+        for row in cursor:
+            values = row[:-2]
+            if null is not None:
+                values = [null if value is None else value for value in values]
+            rows.append(dict(zip(names, values)))
+            last_key = row[-2:]
+        if len(rows) < limit:
+            last_key = None
+        return rows, last_key
+
+    def page(self, conn, args, cursor=None, limit=DEFAULT_PAGE_SIZE, null=None):
+        """One page for an API response: returns (rows, next cursor or None)"""
+        rows, last_key = self.fetch(conn, args, decode_cursor(cursor), limit, null)
+        return rows, encode_cursor(last_key) if last_key is not None else None
+
+    def iter_rows(self, conn, args, page_size=EXPORT_PAGE_SIZE, null=None):
+        """Every matching row, read one page at a time (bounded memory)"""
+        after = None
+        while True:
+            rows, after = self.fetch(conn, args, after, page_size, null)
+            yield from rows
+            if after is None:
+                return
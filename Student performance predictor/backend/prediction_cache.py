@@ -0,0 +1,154 @@
+"""LRU/TTL cache of ensemble predictions keyed by the feature vector
+
+Configured with
+    PREDICTION_CACHE_SIZE=4096   # entries, 0 disables the cache
+    PREDICTION_CACHE_TTL=3600    # seconds, 0 means entries never expire
+Entries are dropped automatically when any model artifact in model/
+changes (by size or mtime), so retraining never serves stale scores.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ARTIFACT_EXTENSIONS = ('.pkl', '.h5', '.npz', '.json', '.txt')
+
+# Inputs closer than this (e.g. "3" vs 3.0 vs 3.0000000001) share an entry
+KEY_DECIMALS = 6
+
+def artifact_fingerprint(model_dir):
+    """(name, size, mtime) of every model artifact in model_dir"""
+    try:
+        entries = sorted(os.scandir(model_dir), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return ()
+    return tuple((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                 for entry in entries
+                 if entry.is_file() and entry.name.endswith(ARTIFACT_EXTENSIONS))
+
+def feature_keys(X):
+    """Hash of each canonicalized feature row"""
+    X = np.round(np.asarray(X, dtype=np.float64), KEY_DECIMALS)
+    X += 0.0  # -0.0 -> 0.0
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in X]
+
+class PredictionCache:
+    """Thread-safe LRU cache with a time-to-live for per-row predictions
+
+    Each entry holds {model name: score} for one feature row, including
+    'ensemble'.
+    """
+    def __init__(self, max_size=4096, ttl=3600, model_dir='model', check_interval=2.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = artifact_fingerprint(model_dir)
+        self._checked_at = time.monotonic()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                      'invalidations': 0}
+
+    @classmethod
+    def from_env(cls, model_dir='model'):
+        return cls(max_size=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+                   ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+                   model_dir=model_dir)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+            self._fingerprint = artifact_fingerprint(self.model_dir)
+
+    def _check_artifacts(self, now):
+        # stat() the model directory at most every check_interval seconds
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        fingerprint = artifact_fingerprint(self.model_dir)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+
+    def get_many(self, keys):
+        """Cached entry (or None) for each key"""
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            self._check_artifacts(now)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl and now - entry[0] > self.ttl:
+                    del self._entries[key]
+                    self.stats['expirations'] += 1
+                    entry = None
+                if entry is None:
+                    self.stats['misses'] += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    results.append(entry[1])
+        return results
+
+    def put_many(self, keys, values):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def predict(self, score, X):
+        """Predictions for the raw feature matrix X, scoring only cache misses
+
+        score(X_misses) must return (predictions, timings) like
+        PredictionEngine.predict. Returns (predictions, timings, n_hits);
+        timings is empty when every row was a hit.
+        """
+        if not self.enabled:
+            predictions, timings = score(X)
+            return predictions, timings, 0
+
+        keys = feature_keys(X)
+        cached = self.get_many(keys)
+        misses = [i for i, entry in enumerate(cached) if entry is None]
+
+        timings = {}
+        if misses:
+            predictions, timings = score(X[misses])
+            names = list(predictions)
+            fresh = [{name: float(predictions[name][j]) for name in names}
+                     for j in range(len(misses))]
+            self.put_many([keys[i] for i in misses], fresh)
+            for i, entry in zip(misses, fresh):
+                cached[i] = entry
+
+        names = list(cached[0])
+        predictions = {name: np.array([entry[name] for entry in cached]) for name in names}
+        return predictions, timings, len(X) - len(misses)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0
+            }
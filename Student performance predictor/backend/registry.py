@@ -0,0 +1,74 @@
+import os
+import joblib
+
+# Models are enabled with a comma-separated list, e.g.
+#   ENABLED_MODELS=random_forest,lightgbm
+# and the backends are picked with
+#   NEURAL_BACKEND=auto|numpy|keras
+#   TREE_BACKEND=native|compiled
+# The compiled tree backend (model/compiled_trees.npz, built by
+# model/tree_compiler.py) is fastest for single rows and small batches.
+DEFAULT_MODELS = ['random_forest', 'xgboost', 'lightgbm', 'neural_network']
+
+_compiled_forest = None
+
+def _load_compiled_forest(path='model/compiled_trees.npz'):
+    global _compiled_forest
+    if _compiled_forest is None:
+        from model.tree_compiler import CompiledForest
+        _compiled_forest = CompiledForest.load(path)
+    return _compiled_forest
+
+def _load_tree_model(name, path):
+    if os.environ.get('TREE_BACKEND', 'native') == 'compiled':
+        return _load_compiled_forest().model_view(name)
+    # Unpickling imports the model's library (sklearn/xgboost/lightgbm) on
+    # demand, so a disabled model never pays for its import
+    return joblib.load(path)
+
+def _load_neural_network(name, path):
+    backend = os.environ.get('NEURAL_BACKEND', 'auto')
+    npz_path = os.path.splitext(path)[0] + '.npz'
+
+    if backend in ('auto', 'numpy') and os.path.exists(npz_path):
+        from model.numpy_nn import NumpyMLP
+        return NumpyMLP.load(npz_path)
+    if backend == 'numpy':
+        raise FileNotFoundError(f"{npz_path} not found (run model/train_models.py --export-nn)")
+
+    # Only import TensorFlow when the Keras backend is actually needed
+    from tensorflow import keras
+    return keras.models.load_model(path)
+
+MODEL_REGISTRY = {
+    'random_forest': {'path': 'model/random_forest.pkl', 'loader': _load_tree_model},
+    'xgboost': {'path': 'model/xgboost.pkl', 'loader': _load_tree_model},
+    'lightgbm': {'path': 'model/lightgbm.pkl', 'loader': _load_tree_model},
+    'neural_network': {'path': 'model/neural_network.h5', 'loader': _load_neural_network}
+}
+
+def enabled_models():
+    """Names of the models enabled through ENABLED_MODELS (default: all)"""
+    value = os.environ.get('ENABLED_MODELS', '')
+    if not value.strip():
+        return list(DEFAULT_MODELS)
+
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in MODEL_REGISTRY]
+    if unknown:
+        print(f"Warning: ignoring unknown models in ENABLED_MODELS: {unknown}")
+    return [name for name in names if name in MODEL_REGISTRY]
+
+def load_registered_models(names=None):
+    """Load the enabled models, skipping any whose artifact fails to load"""
+    if names is None:
+        names = enabled_models()
+
+    loaded = {}
+    for name in names:
+        entry = MODEL_REGISTRY[name]
+        try:
+            loaded[name] = entry['loader'](name, entry['path'])
+        except Exception as e:
+            print(f"Warning: could not load {name}: {e}")
+    return loaded
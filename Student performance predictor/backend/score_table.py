@@ -0,0 +1,270 @@
+"""Precomputed ensemble scores over a quantized input grid ("table mode")
+
+An offline job scores every cell of a grid over the form inputs and
+stores (ensemble score, model spread) per cell in a .npy file that is
+memory-mapped at serving time, so /api/predict costs an index computation
+and a few reads instead of four model calls.
+
+- Grades and attendance are interpolated (multilinear) between knots.
+- Ratings and extracurricular level are snapped to their integer levels.
+- Age, gender and nationality would multiply the table size, so their
+  effect is an additive per-value offset, measured against the reference
+  input (age 21, unknown gender/nationality) over a sample of cells.
+
+The job reports the error against live inference on random requests and
+records it, with a hash of the model artifacts, in the metadata file.
+
+Usage (from the backend directory):
+    python score_table.py [--grade-step 1.0] [--samples 5000]
+Serve with SCORING_MODE=table.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import build_feature_frame
+
+TABLE_PATH = 'model/score_table.npy'
+META_PATH = 'model/score_table.json'
+
+# The table is only valid for the artifacts it was computed from
+SOURCE_ARTIFACTS = ['model/scaler.pkl', 'model/label_encoders.pkl', 'model/feature_columns.txt',
+                    'model/random_forest.pkl', 'model/xgboost.pkl', 'model/lightgbm.pkl',
+                    'model/neural_network.h5', 'model/neural_network.npz',
+                    'model/ensemble_config.json']
+
+REFERENCE_INPUT = {'age': 21, 'gender': '', 'nationality': '', 'ethnic.group': ''}
+
+def grid_axes(grade_step=1.0):
+    """Table axes: input field, feature column, knots (input units), feature = input * scale"""
+    grades = np.round(np.arange(1.0, 5.0 + 1e-9, grade_step), 6).tolist()
+    levels = [1.0, 2.0, 3.0, 4.0, 5.0]
+    axes = [{'field': f'{subject}_grade', 'column': f'{subject}.grade', 'knots': grades,
+             'scale': 1.0, 'interpolate': True}
+            for subject in ['english', 'math', 'sciences', 'language']]
+    axes += [{'field': f'{kind}_rating', 'column': f'{kind}.rating', 'knots': levels,
+              'scale': 1.0, 'interpolate': False}
+             for kind in ['portfolio', 'coverletter', 'refletter']]
+    axes += [{'field': 'extracurricular_level', 'column': 'extracurricular_score',
+              'knots': levels, 'scale': 0.8, 'interpolate': False},
+             {'field': 'attendance_rate', 'column': 'attendance_rate',
+              'knots': [0.6, 0.8, 1.0], 'scale': 1.0, 'interpolate': True}]
+    return axes
+
+def offset_axes(label_encoders):
+    """Additive axes: input field, feature column and the input value of each slot
+
+    Slot i holds the offset for feature value `first + i`.
+    """
+    axes = [{'field': 'age', 'column': 'age', 'first': 15, 'values': list(range(15, 31))}]
+    for field in ['gender', 'nationality']:
+        classes = [str(c) for c in label_encoders[field].classes_] if field in label_encoders else []
+        axes.append({'field': field, 'column': f'{field}_encoded', 'first': 0, 'values': classes})
+    return axes
+
+def source_hash(paths=SOURCE_ARTIFACTS):
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(path.encode() + f.read())
+        except FileNotFoundError:
+            digest.update(path.encode() + b'<missing>')
+    return digest.hexdigest()
+
+def _spread(predictions):
+    # Same spread the live endpoint turns into confidence: std over every
+    # model's prediction, ensemble included
+    return np.column_stack(list(predictions.values())).std(axis=1)
+
+def _score_inputs(records, score, label_encoders, feature_columns):
+    features = build_feature_frame(pd.DataFrame(records), label_encoders)
+    predictions, _ = score(features[feature_columns].to_numpy(dtype=float))
+    return predictions['ensemble'], _spread(predictions)
+
+def _cell_inputs(axes, cells):
+    """Input records for flat cell indices"""
+    coords = np.unravel_index(cells, [len(axis['knots']) for axis in axes])
+    records = {axis['field']: np.asarray(axis['knots'])[coord] for axis, coord in zip(axes, coords)}
+    for field, value in REFERENCE_INPUT.items():
+        records[field] = [value] * len(cells)
+    return records
+
+def _random_requests(axes, offsets, n, rng):
+    """Requests as the form sends them: 0.1 grade steps, integer levels, any attendance"""
+    records = {}
+    for axis in axes:
+        lo, hi = axis['knots'][0], axis['knots'][-1]
+        if axis['interpolate'] and axis['field'] == 'attendance_rate':
+            records[axis['field']] = np.round(rng.uniform(lo, hi, n), 2)
+        elif axis['interpolate']:
+            records[axis['field']] = np.round(rng.uniform(lo, hi, n), 1)
+        else:
+            records[axis['field']] = rng.choice(axis['knots'], n)
+    for axis in offsets:
+        records[axis['field']] = rng.choice(axis['values'], n) if axis['values'] else [''] * n
+    records['ethnic.group'] = [''] * n
+    return records
+
+def build_table(score, label_encoders, feature_columns, grade_step=1.0, samples=5000,
+                chunk_size=262144, table_path=TABLE_PATH, meta_path=META_PATH, seed=0):
+    """Score every grid cell, fit the offsets, measure the error and save"""
+    rng = np.random.RandomState(seed)
+    axes = grid_axes(grade_step)
+    offsets = offset_axes(label_encoders)
+    n_cells = int(np.prod([len(axis['knots']) for axis in axes]))
+    print(f"Scoring {n_cells:,} grid cells ({n_cells * 8 / 1e6:.0f} MB table)...")
+
+    start = time.perf_counter()
+    table = np.lib.format.open_memmap(table_path, mode='w+', dtype=np.float32, shape=(n_cells, 2))
+    for first in range(0, n_cells, chunk_size):
+        cells = np.arange(first, min(first + chunk_size, n_cells))
+        scores, spreads = _score_inputs(_cell_inputs(axes, cells), score, label_encoders,
+                                        feature_columns)
+        table[cells, 0] = scores
+        table[cells, 1] = spreads
+    table.flush()
+    print(f"✓ Scored grid in {time.perf_counter() - start:.1f}s")
+
+    # Offset of each age/gender/nationality value: mean change in score
+    # against the reference input, over a sample of grid cells
+    sample = _cell_inputs(axes, rng.randint(0, n_cells, min(samples, n_cells)))
+    reference, _ = _score_inputs(sample, score, label_encoders, feature_columns)
+    for axis in offsets:
+        axis['offsets'] = []
+        for value in axis['values']:
+            shifted, _ = _score_inputs({**sample, axis['field']: [value] * len(reference)},
+                                       score, label_encoders, feature_columns)
+            axis['offsets'].append(float(np.mean(shifted - reference)))
+
+    meta = {'axes': axes, 'offset_axes': offsets, 'n_cells': n_cells,
+            'source_hash': source_hash(), 'built_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+    scorer = ScoreTable(np.load(table_path, mmap_mode='r'), meta, feature_columns)
+
+    # Error against live inference on random form-like requests
+    requests = _random_requests(axes, offsets, samples, rng)
+    features = build_feature_frame(pd.DataFrame(requests), label_encoders)
+    X = features[feature_columns].to_numpy(dtype=float)
+    live, _ = score(X)
+    table_scores, _ = scorer.predict(X)
+    error = np.abs(table_scores - live['ensemble'])
+    bands = np.digitize(np.clip(live['ensemble'], 0, 100), [60, 70, 80, 90])
+    table_bands = np.digitize(np.clip(table_scores, 0, 100), [60, 70, 80, 90])
+    meta['error'] = {
+        'samples': samples,
+        'mae': float(error.mean()),
+        'rmse': float(np.sqrt(np.mean(error ** 2))),
+        'p95': float(np.percentile(error, 95)),
+        'max': float(error.max()),
+        'grade_agreement': float(np.mean(bands == table_bands))
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✓ Error vs live inference on {samples} random requests: "
+          f"MAE {meta['error']['mae']:.3f}, RMSE {meta['error']['rmse']:.3f}, "
+          f"p95 {meta['error']['p95']:.3f}, max {meta['error']['max']:.3f}, "
+          f"same grade {meta['error']['grade_agreement']:.1%}")
+    print(f"✓ Saved {table_path} and {meta_path}")
+    return meta
+
+class ScoreTable:
+    """Serves (ensemble score, model spread) from a precomputed grid"""
+    def __init__(self, table, meta, feature_columns):
+        # Plain ndarray view of the memmap: same pages, cheaper indexing
+        self.table = np.asarray(table)
+        self.meta = meta
+        axes = meta['axes']
+
+        self.columns = [feature_columns.index(axis['column']) for axis in axes]
+        self.lo = np.array([axis['knots'][0] * axis['scale'] for axis in axes])
+        self.step = np.array([(axis['knots'][1] - axis['knots'][0]) * axis['scale'] for axis in axes])
+        self.size = np.array([len(axis['knots']) for axis in axes])
+        self.interpolate = np.array([axis['interpolate'] for axis in axes])
+        self.strides = np.array([int(np.prod(self.size[i + 1:])) for i in range(len(axes))])
+
+        # Every interpolated axis contributes a lower and upper knot
+        self.interp_axes = np.flatnonzero(self.interpolate)
+        self.corner_bits = np.array(list(itertools.product([0, 1], repeat=len(self.interp_axes))))
+        self.corner_offsets = self.corner_bits @ self.strides[self.interp_axes]
+
+        self.offset_columns = [feature_columns.index(axis['column']) for axis in meta['offset_axes']]
+        self.offset_first = [axis['first'] for axis in meta['offset_axes']]
+        self.offsets = [np.asarray(axis['offsets'] or [0.0]) for axis in meta['offset_axes']]
+
+        # Per-axis tuples for the single-row path
+        self._axes = list(zip(self.columns, self.lo.tolist(), self.step.tolist(),
+                              self.size.tolist(), self.strides.tolist(), self.interpolate.tolist()))
+        self._offset_axes = list(zip(self.offset_columns, self.offset_first,
+                                     [offsets.tolist() for offsets in self.offsets]))
+
+    @classmethod
+    def load(cls, feature_columns, table_path=TABLE_PATH, meta_path=META_PATH):
+        """Memory-map a saved table; refuses tables built from other model artifacts"""
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta['source_hash'] != source_hash():
+            raise ValueError(f"{table_path} was built from different model artifacts "
+                             f"(rerun python score_table.py)")
+        return cls(np.load(table_path, mmap_mode='r'), meta, feature_columns)
+
+    def _predict_row(self, x):
+        # Scalar arithmetic: for one row this is several times faster than
+        # the vectorized path, which is dominated by per-call numpy overhead
+        cell, fracs = 0, []
+        for column, lo, step, size, stride, interpolate in self._axes:
+            pos = min(max((x[column] - lo) / step, 0.0), size - 1)
+            if interpolate:
+                index = min(int(pos), size - 2)
+                fracs.append(pos - index)
+            else:
+                index = int(pos + 0.5)
+            cell += index * stride
+
+        frac = np.array(fracs)
+        weights = np.where(self.corner_bits, frac, 1 - frac).prod(axis=1)
+        score, spread = weights @ self.table.take(cell + self.corner_offsets, axis=0)
+        for column, first, offsets in self._offset_axes:
+            slot = min(max(int(x[column] - first + 0.5), 0), len(offsets) - 1)
+            score += offsets[slot]
+        return score, spread
+
+    def predict(self, X):
+        """(scores, spreads) for a raw (unscaled) feature matrix"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.shape[0] == 1:
+            score, spread = self._predict_row(X[0].tolist())
+            return np.array([score]), np.array([spread])
+
+        pos = np.minimum(np.maximum((X[:, self.columns] - self.lo) / self.step, 0), self.size - 1)
+        index = np.where(self.interpolate, np.minimum(np.floor(pos), self.size - 2),
+                         np.floor(pos + 0.5))
+        frac = (pos - index)[:, self.interp_axes]
+        cells = index.astype(np.int64) @ self.strides
+        weights = np.where(self.corner_bits[None, :, :], frac[:, None, :],
+                           1 - frac[:, None, :]).prod(axis=2)
+
+        values = self.table[cells[:, None] + self.corner_offsets[None, :]]
+        scores, spreads = np.einsum('nc,nck->kn', weights, values)
+
+        for column, first, offsets in zip(self.offset_columns, self.offset_first, self.offsets):
+            slot = np.clip(np.floor(X[:, column] - first + 0.5), 0, len(offsets) - 1).astype(np.int64)
+            scores = scores + offsets[slot]
+        return scores, spreads
+
+if __name__ == '__main__':
+    import app
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grade-step', type=float, default=1.0)
+    parser.add_argument('--samples', type=int, default=5000)
+    args = parser.parse_args()
+
+    app.load_models()
+    build_table(app.score_features, app.label_encoders, app.feature_columns,
+                grade_step=args.grade_step, samples=args.samples)
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from flask import current_app
+
+# Encoded JSON is sent in pieces of roughly this many characters
+JSON_CHUNK_SIZE = 16384
+
+def rows_to_dicts(cursor, null=None):
+    """Turn the remaining rows of a cursor into a list of dicts
+
+    Replaces the pandas read_sql_query(...).to_dict('records') round trip.
+    When a column name appears twice (e.g. i.* plus a joined alias) the
+    last column wins, as it did with pandas. NULLs become `null` (use
+    null='' for the old .fillna('') behaviour).
+    """
+    names = [column[0] for column in cursor.description]
+    if null is None:
+        return [dict(zip(names, row)) for row in cursor]
+    return [dict(zip(names, [null if value is None else value for value in row]))
+            for row in cursor]
+
+def query_dicts(conn, sql, params=(), null=None):
+    """Run a query and return its rows as dicts"""
+    return rows_to_dicts(conn.execute(sql, params), null=null)
+
+def _encoder():
+    # Same settings as flask.jsonify so the output is byte-identical
+    provider = current_app.json
+    kwargs = {'default': provider.default,
+              'ensure_ascii': provider.ensure_ascii,
+              'sort_keys': provider.sort_keys}
+    if (provider.compact is None and current_app.debug) or provider.compact is False:
+        kwargs['indent'] = 2
+    else:
+        kwargs['separators'] = (',', ':')
+    return json.JSONEncoder(**kwargs)
+
+def _buffered(pieces, chunk_size=JSON_CHUNK_SIZE):
+    # Join small pieces so the server isn't asked to write each one separately
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def _iter_chunks(encoder, payload, chunk_size):
+    yield from _buffered(encoder.iterencode(payload), chunk_size)
+    yield '\n'
+
+def iter_json(payload, chunk_size=JSON_CHUNK_SIZE):
+    """Encode payload incrementally, yielding chunks of about chunk_size characters"""
+    # The encoder is set up now, while the app context is still active;
+    # the chunks are produced later, while the response is being sent
+    return _iter_chunks(_encoder(), payload, chunk_size)
+
+def json_response(payload):
+    """Streaming equivalent of jsonify(payload)
+
+    The body is encoded while it is being sent instead of being built as
+    one string first.
+    """
+    return current_app.response_class(iter_json(payload),
+                                      mimetype=current_app.json.mimetype)
+
+def iter_ndjson(rows):
+    """One JSON object per line"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+    return _buffered(dumps(row) + '\n' for row in rows)
+
+def iter_csv(rows):
+    """CSV with a header taken from the first row's keys"""
+    def lines():
+        buffer = io.StringIO()
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    return _buffered(lines())
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv')
+}
+
+def export_response(rows, fmt, filename):
+    """Stream an iterable of row dicts as an NDJSON or CSV download"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt} (expected ndjson or csv)")
+    encode, mimetype = EXPORT_FORMATS[fmt]
+    response = current_app.response_class(encode(rows), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
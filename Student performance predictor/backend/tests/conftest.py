@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture(autouse=True)
+def backend_cwd(monkeypatch):
+    """Run each test from the backend directory, where the app's relative paths point"""
+    monkeypatch.chdir(BACKEND_DIR)
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    """A database created by app.init_db (base tables plus every migration)"""
+    import app
+    import db
+
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'test.db'))
+    db.close_all()
+    app.init_db()
+    yield db.get_connection()
+    db.close_all()
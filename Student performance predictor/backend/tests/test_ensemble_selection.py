@@ -0,0 +1,39 @@
+"""Ensemble weights come from out-of-fold training predictions, not the test rows"""
+import json
+
+import numpy as np
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.tree import DecisionTreeRegressor
+
+from model.ensemble_selection import out_of_fold_predictions, select_and_save
+
+def fit_models(X, y):
+    return {'linear': LinearRegression().fit(X, y), 'ridge': Ridge(alpha=10).fit(X, y),
+            'tree': DecisionTreeRegressor(max_depth=3, random_state=0).fit(X, y)}
+
+def make_data(seed=0):
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(200, 5))
+    y = X @ rng.normal(size=5) + 0.3 * rng.normal(size=200)
+    return X[:150], y[:150], X[150:], y[150:]
+
+def test_out_of_fold_predictions_come_from_models_without_the_row():
+    X_train, y_train, _, _ = make_data()
+    oof = out_of_fold_predictions(fit_models, X_train, y_train)
+    assert set(oof) == {'linear', 'ridge', 'tree'}
+    in_sample = fit_models(X_train, y_train)['tree'].predict(X_train)
+    # A depth-3 tree fits its own rows much better than rows it never saw
+    assert np.mean((oof['tree'] - y_train) ** 2) > np.mean((in_sample - y_train) ** 2)
+
+def test_weights_do_not_depend_on_the_test_labels(tmp_path):
+    X_train, y_train, X_test, y_test = make_data()
+    models = fit_models(X_train, y_train)
+    oof = out_of_fold_predictions(fit_models, X_train, y_train)
+
+    first = select_and_save(models, oof, y_train, X_test, y_test, path=tmp_path / 'a.json')
+    shuffled = np.random.RandomState(1).permutation(y_test)
+    second = select_and_save(models, oof, y_train, X_test, shuffled, path=tmp_path / 'b.json')
+
+    assert first['weights'] == second['weights']
+    assert first['metrics'] != second['metrics']
+    assert json.loads((tmp_path / 'a.json').read_text())['oof_rows'] == len(y_train)
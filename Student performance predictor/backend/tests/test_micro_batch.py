@@ -0,0 +1,41 @@
+"""MicroBatcher recovers from a dead or stuck scheduler instead of hanging"""
+import threading
+
+import numpy as np
+import pytest
+
+from micro_batch import MicroBatcher
+
+def score(X):
+    return {'score': np.asarray(X).sum(axis=1)}, {}
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_dead_scheduler_is_restarted():
+    batcher = MicroBatcher(score, max_batch_size=8, timeout=5.0)
+    real_record = batcher._record
+    def record_once(*args):
+        batcher._record = real_record
+        raise RuntimeError('stats broke')
+    batcher._record = record_once
+
+    predictions, _ = batcher.score(np.ones((1, 3)))
+    assert predictions['score'].tolist() == [3.0]
+    batcher._thread.join(timeout=5)
+    assert not batcher._thread.is_alive()
+
+    predictions, _ = batcher.score(np.full((1, 3), 2.0))
+    assert predictions['score'].tolist() == [6.0]
+    assert batcher.get_stats()['restarts'] == 1
+
+def test_stuck_scheduler_falls_back_to_scoring_directly():
+    release = threading.Event()
+    def stuck_in_scheduler(X):
+        if threading.current_thread().name == 'micro-batch':
+            release.wait(timeout=10)
+        return score(X)
+    batcher = MicroBatcher(stuck_in_scheduler, max_batch_size=8, timeout=0.1)
+
+    predictions, _ = batcher.score(np.full((1, 3), 2.0))
+    assert predictions['score'].tolist() == [6.0]
+    assert batcher.get_stats()['timeouts'] == 1
+    release.set()
@@ -0,0 +1,51 @@
+"""Migrations on a fresh database, and the indexes the app's queries rely on"""
+import sqlite3
+
+import pytest
+
+import db
+import migrations
+
+def test_migrates_to_latest_version(conn):
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    # Already applied: running again is a no-op
+    assert migrations.migrate(conn) == []
+
+def test_migration_failure_keeps_previous_version(tmp_path, monkeypatch):
+    path = str(tmp_path / 'broken.db')
+    conn = sqlite3.connect(path, isolation_level='IMMEDIATE')
+
+    def broken(conn):
+        conn.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('migration failed')
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [(1, 'broken', broken)])
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    assert migrations.get_version(conn) == 0
+    assert not conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchall()
+    conn.close()
+
+@pytest.mark.parametrize('name, query, index', migrations.QUERY_PLAN_CHECKS,
+                         ids=[name for name, _, _ in migrations.QUERY_PLAN_CHECKS])
+def test_query_uses_index(conn, name, query, index):
+    plan = ' | '.join(row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}'))
+    assert index in plan, f"{name} doesn't use {index}: {plan}"
+    assert 'USE TEMP B-TREE' not in plan, f"{name} sorts in a temp B-tree: {plan}"
+
+def test_risk_stats_match_the_group_by_they_replace(conn):
+    """The dashboard's risk distribution: same rows, same order as the baseline GROUP BY"""
+    rows = [('a', 'Low', 80), ('b', 'High', 55), ('c', 'Critical', 40), ('d', None, 70),
+            ('e', 'Medium', 65), ('f', 'High', 50)]
+    with db.transaction() as c:
+        c.executemany('INSERT INTO students (name, risk_level, predicted_score) VALUES (?, ?, ?)',
+                      rows)
+        c.execute("UPDATE students SET risk_level = 'Low' WHERE name = 'b'")
+        c.execute("DELETE FROM students WHERE name = 'e'")
+
+    expected = conn.execute('SELECT risk_level, COUNT(*) FROM students GROUP BY risk_level').fetchall()
+    actual = conn.execute('''SELECT NULLIF(risk_level, '') as risk_level, count FROM risk_stats
+                             WHERE count > 0 ORDER BY risk_level''').fetchall()
+    assert actual == expected
+    high_risk = conn.execute('SELECT SUM(high_risk) FROM risk_stats').fetchone()[0]
+    assert high_risk == 2
@@ -0,0 +1,38 @@
+"""model/neural_network.npz must score like the Keras network it was exported from"""
+import os
+
+import numpy as np
+import pytest
+
+from model.numpy_nn import NumpyMLP
+
+H5_PATH = 'model/neural_network.h5'
+NPZ_PATH = 'model/neural_network.npz'
+ATOL = 1e-4
+
+@pytest.fixture(scope='module')
+def keras_model():
+    keras = pytest.importorskip('tensorflow').keras
+    if not os.path.exists(H5_PATH):
+        pytest.skip(f'{H5_PATH} not found (run model/train_models.py)')
+    return keras.models.load_model(H5_PATH)
+
+def fixed_inputs(n_features):
+    """Standard-normal rows (the scaled feature space), plus zeros and outliers"""
+    X = np.random.RandomState(0).normal(size=(256, n_features))
+    return np.vstack([X, np.zeros((1, n_features)), np.full((1, n_features), 5.0),
+                      np.full((1, n_features), -5.0)])
+
+def test_npz_matches_keras(keras_model):
+    X = fixed_inputs(keras_model.input_shape[1])
+    expected = keras_model.predict(X, verbose=0)
+    actual = NumpyMLP.load(NPZ_PATH).predict(X)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, atol=ATOL, rtol=1e-5)
+
+def test_fresh_export_matches_keras(keras_model, tmp_path):
+    path = tmp_path / 'neural_network.npz'
+    NumpyMLP.from_layers(keras_model.layers).save(path)
+    X = fixed_inputs(keras_model.input_shape[1])
+    np.testing.assert_allclose(NumpyMLP.load(path).predict(X), keras_model.predict(X, verbose=0),
+                               atol=ATOL, rtol=1e-5)
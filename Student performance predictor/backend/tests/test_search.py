@@ -0,0 +1,31 @@
+"""ASHA bookkeeping in model/search.py: resuming and picking the winner"""
+from model.search import ASHA, TrialLog, config_id, rung_resources
+
+def record(params, rung, r2, latency_ms=1.0):
+    return {'config_id': config_id(params), 'rung': rung, 'params': params, 'r2': r2,
+            'mae': 0.0, 'latency_ms': latency_ms, 'fit_s': 0.0}
+
+def test_trial_log_only_resumes_the_same_schedule(tmp_path):
+    path = tmp_path / 'xgboost.jsonl'
+    eta3 = rung_resources(600, eta=3)
+    eta2 = rung_resources(600, eta=2)
+    assert eta3 != eta2
+    TrialLog(path, 'split', 3, eta3).append(record({'max_depth': 3}, 0, 0.5))
+
+    assert len(TrialLog(path, 'split', 3, eta3).load()) == 1
+    assert TrialLog(path, 'split', 2, eta2).load() == {}
+    assert TrialLog(path, 'other-split', 3, eta3).load() == {}
+
+def test_best_comes_from_the_highest_rung_reached():
+    configs = [{'max_depth': d} for d in (2, 3, 4)]
+    done = {}
+    # A low-resource trial that was never promoted scores highest on its rung
+    for params, rung, r2 in [(configs[0], 0, 0.95), (configs[1], 0, 0.80),
+                             (configs[2], 0, 0.70), (configs[1], 1, 0.85)]:
+        r = record(params, rung, r2)
+        done[(r['config_id'], rung)] = r
+    asha = ASHA(configs, [10, 30, 90], 3, 'accuracy', 0.01, done)
+
+    best = asha.best()
+    assert best['rung'] == 1
+    assert best['config_id'] == config_id(configs[1])
@@ -0,0 +1,40 @@
+"""Rows the write-behind writer can't write are dead-lettered, not dropped"""
+import json
+from datetime import datetime
+
+from write_behind import WriteBehindQueue, replay_dead_letters
+
+def rows(student_id):
+    now = datetime(2026, 10, 18, 9, 30)
+    student = (student_id, 'Ada', 'F', 'UK', 21, 3.0, 3.0, 3.0, 3.0, 3, 3, 3,
+               75.0, 'B', 'Low', 0.9, '[]', now)
+    interventions = [(student_id, 'Ada', 'study', 'Title', 'Description', 'low',
+                      'pending', '[]', now)]
+    return student, interventions
+
+def test_failed_row_goes_to_the_dead_letter_file(conn, tmp_path):
+    path = tmp_path / 'failed.jsonl'
+    write_queue = WriteBehindQueue(dead_letter_path=str(path))
+    conn.execute("CREATE TRIGGER reject_7 BEFORE INSERT ON students WHEN NEW.id = 7 "
+                 "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    conn.commit()
+    write_queue.submit(*rows(6))
+    write_queue.submit(*rows(7))
+    write_queue.flush()
+
+    assert write_queue.get_stats()['dead_lettered'] == 1
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [entry['student'][0] for entry in entries] == [7]
+    assert 'rejected' in entries[0]['error']
+    # The other row in the batch was still written
+    assert conn.execute('SELECT id FROM students WHERE id IN (6, 7)').fetchall() == [(6,)]
+
+    assert replay_dead_letters(str(path)) == (0, 1)
+    conn.execute('DROP TRIGGER reject_7')
+    conn.commit()
+    assert replay_dead_letters(str(path)) == (1, 0)
+    assert not path.exists()
+    stored = conn.execute('SELECT prediction_date FROM students WHERE id = 7').fetchone()[0]
+    assert stored == conn.execute('SELECT prediction_date FROM students WHERE id = 6').fetchone()[0]
+    assert conn.execute('SELECT COUNT(*) FROM interventions WHERE student_id = 7').fetchone()[0] == 1
+    write_queue.close()
@@ -0,0 +1,242 @@
+"""Write-behind queue for prediction rows
+
+/api/predict hands its student row and intervention rows to a background
+writer thread instead of inserting them before responding. The writer
+drains whatever has queued up (up to WRITE_BATCH_SIZE predictions) and
+writes it in one transaction, so many requests share one commit.
+
+Configured with
+    WRITE_BEHIND=1             # 0 writes synchronously in the request
+    WRITE_QUEUE_SIZE=10000     # queued predictions before submit() blocks
+    WRITE_BATCH_SIZE=500       # predictions per transaction
+    WRITE_QUEUE_TIMEOUT=1.0    # seconds submit() waits on a full queue
+    WRITE_DEAD_LETTER=database/write_behind_failed.jsonl
+When the queue stays full past the timeout (the writer can't keep up),
+submit() writes the rows in the calling thread, so load is pushed back
+onto requests instead of rows being dropped. Pending rows are flushed at
+interpreter exit.
+
+By the time the writer sees a row, its student id has already been
+returned to the client, so a row that fails both its batch and a retry
+on its own is appended to the dead-letter file (one JSON object per
+line, with the error) and logged, rather than dropped. Once the cause is
+fixed, load them with
+    python write_behind.py --replay
+while the app is stopped; rows that still fail stay in the file.
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import db
+
+DEAD_LETTER_PATH = 'database/write_behind_failed.jsonl'
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+def write_rows(items):
+    """Insert [(student_row, intervention_rows)] in one transaction"""
+    with db.transaction() as conn:
+        conn.executemany(db.INSERT_STUDENT_WITH_ID_SQL, [student for student, _ in items])
+        conn.executemany(db.INSERT_INTERVENTION_SQL,
+                         [row for _, interventions in items for row in interventions])
+
+def _json_value(value):
+    # Same text sqlite3's default datetime adapter stores
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def replay_dead_letters(path=DEAD_LETTER_PATH):
+    """Write the rows in a dead-letter file; returns (written, still_failing)"""
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    remaining = []
+    for entry in entries:
+        try:
+            write_rows([(tuple(entry['student']), [tuple(row) for row in entry['interventions']])])
+        except Exception as e:
+            entry['error'] = str(e)
+            remaining.append(entry)
+    if remaining:
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.writelines(json.dumps(entry, default=_json_value) + '\n' for entry in remaining)
+        os.replace(tmp, path)
+    else:
+        os.remove(path)
+    return len(entries) - len(remaining), len(remaining)
+
+class WriteBehindQueue:
+    """Bounded queue drained by one writer thread in batched transactions"""
+    def __init__(self, max_size=10000, batch_size=500, put_timeout=1.0, enabled=True,
+                 dead_letter_path=DEAD_LETTER_PATH):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.enabled = enabled
+        self.dead_letter_path = dead_letter_path
+        self._queue = queue.Queue(max_size)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.stats = {'submitted': 0, 'written': 0, 'batches': 0, 'max_batch': 0,
+                      'sync_writes': 0, 'failed': 0, 'dead_lettered': 0,
+                      'write_ms_total': 0.0}
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        return cls(max_size=int(os.environ.get('WRITE_QUEUE_SIZE', 10000)),
+                   batch_size=int(os.environ.get('WRITE_BATCH_SIZE', 500)),
+                   put_timeout=float(os.environ.get('WRITE_QUEUE_TIMEOUT', 1.0)),
+                   enabled=os.environ.get('WRITE_BEHIND', '1') != '0',
+                   dead_letter_path=os.environ.get('WRITE_DEAD_LETTER', DEAD_LETTER_PATH))
+
+    def _ensure_writer(self):
+        # Started lazily, and again in a forked worker (threads don't
+        # survive fork)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.max_size)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='write-behind',
+                                                daemon=True)
+                self._thread.start()
+
+    def submit(self, student_row, intervention_rows):
+        """Queue one prediction's rows (student_row must include its id)"""
+        item = (student_row, list(intervention_rows))
+        if not self.enabled:
+            self._write_now([item])
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+            self._count(submitted=1)
+        except queue.Full:
+            self._count(sync_writes=1)
+            self._write_now([item])
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def _write_now(self, items):
+        write_rows(items)
+        self._count(written=len(items))
+
+    def _drain(self, first):
+        items = [first]
+        while len(items) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+        return items
+
+    def _write_batch(self, items):
+        start = time.perf_counter()
+        failed = 0
+        try:
+            write_rows(items)
+        except Exception as e:
+            # Retry one by one so a single bad row doesn't lose the batch
+            logger.warning("Write-behind batch of %d failed (%s), retrying rows", len(items), e)
+            for item in items:
+                try:
+                    write_rows([item])
+                except Exception as row_error:
+                    failed += 1
+                    self._dead_letter(item, row_error)
+        self._count(written=len(items) - failed, failed=failed, batches=1,
+                    write_ms_total=(time.perf_counter() - start) * 1000)
+        with self._stats_lock:
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(items))
+
+    def _dead_letter(self, item, error):
+        student_row, intervention_rows = item
+        entry = {'failed_at': datetime.now().isoformat(' '), 'error': str(error),
+                 'student': list(student_row), 'interventions': [list(row) for row in intervention_rows]}
+        try:
+            with open(self.dead_letter_path, 'a') as f:
+                f.write(json.dumps(entry, default=_json_value) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            # Nowhere left to put it: the log line is the only copy
+            logger.exception("Write-behind lost student %s, dead-letter file %s not writable: %r",
+                             student_row[0], self.dead_letter_path, entry)
+            return
+        self._count(dead_lettered=1)
+        logger.error("Write-behind failed to write student %s (%s), saved to %s",
+                     student_row[0], error, self.dead_letter_path)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            items = self._drain(first)
+            stop = _STOP in items
+            items = [item for item in items if item is not _STOP]
+            if items:
+                self._write_batch(items)
+            for _ in range(len(items) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until everything queued so far is written"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        batches = stats['batches']
+        return {
+            **stats,
+            'enabled': self.enabled,
+            'pending': self._queue.qsize(),
+            'max_size': self.max_size,
+            'dead_letter_path': self.dead_letter_path,
+            'avg_batch': round((stats['written'] - stats['sync_writes']) / batches, 2) if batches else 0.0,
+            'avg_write_ms': round(stats['write_ms_total'] / batches, 3) if batches else 0.0
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay rows the write-behind writer could not write')
+    parser.add_argument('--replay', action='store_true', help='write the dead-letter rows')
+    parser.add_argument('--path', default=os.environ.get('WRITE_DEAD_LETTER', DEAD_LETTER_PATH))
+    args = parser.parse_args()
+    if not args.replay:
+        parser.error('nothing to do (pass --replay)')
+    written, remaining = replay_dead_letters(args.path)
+    print(f"Replayed {written} rows, {remaining} still failing")
@@ -0,0 +1,24 @@
+"""WSGI entry point for pre-fork servers
+
+Importing this module creates the schema and loads the models. With
+gunicorn's preload_app (see gunicorn.conf.py) that happens once in the
+master, and every forked worker shares the loaded models and imported
+libraries copy-on-write instead of unpickling its own copy.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn.conf.py
+"""
+import os
+
+import app as backend
+import db
+
+os.makedirs('model', exist_ok=True)
+os.makedirs('database', exist_ok=True)
+
+backend.init_db()
+backend.load_models()
+# SQLite connections must not cross fork(); workers open their own
+db.close_all()
+
+application = backend.app